@@ -1,7 +1,10 @@
 """Functions for querying the MS-Access database format
+
+pyodbc is imported only when a connection is opened, so that the rest of the
+package can be used on systems without an ODBC driver manager, for example
+when building from an archive index snapshot.
 """
 import contextlib
-import pyodbc
 import sqlalchemy as sa
 
 
@@ -36,6 +39,21 @@ def get_connection_string(path):
     )
 
 
+def connect(path):
+    """Opens a connection to an ms access database at the specified path.
+    The caller is responsible for closing the returned connection.
+
+    Args:
+        path (str): path to an ms access database
+
+    Returns:
+        pyodbc.Connection: an open connection
+    """
+    import pyodbc
+
+    return pyodbc.connect(get_connection_string(path), autocommit=False)
+
+
 @contextlib.contextmanager
 def get_connection(path):
     """yields a connection to an ms access database at the specified path.
@@ -43,6 +61,8 @@ def get_connection(path):
     Args:
         path (str): path to an ms access database
     """
+    import pyodbc
+
     connection_string = get_connection_string(path)
     with pyodbc.connect(connection_string, autocommit=False) as connection:
         yield connection
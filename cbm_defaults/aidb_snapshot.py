@@ -0,0 +1,299 @@
+"""
+Export the CBM-CFS3 archive index tables used by cbm_defaults to a local
+snapshot, and read parameters back from that snapshot without ODBC.
+
+A snapshot is a directory containing one SQLite database (or one directory
+of Parquet files) per locale, and a json manifest named ``snapshot.json``
+describing its contents.
+"""
+
+import os
+import re
+import json
+import shutil
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import contextlib
+import collections
+import functools
+import pandas as pd
+from cbm_defaults import helper
+from cbm_defaults import sql_dialect
+from cbm_defaults.archive_index import ArchiveIndex
+from cbm_defaults.archive_index import get_query_dir
+
+logger = helper.get_logger()
+
+SNAPSHOT_FORMATS = ["sqlite", "parquet"]
+MANIFEST_FILENAME = "snapshot.json"
+
+
+def _find_tables(sql, tables):
+    for name in re.findall(r"\btbl\w+", sql, re.I):
+        # archive index table names are case insensitive, prefer the
+        # spelling that is not all lower case
+        key = name.lower()
+        if key not in tables or tables[key] == key:
+            tables[key] = name
+
+
+def get_query_tables(name):
+    """Gets the names of the archive index tables referenced by the named
+    query in the 'archive_index_queries' directory.
+
+    Args:
+        name (str): name of the query file, without extension
+
+    Returns:
+        list: sorted list of table names
+    """
+    tables = {}
+    with open(os.path.join(get_query_dir(), f"{name}.sql"), "r") as sql_file:
+        _find_tables(sql_file.read(), tables)
+    return sorted(tables.values(), key=str.lower)
+
+
+def get_referenced_tables():
+    """Gets the names of all archive index tables referenced by the queries
+    in the 'archive_index_queries' directory.
+
+    Returns:
+        list: sorted list of table names
+    """
+    tables = {}
+    for filename in sorted(os.listdir(get_query_dir())):
+        if not filename.endswith(".sql"):
+            continue
+        with open(os.path.join(get_query_dir(), filename), "r") as sql_file:
+            _find_tables(sql_file.read(), tables)
+    return sorted(tables.values(), key=str.lower)
+
+
+def export_snapshot(archive_index, output_dir, snapshot_format="sqlite"):
+    """Copy every archive index table referenced by the packaged queries into
+    a local snapshot, for each locale in the specified archive index.
+
+    Args:
+        archive_index (ArchiveIndex): the archive index to copy
+        output_dir (str): directory into which the snapshot is written. It is
+            created if it does not exist.
+        snapshot_format (str, optional): one of "sqlite" or "parquet".
+            Parquet requires the pyarrow package. Defaults to "sqlite".
+
+    Raises:
+        ValueError: the snapshot format is not supported, or the output
+            directory already contains a snapshot
+
+    Returns:
+        dict: the snapshot manifest, which is also written to the output dir
+    """
+    if snapshot_format not in SNAPSHOT_FORMATS:
+        raise ValueError(f"unknown snapshot format '{snapshot_format}'")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        raise ValueError(f"snapshot already exists in {output_dir}")
+
+    manifest = {
+        "format": snapshot_format,
+        "default_locale": archive_index.default_locale,
+        "archive_index_data": [],
+    }
+    tables = get_referenced_tables()
+    for item in archive_index.archive_index_data:
+        locale = item["locale"]
+        if snapshot_format == "sqlite":
+            snapshot_path = f"{locale}.db"
+        else:
+            snapshot_path = locale
+        table_rows = {}
+        for table in tables:
+            if not archive_index.table_exists(table, locale=locale):
+                logger.info("%s: table %s not found", locale, table)
+                continue
+            logger.info("%s: copying %s", locale, table)
+            df = archive_index.query_df(
+                f"SELECT * FROM {table}", locale=locale
+            )
+            _write_table(
+                os.path.join(output_dir, snapshot_path),
+                snapshot_format,
+                table,
+                df,
+            )
+            table_rows[table] = len(df.index)
+        manifest["archive_index_data"].append(
+            {
+                "locale": locale,
+                "path": snapshot_path,
+                "source_path": item["path"],
+                "tables": table_rows,
+            }
+        )
+
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    return manifest
+
+
+def _write_table(path, snapshot_format, table, df):
+    if snapshot_format == "sqlite":
+        with contextlib.closing(sqlite3.connect(path)) as connection:
+            df.to_sql(table, connection, index=False)
+            connection.commit()
+    else:
+        os.makedirs(path, exist_ok=True)
+        df.to_parquet(os.path.join(path, f"{table}.parquet"), index=False)
+
+
+def load_manifest(snapshot_dir):
+    """Load the manifest of the snapshot stored in the specified directory
+
+    Args:
+        snapshot_dir (str): a directory created by :py:func:`export_snapshot`
+
+    Returns:
+        dict: the snapshot manifest
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILENAME)
+    with open(manifest_path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def open_snapshot(snapshot_dir, locales, default_locale=None, **kwargs):
+    """Create an archive index instance that reads from a snapshot.
+
+    Args:
+        snapshot_dir (str): a directory created by :py:func:`export_snapshot`
+        locales (list): list of dictionaries containing locale information.
+            See :py:class:`cbm_defaults.archive_index.ArchiveIndex`
+        default_locale (str, optional): code for the default locale. If
+            unspecified, the default locale recorded in the snapshot is used.
+        kwargs: other keyword arguments passed to
+            :py:class:`SnapshotArchiveIndex`
+
+    Returns:
+        SnapshotArchiveIndex: the snapshot archive index
+    """
+    manifest = load_manifest(snapshot_dir)
+    archive_index_data = [
+        {
+            "locale": x["locale"],
+            "path": os.path.join(os.path.abspath(snapshot_dir), x["path"]),
+        }
+        for x in manifest["archive_index_data"]
+    ]
+    return SnapshotArchiveIndex(
+        locales,
+        default_locale or manifest["default_locale"],
+        archive_index_data,
+        **kwargs,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_row_type(column_names):
+    return collections.namedtuple("Row", column_names, rename=True)
+
+
+def _row_factory(cursor, row):
+    # mimics the attribute access of pyodbc rows used by the builder
+    row_type = _get_row_type(tuple(x[0] for x in cursor.description))
+    return row_type(*row)
+
+
+###############################################################################
+class SnapshotArchiveIndex(ArchiveIndex):
+    """Archive index that answers queries from a snapshot created by
+    :py:func:`export_snapshot` rather than from MS Access databases.
+
+    The arguments are the same as
+    :py:class:`cbm_defaults.archive_index.ArchiveIndex`, except that each
+    path in *archive_index_data* is either a SQLite snapshot database file,
+    or a directory of Parquet snapshot files.
+
+    Queries are written in the MS-ACCESS dialect, as for the base class,
+    and are translated to SQLite with
+    :py:func:`cbm_defaults.sql_dialect.to_sqlite`.
+
+    The Parquet files of a locale are loaded, when it is first queried,
+    into a temporary SQLite database which every pooled connection to that
+    locale reads, and which is deleted by :py:meth:`close`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._parquet_lock = threading.Lock()
+        self._parquet_dir = None
+        self._parquet_databases = {}
+
+    def _prepare_sql(self, sql):
+        return sql_dialect.to_sqlite(sql)
+
+    def _get_parquet_database(self, path):
+        """get the path of the temporary SQLite database holding the
+        Parquet files of the specified directory, loading them on the first
+        call for the directory
+        """
+        with self._parquet_lock:
+            if path not in self._parquet_databases:
+                if self._parquet_dir is None:
+                    self._parquet_dir = tempfile.mkdtemp(
+                        prefix="cbm_defaults_snapshot_"
+                    )
+                database_path = os.path.join(
+                    self._parquet_dir, f"{len(self._parquet_databases)}.db"
+                )
+                with contextlib.closing(
+                    sqlite3.connect(database_path)
+                ) as connection:
+                    for filename in sorted(os.listdir(path)):
+                        table, ext = os.path.splitext(filename)
+                        if ext == ".parquet":
+                            pd.read_parquet(
+                                os.path.join(path, filename)
+                            ).to_sql(table, connection, index=False)
+                    connection.commit()
+                self._parquet_databases[path] = database_path
+            return self._parquet_databases[path]
+
+    def _connect(self, path):
+        if not os.path.exists(path):
+            raise ValueError(f"snapshot not found: {path}")
+        if os.path.isdir(path):
+            path = self._get_parquet_database(path)
+        uri = pathlib.Path(os.path.abspath(path)).as_uri()
+        connection = sqlite3.connect(
+            f"{uri}?mode=ro", uri=True, check_same_thread=False
+        )
+        connection.row_factory = _row_factory
+        return connection
+
+    def close(self):
+        """Close all pooled snapshot connections, and delete the temporary
+        databases of Parquet snapshots."""
+        super().close()
+        with self._parquet_lock:
+            if self._parquet_dir is not None:
+                shutil.rmtree(self._parquet_dir, ignore_errors=True)
+                self._parquet_dir = None
+                self._parquet_databases = {}
+
+    def table_exists(self, tableName, locale=None):
+        """
+        check if the specified table name matches the name of an existing
+        table in the snapshot
+        """
+        path = self._get_path(locale)
+        with self._pool.connection(path) as connection:
+            cursor = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND lower(name) = lower(?)",
+                (tableName,),
+            )
+            try:
+                return cursor.fetchone() is not None
+            finally:
+                cursor.close()
@@ -5,9 +5,17 @@ Root function for creating cbm_defaults database.
 # Modules #
 import os
 import json
+import time
 from cbm_defaults.archive_index import ArchiveIndex
+from cbm_defaults import aidb_snapshot
+from cbm_defaults import build_cache
+from cbm_defaults import build_manifest
+from cbm_defaults import build_scheduler
 from cbm_defaults.cbm_defaults_builder import CBMDefaultsBuilder
 from cbm_defaults import cbm_defaults_database
+from cbm_defaults import dm_export
+from cbm_defaults import parquet_export
+from cbm_defaults import spatial_unit_export
 from cbm_defaults import schema
 from cbm_defaults import helper
 
@@ -40,6 +48,93 @@ def run(config):
                 ]
             }
 
+        Optionally, "archive_index_snapshot" may be set to a directory
+        created by :py:func:`cbm_defaults.aidb_snapshot.export_snapshot`,
+        in which case parameters are read from the snapshot and
+        "archive_index_data" is not used.
+
+        Optionally, "max_workers" may be set to the number of threads used
+        to query the archive index databases of several locales
+        concurrently, and "write_batch_size" to the number of rows
+        buffered per table before they are inserted in the output
+        database.
+
+        Optionally, "fast_build" may be set to true to build the database
+        in memory, with foreign keys checked once at the end rather than
+        per row. The output file is only written, atomically, once the
+        build succeeds, so a failed build leaves no partial output.
+
+        Optionally, "deduplicate_parameters" may be set to true to store
+        each distinct stump, turnover, spinup and volume to biomass
+        parameter set once, shared by all of the rows referencing it.
+        "deduplicate_disturbance_matrices" may be set to true to store
+        identical disturbance matrices once, with the original ids kept in
+        the disturbance_matrix_alias table.
+
+        Optionally, "lookup_tables" may be set to true to add denormalized,
+        indexed lookup tables of disturbance matrix values, spatial units,
+        species and composite flux indicators by name and locale to the
+        database. See :py:mod:`cbm_defaults.lookup_tables`.
+
+        Optionally, "build_workers" may be set to the number of threads
+        running the independent steps of the build concurrently.
+
+        Optionally, "dm_chunk_size" may be set to a number of rows to
+        process and write the disturbance matrix values in chunks of whole
+        matrices, read in order of DMID, bounding the memory they use.
+        "dm_workers" may be set to a number of processes among which the
+        disturbance matrices are partitioned to be processed in parallel.
+
+        Optionally, "incremental" may be set to true to update an existing
+        database at "output_path": only the tables whose inputs changed
+        since it was built, according to the build manifest stored in it,
+        are rebuilt. See :py:mod:`cbm_defaults.build_manifest`. The build
+        manifest is only recorded by incremental builds, so a database
+        built without this option is rebuilt entirely by the first
+        incremental build updating it.
+
+        Optionally, "build_cache_dir" may be set to a directory where built
+        databases are kept, keyed by a fingerprint of the config, the
+        archive index databases and the cbm_defaults package. Identical
+        builds are then copied from the cache. "build_cache_max_size"
+        limits the total size in bytes of the cache, by evicting the least
+        recently used databases, and "build_cache_hardlink" may be set to
+        true to hard link, rather than copy, cached databases.
+
+        Optionally, "profile_report" may be set to the path of a json file
+        to which the build profile is written, see the return value.
+        "profile_memory" may be set to true to include the peak python
+        memory allocation of each step in the profile, which slows the
+        build down. It defaults to true when "profile_report" is set.
+
+        Optionally, "slow_query_threshold" may be set to a number of
+        seconds: archive index queries taking at least this long are
+        logged as warnings by the "cbm_defaults.slow_queries" logger.
+
+        Optionally, "dm_export_dir" may be set to a directory to which the
+        disturbance matrices of the built database are exported as numpy
+        arrays, and "dm_export_dense" to true to also export them as a
+        dense array which can be memory mapped. See
+        :py:mod:`cbm_defaults.dm_export`. "spatial_unit_export_path" may be
+        set to the path of a .npy file to which the parameters of each
+        spatial unit are exported, indexed by spatial unit id. See
+        :py:mod:`cbm_defaults.spatial_unit_export`.
+
+        Optionally, "parquet_export_dir" may be set to a directory to which
+        every table of the built database is exported as a Parquet dataset,
+        which requires the pyarrow package. See
+        :py:mod:`cbm_defaults.parquet_export`.
+
+    Returns:
+        dict: the build profile: the wall time, the time spent in archive
+            index queries, database writes, waiting for the database write
+            lock and python transformations, the rows read and written, and
+            the peak memory of each build step, along with the totals and
+            the critical path of the build. See
+            :py:class:`cbm_defaults.build_profiler.BuildProfiler`. The
+            "queries" entry summarizes the archive index queries by query
+            name, see :py:class:`cbm_defaults.query_stats.QueryStats`. None
+            is returned if the database was copied from the build cache.
     """
     logger.info("initialization")
 
@@ -49,31 +144,317 @@ def run(config):
         with open(config, "r") as config_file:
             _config = json.load(config_file)
 
-    for item in _config["archive_index_data"]:
-        item["path"] = os.path.abspath(item["path"])
-        logger.info("using archive index database %s", item["path"])
+    report = _run(_config)
+    if _config.get("dm_export_dir"):
+        dm_export.export_disturbance_matrices(
+            os.path.abspath(_config["output_path"]),
+            os.path.abspath(_config["dm_export_dir"]),
+            dense=_config.get("dm_export_dense", False),
+        )
+    if _config.get("spatial_unit_export_path"):
+        spatial_unit_export.export_spatial_unit_parameters(
+            os.path.abspath(_config["output_path"]),
+            os.path.abspath(_config["spatial_unit_export_path"]),
+        )
+    if _config.get("parquet_export_dir"):
+        parquet_export.export_parquet(
+            os.path.abspath(_config["output_path"]),
+            os.path.abspath(_config["parquet_export_dir"]),
+        )
+    return report
 
-    archive_index = ArchiveIndex(
-        _config["locales"],
-        _config["default_locale"],
-        _config["archive_index_data"],
-    )
 
-    # Create an empty SQLite database #
+def _run(_config):
+    """build the database specified by the loaded config, see
+    :py:func:`run`
+    """
+    if _config.get("archive_index_snapshot"):
+        snapshot_dir = os.path.abspath(_config["archive_index_snapshot"])
+        logger.info("using archive index snapshot %s", snapshot_dir)
+        archive_index = aidb_snapshot.open_snapshot(
+            snapshot_dir,
+            _config["locales"],
+            _config["default_locale"],
+            max_connections=_get_max_connections(_config),
+            max_workers=_config.get("max_workers"),
+            slow_query_threshold=_config.get("slow_query_threshold"),
+        )
+    else:
+        for item in _config["archive_index_data"]:
+            item["path"] = os.path.abspath(item["path"])
+            logger.info("using archive index database %s", item["path"])
+
+        archive_index = ArchiveIndex(
+            _config["locales"],
+            _config["default_locale"],
+            _config["archive_index_data"],
+            max_connections=_get_max_connections(_config),
+            max_workers=_config.get("max_workers"),
+            slow_query_threshold=_config.get("slow_query_threshold"),
+        )
+
     output_path = os.path.abspath(_config["output_path"])
-    logger.info("created database file: %s", output_path)
-    cbm_defaults_database.create_database(output_path)
+    if _config.get("incremental") and os.path.exists(output_path):
+        with archive_index:
+            return _run_incremental(_config, archive_index, output_path)
+
+    cache = None
+    if _config.get("build_cache_dir"):
+        if os.path.exists(output_path):
+            raise ValueError(f"specified path already exists {output_path}")
+        cache = build_cache.BuildCache(
+            os.path.abspath(_config["build_cache_dir"]),
+            max_size=_config.get("build_cache_max_size"),
+            hardlink=_config.get("build_cache_hardlink", False),
+        )
+        cache_key = build_cache.get_cache_key(_config)
+        if cache.get(cache_key, output_path):
+            logger.info("copied build %s from the build cache", cache_key)
+            archive_index.close()
+            return None
 
-    # Run the DDL file on it to create all tables #
     schema_path = schema.get_ddl_path()
-    logger.info("running DDL statements %s", schema_path)
-    cbm_defaults_database.execute_ddl_file(schema_path, output_path)
+    fast_build = _config.get("fast_build", False)
+    if fast_build:
+        # Build in memory, the output file is written once complete #
+        if os.path.exists(output_path):
+            raise ValueError(f"specified path already exists {output_path}")
+        output_connection = cbm_defaults_database.get_staging_connection()
+    else:
+        # Create an empty SQLite database #
+        logger.info("created database file: %s", output_path)
+        cbm_defaults_database.create_database(output_path)
+
+        # Run the DDL file on it to create all tables #
+        logger.info("running DDL statements %s", schema_path)
+        cbm_defaults_database.execute_ddl_file(
+            schema_path, output_path, indexes=False
+        )
+        output_connection = cbm_defaults_database.get_connection(output_path)
 
     # Run every method of the default builder on the empty database #
-    with cbm_defaults_database.get_connection(output_path) as connection:
-        builder = CBMDefaultsBuilder(
-            connection, _config["locales"], archive_index
+    with archive_index, output_connection as connection:
+        if fast_build:
+            logger.info("running DDL statements %s", schema_path)
+            cbm_defaults_database.execute_ddl(
+                connection, schema_path, indexes=False
+            )
+        builder = _get_builder(_config, connection, archive_index)
+        _build(_config, builder, connection, archive_index)
+        if fast_build:
+            logger.info("checking foreign keys")
+            cbm_defaults_database.check_foreign_keys(connection)
+            cbm_defaults_database.write_database(connection, output_path)
+
+    if cache:
+        logger.info("adding build %s to the build cache", cache_key)
+        cache.put(cache_key, output_path)
+    return _get_report(builder)
+
+
+def _get_max_connections(_config):
+    """get the number of pooled connections per archive index database: one
+    for each build worker, which may hold a streamed query for a whole
+    step, plus one for a worker running a query while it holds another
+    """
+    return (_config.get("build_workers") or 1) + 1
+
+
+def _get_builder(_config, connection, archive_index):
+    return CBMDefaultsBuilder(
+        connection,
+        _config["locales"],
+        archive_index,
+        write_batch_size=_config.get(
+            "write_batch_size", cbm_defaults_database.DEFAULT_BATCH_SIZE
+        ),
+        deduplicate_parameters=_config.get("deduplicate_parameters", False),
+        max_workers=_config.get("build_workers"),
+        dm_chunk_size=_config.get("dm_chunk_size"),
+        dm_workers=_config.get("dm_workers"),
+        deduplicate_disturbance_matrices=_config.get(
+            "deduplicate_disturbance_matrices", False
+        ),
+        lookup_tables=_config.get("lookup_tables", False),
+        profile_memory=_config.get(
+            "profile_memory", bool(_config.get("profile_report"))
+        ),
+    )
+
+
+def _get_input_hashes(_config, builder, archive_index):
+    """hash the inputs of every step of the specified builder, along with
+    the config options which affect every table
+    """
+    input_names = [
+        name for step in builder.get_build_steps() for name in step.inputs
+    ]
+    build_config = {
+        "locales": _config["locales"],
+        "default_locale": _config["default_locale"],
+        "deduplicate_parameters": _config.get("deduplicate_parameters", False),
+        "deduplicate_disturbance_matrices": _config.get(
+            "deduplicate_disturbance_matrices", False
+        ),
+        "lookup_tables": _config.get("lookup_tables", False),
+    }
+    logger.info("hashing build inputs")
+    return build_manifest.get_input_hashes(
+        archive_index, input_names, build_config
+    )
+
+
+def _build(
+    _config,
+    builder,
+    connection,
+    archive_index,
+    step_names=None,
+    input_hashes=None,
+):
+    """run the specified builder steps, create the indexes if all steps are
+    run, record the input hashes in the build manifest if the build is
+    incremental, and write the profile report if one is configured
+    """
+    logger.info("running")
+    start = time.perf_counter()
+    builder.build_database(step_names)
+    logger.info("loaded tables in %.3fs", time.perf_counter() - start)
+    totals = builder.profiler.get_report()["totals"]
+    logger.info(
+        "query %.3fs, write %.3fs, write lock wait %.3fs, transform %.3fs",
+        totals["query_time"],
+        totals["write_time"],
+        totals["write_wait_time"],
+        totals["transform_time"],
+    )
+    if _config.get("profile_report"):
+        profile_path = os.path.abspath(_config["profile_report"])
+        logger.info("writing build profile %s", profile_path)
+        builder.profiler.write_report(
+            profile_path, queries=archive_index.query_stats.get_summary()
+        )
+    if step_names is None:
+        cbm_defaults_database.create_indexes(
+            connection, schema.get_ddl_path()
+        )
+    if input_hashes is None and _config.get("incremental"):
+        input_hashes = _get_input_hashes(_config, builder, archive_index)
+    if input_hashes is not None:
+        build_manifest.write_manifest(connection, input_hashes)
+    connection.commit()
+    logger.info(
+        "archive index connections: %s",
+        archive_index.get_connection_stats(),
+    )
+    for query in archive_index.query_stats.get_summary()[:5]:
+        logger.info(
+            "query %s: %d calls, %d rows in %.3fs",
+            query["name"],
+            query["calls"],
+            query["rows"],
+            query["total_time"],
+        )
+
+
+def _get_report(builder):
+    """get the profile of the build run by builder, along with the summary
+    of the archive index queries
+    """
+    report = builder.profiler.get_report()
+    report["queries"] = builder.archive_index.query_stats.get_summary()
+    return report
+
+
+def _run_incremental(_config, archive_index, output_path):
+    """rebuild the tables of an existing database whose inputs changed
+    since it was built, in memory, then replace the existing database.
+    Returns the build profile.
+    """
+    with cbm_defaults_database.get_connection(output_path) as existing:
+        previous_hashes = build_manifest.read_manifest(existing)
+
+    with cbm_defaults_database.get_staging_connection() as connection:
+        builder = _get_builder(_config, connection, archive_index)
+        steps = builder.get_build_steps()
+        input_hashes = _get_input_hashes(_config, builder, archive_index)
+        changed_steps = build_manifest.get_changed_steps(
+            steps,
+            build_scheduler.get_dependencies(steps),
+            previous_hashes,
+            input_hashes,
+        )
+        if not changed_steps:
+            logger.info("%s is up to date", output_path)
+            return _get_report(builder)
+        if len(changed_steps) == len(steps):
+            logger.info("rebuilding all tables")
+            cbm_defaults_database.execute_ddl(
+                connection, schema.get_ddl_path(), indexes=False
+            )
+            _build(
+                _config,
+                builder,
+                connection,
+                archive_index,
+                input_hashes=input_hashes,
+            )
+        else:
+            logger.info("rebuilding: %s", ", ".join(changed_steps))
+            with cbm_defaults_database.get_connection(
+                output_path
+            ) as existing:
+                existing.backup(connection)
+            for step in reversed(steps):
+                if step.name in changed_steps:
+                    for table in step.writes:
+                        connection.execute(f"DELETE FROM {table}")
+            _build(
+                _config,
+                builder,
+                connection,
+                archive_index,
+                step_names=changed_steps,
+                input_hashes=input_hashes,
+            )
+        logger.info("checking foreign keys")
+        cbm_defaults_database.check_foreign_keys(connection)
+        cbm_defaults_database.write_database(
+            connection, output_path, overwrite=True
+        )
+        return _get_report(builder)
+
+
+def export_snapshot(config, output_dir, snapshot_format="sqlite"):
+    """Export the archive index databases named in the specified config to
+    a local snapshot which can be used in place of the archive index
+    databases by setting the "archive_index_snapshot" config value.
+
+    Args:
+        config (str): path to a json formatted config file, or a dictionary
+            containing the config. See :py:func:`run`.
+        output_dir (str): directory into which the snapshot is written
+        snapshot_format (str, optional): one of "sqlite" or "parquet".
+            Defaults to "sqlite".
+
+    Returns:
+        dict: the snapshot manifest
+    """
+    if isinstance(config, dict):
+        _config = config
+    else:
+        with open(config, "r") as config_file:
+            _config = json.load(config_file)
+
+    for item in _config["archive_index_data"]:
+        item["path"] = os.path.abspath(item["path"])
+        logger.info("using archive index database %s", item["path"])
+
+    with ArchiveIndex(
+        _config["locales"],
+        _config["default_locale"],
+        _config["archive_index_data"],
+    ) as archive_index:
+        return aidb_snapshot.export_snapshot(
+            archive_index, os.path.abspath(output_dir), snapshot_format
         )
-        logger.info("running")
-        builder.build_database()
-        connection.commit()
@@ -4,9 +4,53 @@ Fetch parameters from CBM-CFS3 archive index databases.
 
 # Modules #
 import os
+import json
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from cbm_defaults import access_db
-from sqlalchemy import text
+from cbm_defaults import build_profiler
+from cbm_defaults.query_stats import QueryRecord
+from cbm_defaults.query_stats import QueryStats
+from cbm_defaults.connection_pool import ConnectionPool
+
+# the maximum number of values bound to a single batched query
+BATCH_CHUNK_SIZE = 250
+
+# the number of rows fetched at a time by the columnar fetch methods
+FETCH_BATCH_SIZE = 50000
+
+# the number of rows fetched at a time by the row iterating query method
+QUERY_FETCH_SIZE = 1000
+
+
+def get_query_dir():
+    """Gets the directory containing the archive index queries packaged with
+    cbm_defaults
+
+    Returns:
+        str: the 'archive_index_queries' directory
+    """
+    local_dir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(local_dir, "archive_index_queries")
+
+
+def _append_array(array, n_rows, values):
+    """copy values into array after its first n_rows rows, and return the
+    array, which is grown, and its dtype promoted, as needed. Arrays are
+    grown in place where possible, with extra capacity so that they are
+    only reallocated a few times.
+    """
+    dtype = np.result_type(array, values)
+    if dtype != array.dtype:
+        array = array.astype(dtype)
+    end = n_rows + len(values)
+    if end > len(array):
+        array.resize(max(end, len(array) * 3 // 2), refcheck=False)
+    array[n_rows:end] = values
+    return array
 
 
 ###############################################################################
@@ -36,15 +80,90 @@ class ArchiveIndex:
                          "path": "/ArchiveIndex_Beta_Install.mdb"},
                         {"locale": "fr-CA",
                          "path": "/ArchiveIndex_Beta_Install_fr.mdb"}]
+
+        max_connections (int, optional): the maximum number of open
+            connections kept for each archive index database. Connections
+            are reused across queries until :py:meth:`close` is called, or
+            the instance is exited when used as a context manager. The
+            generators returned by :py:meth:`query` and
+            :py:meth:`iter_parameters_arrays` hold a connection until they
+            are exhausted or closed, and queries wait for a connection when
+            all of them are held, so this must be at least the number of
+            threads querying concurrently, plus one for a thread running a
+            query while it holds another. Defaults to 2.
+        max_workers (int, optional): the number of threads used by
+            :py:meth:`get_localized_parameters` to query the archive index
+            databases of several locales concurrently. If unspecified the
+            locales are queried one after another. Defaults to None.
+        slow_query_threshold (float, optional): queries taking at least
+            this many seconds, including the time to get a connection, are
+            logged as slow queries. See :py:attr:`query_stats`. Defaults to
+            None.
     """
 
-    def __init__(self, locales, default_locale, archive_index_data):
+    def __init__(
+        self,
+        locales,
+        default_locale,
+        archive_index_data,
+        max_connections=2,
+        max_workers=None,
+        slow_query_threshold=None,
+    ):
         self.locales = locales
         self.default_locale = default_locale
         self.archive_index_data = archive_index_data
         self.paths_by_locale = {
             x["locale"]: x["path"] for x in archive_index_data
         }
+        self._pool = ConnectionPool(self._connect, max_connections)
+        self.max_workers = max_workers
+        # the statistics of every query run by this instance
+        self.query_stats = QueryStats(slow_query_threshold)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _connect(self, path):
+        return access_db.connect(path)
+
+    def _prepare_sql(self, sql):
+        """hook for backends that need to rewrite the MS-ACCESS queries"""
+        return sql
+
+    def close(self):
+        """Close all pooled archive index database connections."""
+        self._pool.close()
+
+    def get_connection_stats(self):
+        """Gets counters for the connections opened and reused by this
+        instance.
+
+        Returns:
+            dict: the number of connections "opened", "reused" and currently
+                "idle"
+        """
+        return self._pool.get_stats()
+
+    def _record_query(
+        self, name, sql, params, locale, rows, connect_time, query_time
+    ):
+        if name is None:
+            name = " ".join(sql.split())[:60]
+        self.query_stats.add(
+            QueryRecord(
+                name,
+                locale or self.default_locale,
+                len(params) if params else 0,
+                rows,
+                connect_time,
+                query_time,
+            )
+        )
+        build_profiler.record_query(query_time, rows)
 
     def _get_path(self, locale):
         path = None
@@ -60,14 +179,17 @@ class ArchiveIndex:
         table in the database
         """
         path = self._get_path(locale)
-        with access_db.get_connection(path) as connection:
+        with self._pool.connection(path) as connection:
             cursor = connection.cursor()
-            for row in cursor.tables():
-                if row.table_name.lower() == tableName.lower():
-                    return True
-            return False
+            try:
+                for row in cursor.tables():
+                    if row.table_name.lower() == tableName.lower():
+                        return True
+                return False
+            finally:
+                cursor.close()
 
-    def query(self, sql, params=None, locale=None):
+    def query(self, sql, params=None, locale=None, name=None):
         """Query the archive index database.
 
         Args:
@@ -76,17 +198,90 @@ class ArchiveIndex:
                 query. Defaults to None.
             locale (str, optional): Locale code (ex. "en-CA"). If unspecified
                 the class arg "default_locale" is used. Defaults to None.
+            name (str, optional): the name of the query in the query
+                statistics. If unspecified, the start of the sql is used.
+                Defaults to None.
+
+        Yields:
+            row: the result rows, with their columns as attributes. The
+                generator holds a pooled connection until it is exhausted
+                or closed, see the max_connections class arg.
         """
+        prepared_sql = self._prepare_sql(sql)
         path = self._get_path(locale)
-        with access_db.get_connection(path) as connection:
-            for row in access_db.query_db(connection, sql, params):
-                yield row
+        start = time.perf_counter()
+        with self._pool.connection(path) as connection:
+            connect_time = time.perf_counter() - start
+            start = time.perf_counter()
+            cursor = access_db.query_db(connection, prepared_sql, params)
+            elapsed = time.perf_counter() - start
+            row_count = 0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    rows = cursor.fetchmany(QUERY_FETCH_SIZE)
+                    elapsed += time.perf_counter() - start
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    yield from rows
+            finally:
+                cursor.close()
+                self._record_query(
+                    name,
+                    sql,
+                    params,
+                    locale,
+                    row_count,
+                    connect_time,
+                    elapsed,
+                )
+
+    def query_df(self, sql, params=None, locale=None, name=None):
+        """Query the archive index database, and return the result as a
+        dataframe.
+
+        Args:
+            sql (str): an MS-ACCESS query
+            params (iterable, optional): query parameters for the specified
+                query. Defaults to None.
+            locale (str, optional): Locale code (ex. "en-CA"). If unspecified
+                the class arg "default_locale" is used. Defaults to None.
+            name (str, optional): the name of the query in the query
+                statistics. If unspecified, the start of the sql is used.
+                Defaults to None.
+
+        Returns:
+            pd.DataFrame: a dataframe storing the query result
+        """
+        prepared_sql = self._prepare_sql(sql)
+        path = self._get_path(locale)
+        start = time.perf_counter()
+        with self._pool.connection(path) as connection:
+            connect_time = time.perf_counter() - start
+            start = time.perf_counter()
+            cursor = access_db.query_db(connection, prepared_sql, params)
+            try:
+                rows = [tuple(row) for row in cursor.fetchall()]
+                self._record_query(
+                    name,
+                    sql,
+                    params,
+                    locale,
+                    len(rows),
+                    connect_time,
+                    time.perf_counter() - start,
+                )
+                return pd.DataFrame.from_records(
+                    rows,
+                    columns=[x[0] for x in cursor.description],
+                    coerce_float=True,
+                )
+            finally:
+                cursor.close()
 
     def _read_sql_file(self, name):
-        local_dir = os.path.dirname(os.path.realpath(__file__))
-        local_file = os.path.join(
-            local_dir, "archive_index_queries", f"{name}.sql"
-        )
+        local_file = os.path.join(get_query_dir(), f"{name}.sql")
         with open(local_file, "r") as sql_file:
             return sql_file.read()
 
@@ -103,7 +298,212 @@ class ArchiveIndex:
             iterable: rows which are the result of the query
         """
         sql = self._read_sql_file(name)
-        return self.query(sql, params, locale)
+        return self.query(sql, params, locale, name)
+
+    def get_localized_parameters(self, name, locales, params=None):
+        """Load data from the Archive Index Database of each of the specified
+        locales using an SQL query file included in this submodule, under
+        'archive_index_queries'.
+
+        When the class arg "max_workers" is set, the locales are queried
+        concurrently. In all cases, the results are fully fetched and
+        returned in the order of the specified locales.
+
+        Args:
+            name (str): name of the file containing the query to run
+            locales (list): list of dictionaries containing locale
+                information, each with at least the key "code"
+            params (iterable, optional): query parameters. Defaults to None.
+
+        Returns:
+            list: list of (locale, rows) pairs, where locale is the locale
+                dictionary and rows is the list of result rows
+        """
+
+        def fetch(locale):
+            return list(self.get_parameters(name, params, locale["code"]))
+
+        if self.max_workers and self.max_workers > 1 and len(locales) > 1:
+            with ThreadPoolExecutor(self.max_workers) as executor:
+                # run each query in a copy of the calling context, so that
+                # it is attributed to the calling build step when profiling
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run, fetch, locale
+                    )
+                    for locale in locales
+                ]
+                results = [future.result() for future in futures]
+        else:
+            results = [fetch(locale) for locale in locales]
+        return list(zip(locales, results))
+
+    def get_parameters_batched(
+        self, name, key, values, locale=None, chunk_size=BATCH_CHUNK_SIZE
+    ):
+        """Load data for many key values at once from the Archive Index
+        Database using an SQL query file included in this submodule, under
+        'archive_index_queries'.
+
+        The query file must contain the placeholder ``{params}`` inside an
+        ``IN (...)`` clause, which is replaced with one query parameter per
+        key value. Key values are queried in chunks of at most *chunk_size*
+        values, so that a single query is run when there are fewer values
+        than the chunk size.
+
+        Args:
+            name (str): name of the file containing the query to run
+            key (str): name of the result column containing the key value
+                of each row
+            values (iterable): the key values to query
+            locale (str, optional): locale code. Defaults to None.
+            chunk_size (int, optional): the maximum number of key values per
+                query. Defaults to BATCH_CHUNK_SIZE.
+
+        Returns:
+            dict: the result rows grouped by key value, in the order of the
+                specified values. Key values with no matching rows are
+                mapped to an empty list.
+        """
+        sql = self._read_sql_file(name)
+        result = {value: [] for value in values}
+        unique_values = list(result.keys())
+        for start in range(0, len(unique_values), chunk_size):
+            chunk = unique_values[start:start + chunk_size]
+            chunk_sql = sql.replace("{params}", ",".join(["?"] * len(chunk)))
+            for row in self.query(chunk_sql, chunk, locale, name):
+                result[getattr(row, key)].append(row)
+        return result
+
+    def _read_dtypes(self, name):
+        local_file = os.path.join(get_query_dir(), f"{name}.json")
+        if not os.path.exists(local_file):
+            return {}
+        with open(local_file, "r") as json_file:
+            return json.load(json_file)["dtypes"]
+
+    def iter_parameters_arrays(
+        self, name, params=None, locale=None, batch_size=FETCH_BATCH_SIZE
+    ):
+        """Load data from the Archive Index Database using an SQL query file
+        included in this submodule, under 'archive_index_queries', yielding
+        the result in column oriented batches.
+
+        Column dtypes are declared in an optional json file stored alongside
+        the query file, with the same name, for example::
+
+            {"dtypes": {"DMID": "int32", "Proportion": "float64"}}
+
+        Columns without a declared dtype are converted with numpy's dtype
+        inference. Columns with a declared integer dtype must not contain
+        null values.
+
+        Args:
+            name (str): name of the file containing the query to run
+            params (iterable, optional): query parameters. Defaults to None.
+            locale (str, optional): locale code. Defaults to None.
+            batch_size (int, optional): the maximum number of rows fetched
+                and yielded at a time. Defaults to FETCH_BATCH_SIZE.
+
+        Yields:
+            dict: a batch of rows as a dictionary of column name to
+                numpy array. At least one, possibly empty, batch is yielded.
+                The generator holds a pooled connection until it is
+                exhausted or closed, see the max_connections class arg.
+        """
+        sql = self._prepare_sql(self._read_sql_file(name))
+        dtypes = self._read_dtypes(name)
+        path = self._get_path(locale)
+        start = time.perf_counter()
+        with self._pool.connection(path) as connection:
+            connect_time = time.perf_counter() - start
+            start = time.perf_counter()
+            cursor = access_db.query_db(connection, sql, params)
+            elapsed = time.perf_counter() - start
+            row_count = 0
+            try:
+                columns = [x[0] for x in cursor.description]
+                empty = True
+                while True:
+                    start = time.perf_counter()
+                    rows = cursor.fetchmany(batch_size)
+                    elapsed += time.perf_counter() - start
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    empty = False
+                    yield {
+                        column: np.array(values, dtype=dtypes.get(column))
+                        for column, values in zip(columns, zip(*rows))
+                    }
+                    del rows
+                if empty:
+                    yield {
+                        column: np.array([], dtype=dtypes.get(column))
+                        for column in columns
+                    }
+            finally:
+                cursor.close()
+                self._record_query(
+                    name,
+                    sql,
+                    params,
+                    locale,
+                    row_count,
+                    connect_time,
+                    elapsed,
+                )
+
+    def get_parameters_arrays(
+        self,
+        name,
+        params=None,
+        locale=None,
+        batch_size=FETCH_BATCH_SIZE,
+        as_arrow=False,
+    ):
+        """Load data from the Archive Index Database using an SQL query file
+        included in this submodule, under 'archive_index_queries', as typed
+        columns rather than rows. See :py:meth:`iter_parameters_arrays`.
+
+        Args:
+            name (str): name of the file containing the query to run
+            params (iterable, optional): query parameters. Defaults to None.
+            locale (str, optional): locale code. Defaults to None.
+            batch_size (int, optional): the number of rows fetched at a
+                time. Defaults to FETCH_BATCH_SIZE.
+            as_arrow (bool, optional): if set to True, return a
+                pyarrow.Table (requires the pyarrow package). Defaults to
+                False.
+
+        Returns:
+            dict or pyarrow.Table: dictionary of column name to numpy array,
+                or a pyarrow.Table if as_arrow is True
+        """
+        # batches are appended to growing arrays and dropped as they are
+        # fetched, rather than concatenated once all of them are fetched,
+        # which would need twice the memory of the result
+        arrays = None
+        n_rows = 0
+        for batch in self.iter_parameters_arrays(
+            name, params, locale, batch_size
+        ):
+            if arrays is None:
+                arrays = {k: v.copy() for k, v in batch.items()}
+            else:
+                arrays = {
+                    column: _append_array(array, n_rows, batch[column])
+                    for column, array in arrays.items()
+                }
+            n_rows += len(next(iter(batch.values()), ()))
+            del batch
+        for array in arrays.values():
+            array.resize(n_rows, refcheck=False)
+        if as_arrow:
+            import pyarrow
+
+            return pyarrow.Table.from_pydict(arrays)
+        return arrays
 
     def get_parameters_df(self, name, params=None, locale=None):
         """Load data from the Archive Index Database using an SQL query file
@@ -118,7 +518,4 @@ class ArchiveIndex:
             pd.DataFrame: a dataframe storing the query result
         """
         sql = self._read_sql_file(name)
-        path = self._get_path(locale)
-        with access_db.get_engine(path) as engine:
-            with engine.begin() as con:
-                return pd.read_sql(text(sql), con, params=params)
+        return self.query_df(sql, params, locale, name)
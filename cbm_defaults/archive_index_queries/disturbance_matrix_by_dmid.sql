@@ -0,0 +1,7 @@
+SELECT
+tblDMValuesLookup.DMID,
+tblDMValuesLookup.DMRow,
+tblDMValuesLookup.DMColumn,
+tblDMValuesLookup.Proportion
+FROM tblDMValuesLookup
+ORDER BY tblDMValuesLookup.DMID
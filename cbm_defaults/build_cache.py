@@ -0,0 +1,193 @@
+"""
+A local cache of built cbm_defaults databases, keyed by a fingerprint of
+everything a build depends on, so that identical builds are only run once.
+
+The cache is keyed on the content of the built database, not its bytes:
+options which only change how a database is built, such as
+"build_workers" or "fast_build", are not part of the key. A cached
+database therefore has the same tables and rows as a fresh build of the
+same inputs, but may not be byte-identical to it, since the pages of
+tables written concurrently are laid out in the order their rows were
+inserted. Only fast builds, which are written with VACUUM INTO, are
+byte-for-byte reproducible.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import functools
+import importlib.metadata
+from cbm_defaults import helper
+from cbm_defaults import build_manifest
+
+logger = helper.get_logger()
+
+# the config options which affect the content of the built database. See
+# the module documentation.
+CONFIG_KEYS = [
+    "locales",
+    "default_locale",
+    "deduplicate_parameters",
+    "deduplicate_disturbance_matrices",
+    "lookup_tables",
+]
+
+
+def _hash_files(root_dir, extensions=None):
+    """hash the relative path and content of every file under root_dir"""
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames[:] = sorted(x for x in dirnames if x != "__pycache__")
+        for filename in sorted(filenames):
+            if extensions and os.path.splitext(filename)[1] not in extensions:
+                continue
+            path = os.path.join(dirpath, filename)
+            relpath = os.path.relpath(path, root_dir).replace(os.sep, "/")
+            digest.update(relpath.encode("utf8"))
+            digest.update(build_manifest.hash_file(path).encode("utf8"))
+    return digest.hexdigest()
+
+
+# the extensions of the package files which are part of its fingerprint
+PACKAGE_EXTENSIONS = {".py", ".csv", ".sql", ".json", ".ddl"}
+
+
+@functools.lru_cache(maxsize=None)
+def get_package_fingerprint():
+    """Get a hash identifying the installed cbm_defaults package: its
+    version, and the content of its source files, packaged csv tables,
+    queries and schema. It is computed once per process.
+
+    Returns:
+        str: the hexadecimal digest
+    """
+    try:
+        version = importlib.metadata.version("cbm_defaults")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    package_dir = os.path.dirname(os.path.realpath(__file__))
+    source_hash = _hash_files(package_dir, PACKAGE_EXTENSIONS)
+    return hashlib.sha256(f"{version}:{source_hash}".encode()).hexdigest()
+
+
+def get_cache_key(config):
+    """Get the cache key of a build: a hash of the config options affecting
+    the content of the output, of the archive index databases (or
+    snapshot), and of the cbm_defaults package.
+
+    Args:
+        config (dict): a build configuration, see
+            :py:func:`cbm_defaults.app.run`
+
+    Returns:
+        str: the hexadecimal digest
+    """
+    key = {k: config.get(k) for k in CONFIG_KEYS}
+    if config.get("archive_index_snapshot"):
+        key["archive_index_snapshot"] = _hash_files(
+            config["archive_index_snapshot"]
+        )
+    else:
+        key["archive_index_data"] = [
+            [item["locale"], build_manifest.hash_file(item["path"])]
+            for item in config["archive_index_data"]
+        ]
+    key["package"] = get_package_fingerprint()
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True).encode("utf8")
+    ).hexdigest()
+
+
+###############################################################################
+class BuildCache:
+    """A directory of built databases named by their cache key. When the
+    total size of the cached databases exceeds the size limit, the least
+    recently used ones are removed.
+
+    Args:
+        cache_dir (str): the cache directory, created if it does not exist
+        max_size (int, optional): the maximum total size, in bytes, of the
+            cached databases. If unspecified the size is not limited.
+        hardlink (bool, optional): if set to True, cache hits are hard
+            linked to the output path rather than copied, where possible.
+            Modifying a hard linked output modifies the cached database.
+            Defaults to False.
+    """
+
+    def __init__(self, cache_dir, max_size=None, hardlink=False):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hardlink = hardlink
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.db")
+
+    def get(self, key, output_path):
+        """Copy the database cached under key to output_path.
+
+        Args:
+            key (str): a key returned by :py:func:`get_cache_key`
+            output_path (str): path to which the database is written. It
+                must not exist.
+
+        Returns:
+            bool: True if the key was in the cache, otherwise False
+        """
+        path = self._get_path(key)
+        if not os.path.exists(path):
+            return False
+        # mark the entry as recently used
+        os.utime(path)
+        if self.hardlink:
+            try:
+                os.link(path, output_path)
+                return True
+            except OSError:
+                logger.info("hard link failed, copying %s", path)
+        shutil.copyfile(path, output_path)
+        return True
+
+    def put(self, key, path):
+        """Store a copy of the database at the specified path under key, then
+        evict the least recently used entries above the size limit.
+
+        Args:
+            key (str): a key returned by :py:func:`get_cache_key`
+            path (str): path to a built database
+        """
+        cache_path = self._get_path(key)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, cache_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Remove the least recently used databases until the total size
+        of the cache is within the size limit.
+
+        Args:
+            keep (str, optional): a key which is never evicted
+        """
+        if self.max_size is None:
+            return
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".db"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, filename))
+            entries.append((stat.st_mtime, stat.st_size, filename))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if filename == f"{keep}.db":
+                continue
+            logger.info("evicting %s from the build cache", filename)
+            os.remove(os.path.join(self.cache_dir, filename))
+            total_size -= size
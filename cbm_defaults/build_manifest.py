@@ -0,0 +1,252 @@
+"""
+Content hashes of the inputs of a cbm_defaults database build, stored in the
+``build_manifest`` table of the output database, which are used to rebuild
+only the tables whose inputs changed.
+
+Inputs are named as follows:
+
+    * ``schema``: the DDL file
+    * ``config``: the build options which affect every table
+    * ``query/<name>``: a packaged archive index query
+    * ``csv/<file name>``: a packaged csv table
+    * ``aidb/<locale code>/<table>``: the content of an archive index table
+"""
+
+import os
+import json
+import hashlib
+from cbm_defaults import helper
+from cbm_defaults import schema
+from cbm_defaults import local_csv_table
+from cbm_defaults import aidb_snapshot
+from cbm_defaults.archive_index import get_query_dir
+
+logger = helper.get_logger()
+
+MANIFEST_TABLE = "build_manifest"
+
+# inputs which, when changed, require a build from scratch
+GLOBAL_INPUTS = ["schema", "config"]
+
+ABSENT = "absent"
+
+
+def get_input_names(
+    locales,
+    default_locale,
+    queries=(),
+    localized_queries=(),
+    csv_files=(),
+    localized_csv_files=(),
+):
+    """Get the names of the inputs of a build step. The archive index
+    inputs are the tables referenced by the queries of the step, so that
+    steps which may run one of several queries on the same tables, such as
+    the chunked and unchunked disturbance matrix queries, have the same
+    inputs whichever query is run.
+
+    Args:
+        locales (list): list of dictionaries containing locale information
+        default_locale (str): code of the default locale
+        queries (iterable, optional): names of the archive index queries
+            run by the step against the default locale
+        localized_queries (iterable, optional): names of the archive index
+            queries run by the step against every locale
+        csv_files (iterable, optional): names of the packaged csv tables
+            read by the step
+        localized_csv_files (iterable, optional): names of the packaged
+            csv tables whose translations, for every locale, are read by the
+            step
+
+    Returns:
+        list: the input names
+    """
+    names = []
+    tables = []
+    for query_locales, step_queries in [
+        ([default_locale], queries),
+        ([locale["code"] for locale in locales], localized_queries),
+    ]:
+        for query in step_queries:
+            names.append(f"query/{query}")
+            tables.extend(
+                f"aidb/{locale_code}/{table}"
+                for table in aidb_snapshot.get_query_tables(query)
+                for locale_code in query_locales
+            )
+    names.extend(sorted(set(tables)))
+    names.extend(f"csv/{csv_file}" for csv_file in csv_files)
+    for csv_file in localized_csv_files:
+        names.extend(
+            "csv/" + local_csv_table.get_localized_csv_file_path(
+                csv_file, locale["code"]
+            )
+            for locale in locales
+        )
+    return list(dict.fromkeys(names))
+
+
+def hash_file(path):
+    """Get the sha256 hash of the content of a file, or "absent" if the file
+    does not exist.
+
+    Args:
+        path (str): path to the file
+
+    Returns:
+        str: the hexadecimal digest
+    """
+    if not os.path.exists(path):
+        return ABSENT
+    digest = hashlib.sha256()
+    with open(path, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_rows(rows):
+    """Get a hash of an iterable of rows which does not depend on the order
+    of the rows: the sum of the sha256 hashes of the rows, modulo 2 ** 256,
+    combined with the row count.
+
+    Args:
+        rows (iterable): rows, each an iterable of values
+
+    Returns:
+        str: the hexadecimal digest
+    """
+    total = 0
+    count = 0
+    for row in rows:
+        row_digest = hashlib.sha256(repr(tuple(row)).encode("utf8"))
+        total = (total + int.from_bytes(row_digest.digest(), "big")) % (
+            1 << 256
+        )
+        count += 1
+    return hashlib.sha256(f"{count}:{total:064x}".encode()).hexdigest()
+
+
+def hash_config(config):
+    """Get the sha256 hash of a json serializable build configuration.
+
+    Args:
+        config (dict): the options of a build which affect every table
+
+    Returns:
+        str: the hexadecimal digest
+    """
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True).encode("utf8")
+    ).hexdigest()
+
+
+def get_input_hashes(archive_index, names, config):
+    """Compute the content hash of each named input.
+
+    Args:
+        archive_index (cbm_defaults.archive_index.ArchiveIndex): the
+            archive index read by the build
+        names (iterable): input names, see :py:func:`get_input_names`
+        config (dict): the options of the build which affect every table
+
+    Returns:
+        dict: the hash of each input, by name
+    """
+    hashes = {
+        "schema": hash_file(schema.get_ddl_path()),
+        "config": hash_config(config),
+    }
+    for name in names:
+        if name in hashes:
+            continue
+        kind, _, key = name.partition("/")
+        if kind == "query":
+            hashes[name] = hash_file(
+                os.path.join(get_query_dir(), f"{key}.sql")
+            )
+        elif kind == "csv":
+            hashes[name] = hash_file(
+                os.path.join(local_csv_table.get_tables_dir(), key)
+            )
+        elif kind == "aidb":
+            locale, _, table = key.partition("/")
+            if archive_index.table_exists(table, locale):
+                hashes[name] = hash_rows(
+                    archive_index.query(f"SELECT * FROM {table}", None, locale)
+                )
+            else:
+                hashes[name] = ABSENT
+        else:
+            raise ValueError(f"unknown input {name}")
+    return hashes
+
+
+def read_manifest(connection):
+    """Read the input hashes recorded in the connected database.
+
+    Args:
+        connection (sqlite3.Connection): a connection to a cbm_defaults
+            database
+
+    Returns:
+        dict: the hash of each input, by name, or None if the database has
+            no manifest
+    """
+    exists = connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (MANIFEST_TABLE,),
+    ).fetchone()[0]
+    if not exists:
+        return None
+    return dict(
+        connection.execute(f"SELECT name, hash FROM {MANIFEST_TABLE}")
+    )
+
+
+def write_manifest(connection, hashes):
+    """Replace the input hashes recorded in the connected database.
+
+    Args:
+        connection (sqlite3.Connection): a connection to a cbm_defaults
+            database
+        hashes (dict): the hash of each input, by name
+    """
+    connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} ("
+        "name TEXT NOT NULL PRIMARY KEY, hash TEXT NOT NULL)"
+    )
+    connection.execute(f"DELETE FROM {MANIFEST_TABLE}")
+    connection.executemany(
+        f"INSERT INTO {MANIFEST_TABLE} (name, hash) VALUES (?, ?)",
+        sorted(hashes.items()),
+    )
+
+
+def get_changed_steps(steps, dependencies, old_hashes, new_hashes):
+    """Find the build steps which must run again because one of their
+    inputs changed, or because they depend on such a step.
+
+    Args:
+        steps (list): list of :py:class:`cbm_defaults.build_scheduler.
+            BuildStep`, in dependency order, with their inputs
+        dependencies (dict): see
+            :py:func:`cbm_defaults.build_scheduler.get_dependencies`
+        old_hashes (dict): the input hashes recorded by the previous build,
+            or None if there is no previous build
+        new_hashes (dict): the current input hashes
+
+    Returns:
+        list: the names of the steps to run, in dependency order
+    """
+    if old_hashes is None or any(
+        old_hashes.get(name) != new_hashes[name] for name in GLOBAL_INPUTS
+    ):
+        return [step.name for step in steps]
+    changed = set()
+    for step in steps:
+        if dependencies[step.name] & changed or any(
+            old_hashes.get(name) != new_hashes[name] for name in step.inputs
+        ):
+            changed.add(step.name)
+    return [step.name for step in steps if step.name in changed]
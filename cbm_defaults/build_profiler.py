@@ -0,0 +1,205 @@
+"""
+Per-step performance profiling of a cbm_defaults database build.
+
+While a step runs, the time spent and rows read by archive index queries,
+the time spent and rows written by database inserts, and the time spent
+waiting for other steps to finish writing to the shared output database,
+are attributed to it by calls to :py:func:`record_query`,
+:py:func:`record_write` and :py:func:`acquire_write_lock`. The remainder of
+the step's wall time is spent transforming data in python.
+"""
+
+import time
+import json
+import threading
+import contextlib
+import contextvars
+import tracemalloc
+
+_current_step = contextvars.ContextVar("build_step_profile", default=None)
+
+
+def record_query(seconds, rows):
+    """Attribute an archive index query to the step being profiled in the
+    current context, if any.
+
+    Args:
+        seconds (float): time spent running the query and fetching rows
+        rows (int): the number of rows fetched
+    """
+    profile = _current_step.get()
+    if profile is not None:
+        profile.add(query_time=seconds, queries=1, rows_read=rows)
+
+
+def record_write(seconds, rows):
+    """Attribute an insert into the output database to the step being
+    profiled in the current context, if any.
+
+    Args:
+        seconds (float): time spent inserting the rows
+        rows (int): the number of rows inserted
+    """
+    profile = _current_step.get()
+    if profile is not None:
+        profile.add(write_time=seconds, rows_written=rows)
+
+
+@contextlib.contextmanager
+def acquire_write_lock(lock):
+    """Hold the lock serializing writes to the output database within this
+    context, attributing the time spent waiting for it to the step being
+    profiled in the current context, if any.
+
+    Args:
+        lock (threading.Lock): the write lock, or any context manager
+    """
+    start = time.perf_counter()
+    with lock:
+        profile = _current_step.get()
+        if profile is not None:
+            profile.add(write_wait_time=time.perf_counter() - start)
+        yield
+
+
+###############################################################################
+class StepProfile:
+    """Counters for a single build step"""
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.query_time = 0.0
+        self.write_time = 0.0
+        self.write_wait_time = 0.0
+        self.queries = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.peak_memory = None
+        self._lock = threading.Lock()
+
+    def add(self, **kwargs):
+        """Add to the specified counters"""
+        with self._lock:
+            for name, value in kwargs.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self):
+        """Get the counters as a json serializable dictionary. The
+        "transform_time" is the wall time not spent in queries, writes or
+        waiting for the write lock.
+        """
+        return {
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "query_time": self.query_time,
+            "write_time": self.write_time,
+            "write_wait_time": self.write_wait_time,
+            "transform_time": max(
+                0.0,
+                self.wall_time
+                - self.query_time
+                - self.write_time
+                - self.write_wait_time,
+            ),
+            "queries": self.queries,
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "peak_memory": self.peak_memory,
+        }
+
+
+###############################################################################
+class BuildProfiler:
+    """Collects a :py:class:`StepProfile` for each step of a build.
+
+    Args:
+        trace_memory (bool, optional): if set to True, the peak memory
+            allocated by python while each step runs is measured with
+            tracemalloc, which slows the build down. When steps run
+            concurrently, the peak of a step includes the memory allocated
+            by the steps running alongside it. Defaults to False.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.steps = []
+        self.critical_path = []
+
+    @contextlib.contextmanager
+    def build(self):
+        """Profile the build run within this context, tracing memory
+        allocations if trace_memory is set. Steps of the build are profiled
+        with :py:meth:`step`.
+        """
+        started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        try:
+            yield self
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """Profile the step run within this context.
+
+        Args:
+            name (str): the name of the step
+        """
+        profile = StepProfile(name)
+        self.steps.append(profile)
+        token = _current_step.set(profile)
+        trace_memory = self.trace_memory and tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.wall_time = time.perf_counter() - start
+            if trace_memory:
+                profile.peak_memory = tracemalloc.get_traced_memory()[1]
+            _current_step.reset(token)
+
+    def get_report(self):
+        """Get the profile of each step, and the totals, as a json
+        serializable dictionary.
+
+        Returns:
+            dict: the report
+        """
+        steps = [profile.to_dict() for profile in self.steps]
+        totals = {
+            key: sum(step[key] for step in steps)
+            for key in [
+                "wall_time",
+                "query_time",
+                "write_time",
+                "write_wait_time",
+                "transform_time",
+                "queries",
+                "rows_read",
+                "rows_written",
+            ]
+        }
+        return {
+            "steps": steps,
+            "totals": totals,
+            "critical_path": list(self.critical_path),
+        }
+
+    def write_report(self, path, **extra):
+        """Write the report returned by :py:meth:`get_report` to a json
+        file.
+
+        Args:
+            path (str): path of the json file
+            extra: json serializable entries added to the report
+        """
+        report = self.get_report()
+        report.update(extra)
+        with open(path, "w") as report_file:
+            json.dump(report, report_file, indent=4)
@@ -0,0 +1,167 @@
+"""
+Dependency-aware scheduling of the steps of a cbm_defaults database build.
+Each step declares the tables it reads and writes, and steps which do not
+depend on each other can run concurrently.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+from cbm_defaults import helper
+
+logger = helper.get_logger()
+
+
+###############################################################################
+class BuildStep:
+    """A unit of work in a database build.
+
+    Args:
+        name (str): the name of the step, shown in the build log
+        func (callable): function, taking no arguments, which runs the step
+        reads (iterable, optional): names of the output database tables the
+            step depends on, including the tables referenced by foreign keys
+            in the tables it writes.
+        writes (iterable, optional): names of the output database tables
+            the step writes to.
+        inputs (iterable, optional): names of the inputs of the step, see
+            :py:mod:`cbm_defaults.build_manifest`
+    """
+
+    def __init__(self, name, func, reads=(), writes=(), inputs=()):
+        self.name = name
+        self.func = func
+        self.reads = frozenset(reads)
+        self.writes = frozenset(writes)
+        self.inputs = tuple(inputs)
+
+    def __repr__(self):
+        return f"BuildStep({self.name!r})"
+
+
+def get_dependencies(steps):
+    """Find the steps that each step must wait for. A step depends on every
+    earlier step that writes a table it reads or writes, and on every
+    earlier step that reads a table it writes.
+
+    Args:
+        steps (list): list of :py:class:`BuildStep`, in an order where every
+            step comes after the steps it depends on
+
+    Returns:
+        dict: the names of the steps that each step, by name, depends on
+    """
+    dependencies = {}
+    for index, step in enumerate(steps):
+        dependencies[step.name] = {
+            previous.name
+            for previous in steps[:index]
+            if previous.writes & (step.reads | step.writes)
+            or previous.reads & step.writes
+        }
+    return dependencies
+
+
+def get_critical_path(steps, dependencies, durations):
+    """Find the chain of dependent steps with the longest total duration,
+    which bounds the wall clock time of a build with unlimited workers.
+
+    Args:
+        steps (list): list of :py:class:`BuildStep`, in dependency order
+        dependencies (dict): see :py:func:`get_dependencies`
+        durations (dict): the duration in seconds of each step, by name
+
+    Returns:
+        list: the names of the steps on the critical path, in order
+    """
+    path_time = {}
+    predecessor = {}
+    for step in steps:
+        previous = max(
+            dependencies[step.name],
+            key=lambda name: path_time[name],
+            default=None,
+        )
+        predecessor[step.name] = previous
+        path_time[step.name] = durations[step.name] + (
+            path_time[previous] if previous else 0.0
+        )
+    if not path_time:
+        return []
+    name = max(path_time, key=path_time.get)
+    path = []
+    while name:
+        path.append(name)
+        name = predecessor[name]
+    return list(reversed(path))
+
+
+def _run_step(step, profiler=None):
+    logger.info(step.name)
+    start = time.perf_counter()
+    if profiler:
+        with profiler.step(step.name):
+            step.func()
+    else:
+        step.func()
+    return time.perf_counter() - start
+
+
+def run_steps(steps, max_workers=None, profiler=None):
+    """Run the specified build steps, then log their durations and the
+    critical path of the build.
+
+    Args:
+        steps (list): list of :py:class:`BuildStep`, in an order where every
+            step comes after the steps it depends on
+        max_workers (int, optional): the number of threads running steps
+            concurrently. If unspecified, or 1, the steps run one after
+            another in the specified order. Defaults to None.
+        profiler (cbm_defaults.build_profiler.BuildProfiler, optional): if
+            specified, each step is profiled, and the critical path of the
+            profile is set. Defaults to None.
+
+    Returns:
+        dict: the duration in seconds of each step, by name
+    """
+    names = [step.name for step in steps]
+    if len(set(names)) != len(names):
+        raise ValueError("build step names must be unique")
+    dependencies = get_dependencies(steps)
+    durations = {}
+    start = time.perf_counter()
+    if not max_workers or max_workers <= 1:
+        for step in steps:
+            durations[step.name] = _run_step(step, profiler)
+    else:
+        pending = list(steps)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                for step in list(pending):
+                    if dependencies[step.name].issubset(durations):
+                        pending.remove(step)
+                        running[executor.submit(
+                            _run_step, step, profiler
+                        )] = step
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    # the executor waits for running steps before an error
+                    # raised here leaves this block
+                    durations[step.name] = future.result()
+    elapsed = time.perf_counter() - start
+
+    critical_path = get_critical_path(steps, dependencies, durations)
+    if profiler:
+        profiler.critical_path = critical_path
+    for name in names:
+        logger.info("%s: %.3fs", name, durations[name])
+    logger.info(
+        "critical path %.3fs of %.3fs elapsed: %s",
+        sum(durations[name] for name in critical_path),
+        elapsed,
+        " -> ".join(critical_path),
+    )
+    return durations
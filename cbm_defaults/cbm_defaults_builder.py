@@ -4,10 +4,20 @@ the CBM-CFS3 archive index database format.
 """
 
 # Modules #
+import time
+import contextlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from cbm_defaults import build_manifest
+from cbm_defaults import build_profiler
+from cbm_defaults import build_scheduler
 from cbm_defaults import cbm_defaults_database
 from cbm_defaults import local_csv_table
 from cbm_defaults import helper
 from cbm_defaults import dm_values_processor
+from cbm_defaults import lookup_tables
+import numpy as np
 import pandas as pd
 logger = helper.get_logger()
 
@@ -57,143 +67,541 @@ class CBMDefaultsBuilder:
             format.
         uncertainty_parameters (bool, Optional): if set to True, uncertainty
             parameters will be included in the resulting database.
+        write_batch_size (int, Optional): the number of rows buffered per
+            table before they are inserted into the database.
+        deduplicate_parameters (bool, Optional): if set to True, identical
+            rows of the stump_parameter, turnover_parameter,
+            spinup_parameter and vol_to_bio_factor tables are inserted once,
+            and shared by all of the rows that reference them.
+        max_workers (int, Optional): the number of threads running build
+            steps concurrently. The connection must then be usable from
+            several threads (``check_same_thread=False``). Writes are made
+            one at a time. If unspecified, the steps run one after another.
+        profile_memory (bool, Optional): if set to True, the peak python
+            memory allocation of each build step is included in the
+            profile of the build, at the cost of a slower build. See
+            :py:attr:`profiler`.
+        dm_chunk_size (int, Optional): if set, disturbance matrix values
+            are read ordered by DMID, this many rows at a time, and each
+            chunk of whole matrices is processed and written before the
+            next is read, which bounds the memory used for them. If
+            unspecified, all of the values are processed at once.
+        dm_workers (int, Optional): if set, the disturbance matrix values
+            are processed by this many worker processes, each processing a
+            partition of the matrices. If unspecified they are processed in
+            the building thread. The worker processes are spawned, so the
+            main module of the program must be importable without side
+            effects, behind an ``if __name__ == "__main__":`` guard.
+        deduplicate_disturbance_matrices (bool, Optional): if set to True,
+            disturbance matrices with exactly the same processed values are
+            stored once, under the lowest of their ids. The
+            disturbance_matrix_alias table maps each of the original ids to
+            the id of the stored matrix, and the associations reference the
+            stored matrices. Only the names of the stored matrices are
+            kept.
+        lookup_tables (bool, Optional): if set to True, the denormalized
+            lookup tables of :py:mod:`cbm_defaults.lookup_tables` are
+            created, with their indexes, once the tables they are joined
+            from are populated.
     """
 
     def __init__(
-        self, connection, locales, archive_index, uncertainty_parameters=False
+        self,
+        connection,
+        locales,
+        archive_index,
+        uncertainty_parameters=False,
+        write_batch_size=cbm_defaults_database.DEFAULT_BATCH_SIZE,
+        deduplicate_parameters=False,
+        max_workers=None,
+        profile_memory=False,
+        dm_chunk_size=None,
+        dm_workers=None,
+        deduplicate_disturbance_matrices=False,
+        lookup_tables=False,
     ):
         self.connection = connection
         self.locales = locales
         self.archive_index = archive_index
         self.uncertainty_parameters = uncertainty_parameters
+        self.write_batch_size = write_batch_size
+        self.deduplicate_parameters = deduplicate_parameters
+        self.max_workers = max_workers
+        self.dm_chunk_size = dm_chunk_size
+        self.dm_workers = dm_workers
+        self.deduplicate_disturbance_matrices = (
+            deduplicate_disturbance_matrices
+        )
+        self.lookup_tables = lookup_tables
+        self._write_lock = threading.Lock()
+        # the per step query, write and transform time of the build
+        self.profiler = build_profiler.BuildProfiler(profile_memory)
         self._get_multi_year_disturbance_info()
 
-    def build_database(self):
+    @contextlib.contextmanager
+    def _record_writers(self, *table_names):
+        """Yield one RecordWriter per table name. Tables must be listed
+        with referenced tables before the tables referencing them: each
+        writer flushes the writers listed before it first.
+        """
+        writers = []
+        for table_name in table_names:
+            writers.append(
+                cbm_defaults_database.RecordWriter(
+                    self.connection,
+                    table_name,
+                    batch_size=self.write_batch_size,
+                    depends_on=list(writers),
+                    lock=self._write_lock,
+                )
+            )
+        yield writers
+        for writer in writers:
+            writer.close()
+
+    def _add_parameter_record(self, writer, parameter_ids, **kwargs):
+        """Add a parameter record with a sequential id, and return the id.
+
+        If deduplicate_parameters is set, records are keyed by their values
+        in parameter_ids, and the id of an identical existing record is
+        returned instead of adding a new one.
+
+        Args:
+            writer (RecordWriter): the writer for the parameter table
+            parameter_ids (dict): the ids of the records added so far to the
+                parameter table
+            kwargs: the column name, row value pairs of the record
+        """
+        key = (
+            tuple(kwargs.items())
+            if self.deduplicate_parameters
+            else len(parameter_ids)
+        )
+        if key not in parameter_ids:
+            parameter_ids[key] = len(parameter_ids) + 1
+            writer.add_record(id=parameter_ids[key], **kwargs)
+        return parameter_ids[key]
+
+    def _get_inputs(
+        self,
+        queries=(),
+        localized_queries=(),
+        csv_files=(),
+        localized_csv_files=(),
+    ):
+        return build_manifest.get_input_names(
+            self.locales,
+            self.archive_index.default_locale,
+            queries,
+            localized_queries,
+            csv_files,
+            localized_csv_files,
+        )
+
+    def get_build_steps(self):
+        """Get the steps run by :py:meth:`build_database`, with the output
+        tables each of them reads and writes, and the inputs each of them
+        uses. The reads include the tables referenced by foreign keys in the
+        written tables. Each step is listed after the steps it depends on.
+
+        Returns:
+            list: list of :py:class:`cbm_defaults.build_scheduler.BuildStep`
+        """
+        steps = [
+            build_scheduler.BuildStep(
+                "populate locale",
+                self._populate_locale,
+                writes=["locale"],
+            ),
+            build_scheduler.BuildStep(
+                "populate pools",
+                self._populate_pools,
+                reads=["locale"],
+                writes=["pool", "dom_pool", "pool_tr"],
+                inputs=self._get_inputs(
+                    csv_files=["pool.csv", "dom_pool.csv"],
+                    localized_csv_files=["pool.csv"],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate decay parameters",
+                self._populate_decay_parameters,
+                reads=["dom_pool"],
+                writes=["decay_parameter"],
+                inputs=self._get_inputs(
+                    queries=["dom_parameters"],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate admin boundaries",
+                self._populate_admin_boundaries,
+                reads=["locale"],
+                writes=[
+                    "stump_parameter",
+                    "admin_boundary",
+                    "admin_boundary_tr",
+                ],
+                inputs=self._get_inputs(
+                    localized_queries=["admin_boundaries"],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate eco boundaries",
+                self._populate_eco_boundaries,
+                reads=["locale"],
+                writes=[
+                    "random_return_interval",
+                    "turnover_parameter",
+                    "eco_boundary",
+                    "eco_boundary_tr",
+                ],
+                inputs=self._get_inputs(
+                    localized_queries=["eco_boundaries"],
+                    csv_files=["uc_random_return_interval_parameters.csv"],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate root parameter",
+                self._populate_root_parameter,
+                writes=["root_parameter"],
+            ),
+            build_scheduler.BuildStep(
+                "populate biomass to carbon rate",
+                self._populate_biomass_to_carbon_rate,
+                writes=["biomass_to_carbon_rate"],
+            ),
+            build_scheduler.BuildStep(
+                "populate slow mixing rate",
+                self._populate_slow_mixing_rate,
+                writes=["slow_mixing_rate"],
+            ),
+            build_scheduler.BuildStep(
+                "populate spatial units",
+                self._populate_spatial_units,
+                reads=["admin_boundary", "eco_boundary", "root_parameter"],
+                writes=["spinup_parameter", "spatial_unit"],
+                inputs=self._get_inputs(
+                    queries=["climate", "spatial_units"],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate species",
+                self._populate_species,
+                reads=["locale"],
+                writes=[
+                    "forest_type",
+                    "genus",
+                    "species",
+                    "forest_type_tr",
+                    "genus_tr",
+                    "species_tr",
+                ],
+                inputs=self._get_inputs(
+                    localized_queries=[
+                        "forest_types",
+                        "genus_types",
+                        "species",
+                    ],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate volume to biomass",
+                self._populate_volume_to_biomass,
+                reads=["spatial_unit", "species", "genus", "forest_type"],
+                writes=[
+                    "vol_to_bio_factor",
+                    "vol_to_bio_species",
+                    "vol_to_bio_genus",
+                    "vol_to_bio_forest_type",
+                ],
+                inputs=self._get_inputs(
+                    queries=[
+                        "vol_to_bio_species",
+                        "vol_to_bio_genus",
+                        "vol_to_bio_forest_type",
+                    ],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate land types",
+                self._populate_land_types,
+                writes=["land_type"],
+                inputs=self._get_inputs(
+                    csv_files=["landtype.csv"],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate land classes",
+                self._populate_land_classes,
+                reads=["land_type", "locale"],
+                writes=["land_class", "land_class_tr"],
+                inputs=self._get_inputs(
+                    csv_files=["landclass.csv"],
+                    localized_csv_files=["landclass.csv"],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate disturbance types",
+                self._populate_disturbance_types,
+                reads=["land_type", "locale"],
+                writes=["disturbance_type", "disturbance_type_tr"],
+                inputs=self._get_inputs(
+                    queries=[
+                        "multi_year_disturbances",
+                        "disturbance_type_landclass_transition",
+                    ],
+                    localized_queries=["disturbance_types"],
+                    csv_files=[
+                        "landtype.csv",
+                        "disturbance_type_land_type.csv",
+                    ],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate disturbance matrix values",
+                self._populate_disturbance_matrix_values,
+                reads=["pool", "locale"],
+                writes=[
+                    "disturbance_matrix",
+                    "disturbance_matrix_value",
+                    "disturbance_matrix_alias",
+                    "disturbance_matrix_tr",
+                ],
+                inputs=self._get_inputs(
+                    queries=[
+                        "multi_year_disturbances",
+                        "disturbance_matrix",
+                        "disturbance_matrix_by_dmid",
+                    ],
+                    localized_queries=["disturbance_matrix_names"],
+                    csv_files=["pool_cross_walk.csv"],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate disturbance matrix associations",
+                self._populate_disturbance_matrix_associations,
+                reads=[
+                    "disturbance_matrix",
+                    "disturbance_matrix_alias",
+                    "disturbance_type",
+                    "spatial_unit",
+                ],
+                writes=["disturbance_matrix_association"],
+                inputs=self._get_inputs(
+                    queries=[
+                        "multi_year_disturbances",
+                        "spatial_unit_dm_associations",
+                        "eco_boundary_dm_associations",
+                    ],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate growth multipliers",
+                self._populate_growth_multipliers,
+                reads=["disturbance_type", "forest_type"],
+                writes=["growth_multiplier_series", "growth_multiplier_value"],
+                inputs=self._get_inputs(
+                    queries=[
+                        "multi_year_disturbances",
+                        "growth_multiplier_disturbance",
+                        "growth_multipliers_batched",
+                    ],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate flux indicators",
+                self._populate_flux_indicators,
+                reads=["pool", "locale"],
+                writes=[
+                    "flux_process",
+                    "flux_indicator",
+                    "flux_indicator_source",
+                    "flux_indicator_sink",
+                    "composite_flux_indicator_category",
+                    "composite_flux_indicator",
+                    "composite_flux_indicator_value",
+                    "composite_flux_indicator_category_tr",
+                    "composite_flux_indicator_tr",
+                ],
+                inputs=self._get_inputs(
+                    csv_files=[
+                        f"{table}.csv"
+                        for table in [
+                            "flux_process",
+                            "flux_indicator",
+                            "flux_indicator_source",
+                            "flux_indicator_sink",
+                            "composite_flux_indicator_category",
+                            "composite_flux_indicator",
+                            "composite_flux_indicator_value",
+                        ]
+                    ],
+                    localized_csv_files=[
+                        "composite_flux_indicator_category.csv",
+                        "composite_flux_indicator.csv",
+                    ],
+                ),
+            ),
+            build_scheduler.BuildStep(
+                "populate afforestation",
+                self._populate_afforestation,
+                reads=["pool", "spatial_unit"],
+                writes=[
+                    "afforestation_pre_type",
+                    "afforestation_initial_pool",
+                    "afforestation_pre_type_tr",
+                ],
+                inputs=self._get_inputs(
+                    queries=["afforestation_pre_type_values"],
+                    localized_queries=["afforestation_pre_types"],
+                    csv_files=["pool.csv"],
+                ),
+            ),
+        ]
+        if self.lookup_tables:
+            steps.append(
+                build_scheduler.BuildStep(
+                    "create lookup tables",
+                    self._create_lookup_tables,
+                    reads=sorted(
+                        set().union(*lookup_tables.LOOKUP_TABLES.values())
+                    ),
+                    writes=list(lookup_tables.LOOKUP_TABLES),
+                )
+            )
+        return steps
+
+    def build_database(self, step_names=None):
         """Populate a cbm_defaults database with data.
-        In effect, run every method of this class one after another.
-        Some tables will be filled with values coming from an
+        In effect, run every method of this class one after another, or
+        concurrently where they do not depend on each other if max_workers
+        is set. Some tables will be filled with values coming from an
         MS Access AIDB, other values are unvarying and simply
-        hardcoded in this class."""
-        all_functions = [
-            self._populate_locale,
-            self._populate_pools,
-            self._populate_decay_parameters,
-            self._populate_admin_boundaries,
-            self._populate_eco_boundaries,
-            self._populate_root_parameter,
-            self._populate_biomass_to_carbon_rate,
-            self._populate_slow_mixing_rate,
-            self._populate_spatial_units,
-            self._populate_species,
-            self._populate_volume_to_biomass,
-            self._populate_land_types,
-            self._populate_land_classes,
-            self._populate_disturbance_types,
-            self._populate_disturbance_matrix_values,
-            self._populate_disturbance_matrix_associations,
-            self._populate_growth_multipliers,
-            self._populate_flux_indicators,
-            self._populate_afforestation,
-        ]
-        for func in all_functions:
-            logger.info(func.__name__.replace("_", " ").strip())
-            func()
+        hardcoded in this class.
 
-    def _populate_locale(self):
-        for locale in self.locales:
-            cbm_defaults_database.add_record(
-                self.connection, "locale", id=locale["id"], code=locale["code"]
-            )
+        Steps never commit: concurrent steps share the connection, so a
+        commit from one step would also commit the rows the other steps
+        had written so far, at points depending on thread timing. The rows
+        of every step are instead committed once, after the last step.
 
-    def _populate_pools(self):
-        for row in local_csv_table.read_csv_file("pool.csv"):
-            cbm_defaults_database.add_record(
-                self.connection, "pool", id=row["id"], code=row["code"]
+        Args:
+            step_names (iterable, optional): if specified, only the build
+                steps with these names are run. The tables read by these
+                steps must already be populated. Defaults to None.
+        """
+        steps = self.get_build_steps()
+        if step_names is not None:
+            step_names = set(step_names)
+            steps = [step for step in steps if step.name in step_names]
+        with self.profiler.build():
+            build_scheduler.run_steps(
+                steps, self.max_workers, self.profiler
             )
+        self.connection.commit()
 
-        for row in local_csv_table.read_csv_file("dom_pool.csv"):
-            cbm_defaults_database.add_record(
-                self.connection,
-                "dom_pool",
-                id=row["id"],
-                pool_id=row["pool_id"],
-            )
+    def _populate_locale(self):
+        with self._record_writers("locale") as (
+            locale_writer,
+        ):
+            for locale in self.locales:
+                locale_writer.add_record(
+                    id=locale["id"], code=locale["code"]
+                )
 
-        pool_tr_id = 1
-        for locale in self.locales:
-            localized_path = local_csv_table.get_localized_csv_file_path(
-                "pool.csv", locale["code"]
-            )
-            for row in local_csv_table.read_csv_file(localized_path):
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "pool_tr",
-                    id=pool_tr_id,
+    def _populate_pools(self):
+        with self._record_writers(
+            "pool",
+            "dom_pool",
+            "pool_tr",
+        ) as (
+            pool_writer,
+            dom_pool_writer,
+            pool_tr_writer,
+        ):
+            for row in local_csv_table.read_csv_file("pool.csv"):
+                pool_writer.add_record(
+                    id=row["id"], code=row["code"]
+                )
+
+            for row in local_csv_table.read_csv_file("dom_pool.csv"):
+                dom_pool_writer.add_record(
+                    id=row["id"],
                     pool_id=row["pool_id"],
-                    locale_id=locale["id"],
-                    name=row["name"],
                 )
-                pool_tr_id += 1
+
+            pool_tr_id = 1
+            for locale in self.locales:
+                localized_path = local_csv_table.get_localized_csv_file_path(
+                    "pool.csv", locale["code"]
+                )
+                for row in local_csv_table.read_csv_file(localized_path):
+                    pool_tr_writer.add_record(
+                        id=pool_tr_id,
+                        pool_id=row["pool_id"],
+                        locale_id=locale["id"],
+                        name=row["name"],
+                    )
+                    pool_tr_id += 1
 
     def _populate_decay_parameters(self):
-        dom_pool_id = 1
-
-        for row in self.archive_index.get_parameters("dom_parameters"):
-            if row.SoilPoolID > 10:
-                break
-            cbm_defaults_database.add_record(
-                self.connection,
-                "decay_parameter",
-                dom_pool_id=dom_pool_id,
-                base_decay_rate=row.OrganicMatterDecayRate,
-                reference_temp=row.ReferenceTemp,
-                q10=row.Q10,
-                prop_to_atmosphere=row.PropToAtmosphere,
-                max_rate=1,
-            )
-            dom_pool_id += 1
+        with self._record_writers("decay_parameter") as (
+            decay_parameter_writer,
+        ):
+            dom_pool_id = 1
+
+            for row in self.archive_index.get_parameters("dom_parameters"):
+                if row.SoilPoolID > 10:
+                    break
+                decay_parameter_writer.add_record(
+                    dom_pool_id=dom_pool_id,
+                    base_decay_rate=row.OrganicMatterDecayRate,
+                    reference_temp=row.ReferenceTemp,
+                    q10=row.Q10,
+                    prop_to_atmosphere=row.PropToAtmosphere,
+                    max_rate=1,
+                )
+                dom_pool_id += 1
 
     def _populate_admin_boundaries(self):
-        """TODO: Could optimize this function by avoiding the repetition
-        of exactly identical stump parameters."""
-        # Initialize parameters #
-        stump_parameter_id = 1
-        # Main loop #
-        for row in self.archive_index.get_parameters("admin_boundaries"):
-            # Stump parameters #
-            cbm_defaults_database.add_record(
-                self.connection,
-                "stump_parameter",
-                id=stump_parameter_id,
-                sw_top_proportion=row.SoftwoodTopProportion,
-                sw_stump_proportion=row.SoftwoodStumpProportion,
-                hw_top_proportion=row.HardwoodTopProportion,
-                hw_stump_proportion=row.HardwoodStumpProportion,
-            )
-            # Admin boundaries #
-            cbm_defaults_database.add_record(
-                self.connection,
-                "admin_boundary",
-                id=row.AdminBoundaryID,
-                stump_parameter_id=stump_parameter_id,
-            )
-            # Increment manually #
-            stump_parameter_id += 1
-        # Translation and different locales #
-        translation_id = 1
-        for locale in self.locales:
-            rows = self.archive_index.get_parameters(
-                "admin_boundaries", locale=locale["code"]
-            )
-            for row in rows:
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "admin_boundary_tr",
-                    admin_boundary_id=row.AdminBoundaryID,
-                    locale_id=locale["id"],
-                    name=row.AdminBoundaryName,
+        with self._record_writers(
+            "stump_parameter",
+            "admin_boundary",
+            "admin_boundary_tr",
+        ) as (
+            stump_parameter_writer,
+            admin_boundary_writer,
+            admin_boundary_tr_writer,
+        ):
+            # Initialize parameters #
+            stump_parameter_ids = {}
+            # Main loop #
+            for row in self.archive_index.get_parameters("admin_boundaries"):
+                # Stump parameters #
+                stump_parameter_id = self._add_parameter_record(
+                    stump_parameter_writer,
+                    stump_parameter_ids,
+                    sw_top_proportion=row.SoftwoodTopProportion,
+                    sw_stump_proportion=row.SoftwoodStumpProportion,
+                    hw_top_proportion=row.HardwoodTopProportion,
+                    hw_stump_proportion=row.HardwoodStumpProportion,
+                )
+                # Admin boundaries #
+                admin_boundary_writer.add_record(
+                    id=row.AdminBoundaryID,
+                    stump_parameter_id=stump_parameter_id,
                 )
-                translation_id += 1
+            # Translation and different locales #
+            translation_id = 1
+            for locale, rows in self.archive_index.get_localized_parameters(
+                "admin_boundaries", self.locales
+            ):
+                for row in rows:
+                    admin_boundary_tr_writer.add_record(
+                        admin_boundary_id=row.AdminBoundaryID,
+                        locale_id=locale["id"],
+                        name=row.AdminBoundaryName,
+                    )
+                    translation_id += 1
 
     def _get_random_return_interval_parameters(self):
         """
@@ -213,226 +621,257 @@ class CBMDefaultsBuilder:
         return result
 
     def _populate_eco_boundaries(self):
-        # Load a CSV file into a dictionary #
-        random_return_interval_params = (
-            self._get_random_return_interval_parameters()
-            if self.uncertainty_parameters
-            else None
-        )
-
-        if not self.uncertainty_parameters:
-            cbm_defaults_database.add_record(
-                self.connection,
-                "random_return_interval",
-                id=1,
-                a_Nu=0,
-                b_Nu=0,
-                a_Lambda=0,
-                b_Lambda=0,
-            )
-        # Initialize parameters #
-        eco_association_id = 1
-        # Main loop #
-        for row in self.archive_index.get_parameters("eco_boundaries"):
-            # Populate the turnover_parameter table #
-            cbm_defaults_database.add_record(
-                self.connection,
-                "turnover_parameter",
-                id=eco_association_id,
-                sw_foliage=row.SoftwoodFoliageFallRate,
-                hw_foliage=row.HardwoodFoliageFallRate,
-                stem_turnover=row.StemAnnualTurnOverRate,
-                sw_branch=row.SoftwoodBranchTurnOverRate,
-                hw_branch=row.HardwoodBranchTurnOverRate,
-                branch_snag_split=0.25,
-                sw_stem_snag=row.SoftwoodStemSnagToDOM,
-                sw_branch_snag=row.SoftwoodBranchSnagToDOM,
-                hw_stem_snag=row.HardwoodStemSnagToDOM,
-                hw_branch_snag=row.HardwoodBranchSnagToDOM,
-                coarse_root=0.02,
-                fine_root=0.641,
-                coarse_ag_split=0.5,
-                fine_ag_split=0.5,
+        with self._record_writers(
+            "random_return_interval",
+            "turnover_parameter",
+            "eco_boundary",
+            "eco_boundary_tr",
+        ) as (
+            random_return_interval_writer,
+            turnover_parameter_writer,
+            eco_boundary_writer,
+            eco_boundary_tr_writer,
+        ):
+            # Load a CSV file into a dictionary #
+            random_return_interval_params = (
+                self._get_random_return_interval_parameters()
+                if self.uncertainty_parameters
+                else None
             )
 
-            random_return_interval_id = (
-                eco_association_id if self.uncertainty_parameters else 1
-            )
-            # Populate the random_return_interval table #
-            if self.uncertainty_parameters:
-                # Retrieve random parameters #
-                random_param = random_return_interval_params[row.EcoBoundaryID]
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "random_return_interval",
-                    id=random_return_interval_id,
-                    a_Nu=random_param["a_Nu"],
-                    b_Nu=random_param["b_Nu"],
-                    a_Lambda=random_param["a_Lambda"],
-                    b_Lambda=random_param["b_Lambda"],
-                )
-
-            # Populate the eco_boundaries table #
-            cbm_defaults_database.add_record(
-                self.connection,
-                "eco_boundary",
-                id=row.EcoBoundaryID,
-                turnover_parameter_id=eco_association_id,
-                random_return_interval_id=random_return_interval_id,
-            )
-            # Increment manually #
-            eco_association_id += 1
-        # Translation and different locales #
-        translation_id = 1
-        for locale in self.locales:
-            for row in self.archive_index.get_parameters(
-                "eco_boundaries", locale=locale["code"]
-            ):
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "eco_boundary_tr",
-                    id=translation_id,
-                    eco_boundary_id=row.EcoBoundaryID,
-                    locale_id=locale["id"],
-                    name=row.EcoBoundaryName,
+            if not self.uncertainty_parameters:
+                random_return_interval_writer.add_record(
+                    id=1,
+                    a_Nu=0,
+                    b_Nu=0,
+                    a_Lambda=0,
+                    b_Lambda=0,
+                )
+            # Initialize parameters #
+            eco_association_id = 1
+            turnover_parameter_ids = {}
+            # Main loop #
+            for row in self.archive_index.get_parameters("eco_boundaries"):
+                # Populate the turnover_parameter table #
+                turnover_parameter_id = self._add_parameter_record(
+                    turnover_parameter_writer,
+                    turnover_parameter_ids,
+                    sw_foliage=row.SoftwoodFoliageFallRate,
+                    hw_foliage=row.HardwoodFoliageFallRate,
+                    stem_turnover=row.StemAnnualTurnOverRate,
+                    sw_branch=row.SoftwoodBranchTurnOverRate,
+                    hw_branch=row.HardwoodBranchTurnOverRate,
+                    branch_snag_split=0.25,
+                    sw_stem_snag=row.SoftwoodStemSnagToDOM,
+                    sw_branch_snag=row.SoftwoodBranchSnagToDOM,
+                    hw_stem_snag=row.HardwoodStemSnagToDOM,
+                    hw_branch_snag=row.HardwoodBranchSnagToDOM,
+                    coarse_root=0.02,
+                    fine_root=0.641,
+                    coarse_ag_split=0.5,
+                    fine_ag_split=0.5,
                 )
-                translation_id += 1
-
-    def _populate_root_parameter(self):
-        cbm_defaults_database.add_record(
-            self.connection,
-            "root_parameter",
-            id=1,
-            hw_a=1.576,
-            sw_a=0.222,
-            hw_b=0.615,
-            frp_a=0.072,
-            frp_b=0.354,
-            frp_c=-0.06021195,
-        )
 
-    def _populate_biomass_to_carbon_rate(self):
-        cbm_defaults_database.add_record(
-            self.connection, "biomass_to_carbon_rate", id=1, rate=0.5
-        )
+                random_return_interval_id = (
+                    eco_association_id if self.uncertainty_parameters else 1
+                )
+                # Populate the random_return_interval table #
+                if self.uncertainty_parameters:
+                    # Retrieve random parameters #
+                    random_param = random_return_interval_params[
+                        row.EcoBoundaryID
+                    ]
+                    random_return_interval_writer.add_record(
+                        id=random_return_interval_id,
+                        a_Nu=random_param["a_Nu"],
+                        b_Nu=random_param["b_Nu"],
+                        a_Lambda=random_param["a_Lambda"],
+                        b_Lambda=random_param["b_Lambda"],
+                    )
 
-    def _populate_slow_mixing_rate(self):
-        cbm_defaults_database.add_record(
-            self.connection, "slow_mixing_rate", id=1, rate=0.006
-        )
+                # Populate the eco_boundaries table #
+                eco_boundary_writer.add_record(
+                    id=row.EcoBoundaryID,
+                    turnover_parameter_id=turnover_parameter_id,
+                    random_return_interval_id=random_return_interval_id,
+                )
+                # Increment manually #
+                eco_association_id += 1
+            # Translation and different locales #
+            translation_id = 1
+            for locale, rows in self.archive_index.get_localized_parameters(
+                "eco_boundaries", self.locales
+            ):
+                for row in rows:
+                    eco_boundary_tr_writer.add_record(
+                        id=translation_id,
+                        eco_boundary_id=row.EcoBoundaryID,
+                        locale_id=locale["id"],
+                        name=row.EcoBoundaryName,
+                    )
+                    translation_id += 1
 
-    def _populate_spatial_units(self):
-        spinup_parameter_id = 1
-        climate = self.archive_index.get_parameters_df("climate")
-        if not set(climate.Year.unique()) == {1980, 1981}:
-            raise ValueError(
-                "Expected only years 1980, 1981 in tblClimateDefault. "
-                "Climate timeseries are not currently supported in "
-                "cbm_defaults/database format"
+    def _populate_root_parameter(self):
+        with self._record_writers("root_parameter") as (
+            root_parameter_writer,
+        ):
+            root_parameter_writer.add_record(
+                id=1,
+                hw_a=1.576,
+                sw_a=0.222,
+                hw_b=0.615,
+                frp_a=0.072,
+                frp_b=0.354,
+                frp_c=-0.06021195,
             )
 
-        historical_climate = {
-            int(r.DefaultSPUID): float(r.MeanAnnualTemp)
-            for r in climate[climate.Year == 1980].itertuples()
-        }
-        current_climate = {
-            int(r.DefaultSPUID): float(r.MeanAnnualTemp)
-            for r in climate[climate.Year == 1981].itertuples()
-        }
-        spatial_units = self.archive_index.get_parameters_df("spatial_units")
-
-        for row in spatial_units.itertuples():
-            cbm_defaults_database.add_record(
-                self.connection,
-                "spinup_parameter",
-                id=spinup_parameter_id,
-                return_interval=row.AverageAge,
-                min_rotations=10,
-                max_rotations=30,
-                historic_mean_temperature=historical_climate[int(row.SPUID)],
+    def _populate_biomass_to_carbon_rate(self):
+        with self._record_writers("biomass_to_carbon_rate") as (
+            biomass_to_carbon_rate_writer,
+        ):
+            biomass_to_carbon_rate_writer.add_record(
+                id=1, rate=0.5
             )
 
-            cbm_defaults_database.add_record(
-                self.connection,
-                "spatial_unit",
-                id=row.SPUID,
-                admin_boundary_id=row.AdminBoundaryID,
-                eco_boundary_id=row.EcoBoundaryID,
-                root_parameter_id=1,
-                spinup_parameter_id=spinup_parameter_id,
-                mean_annual_temperature=current_climate[int(row.SPUID)],
+    def _populate_slow_mixing_rate(self):
+        with self._record_writers("slow_mixing_rate") as (
+            slow_mixing_rate_writer,
+        ):
+            slow_mixing_rate_writer.add_record(
+                id=1, rate=0.006
             )
-            spinup_parameter_id += 1
 
-    def _populate_species(self):
-        for row in self.archive_index.get_parameters("forest_types"):
-            cbm_defaults_database.add_record(
-                self.connection, "forest_type", id=row.ForestTypeID
-            )
+    def _populate_spatial_units(self):
+        with self._record_writers(
+            "spinup_parameter",
+            "spatial_unit",
+        ) as (
+            spinup_parameter_writer,
+            spatial_unit_writer,
+        ):
+            spinup_parameter_ids = {}
+            climate = self.archive_index.get_parameters_df("climate")
+            if not set(climate.Year.unique()) == {1980, 1981}:
+                raise ValueError(
+                    "Expected only years 1980, 1981 in tblClimateDefault. "
+                    "Climate timeseries are not currently supported in "
+                    "cbm_defaults/database format"
+                )
 
-        for row in self.archive_index.get_parameters("genus_types"):
-            cbm_defaults_database.add_record(
-                self.connection, "genus", id=row.GenusID
+            historical_climate = {
+                int(r.DefaultSPUID): float(r.MeanAnnualTemp)
+                for r in climate[climate.Year == 1980].itertuples()
+            }
+            current_climate = {
+                int(r.DefaultSPUID): float(r.MeanAnnualTemp)
+                for r in climate[climate.Year == 1981].itertuples()
+            }
+            spatial_units = self.archive_index.get_parameters_df(
+                "spatial_units"
             )
 
-        for row in self.archive_index.get_parameters("species"):
-            cbm_defaults_database.add_record(
-                self.connection,
-                "species",
-                id=row.SpeciesTypeID,
-                forest_type_id=row.ForestTypeID,
-                genus_id=row.GenusID,
-            )
+            for row in spatial_units.itertuples():
+                spinup_parameter_id = self._add_parameter_record(
+                    spinup_parameter_writer,
+                    spinup_parameter_ids,
+                    return_interval=row.AverageAge,
+                    min_rotations=10,
+                    max_rotations=30,
+                    historic_mean_temperature=historical_climate[
+                        int(row.SPUID)
+                    ],
+                )
 
-        forest_type_tr_id = 1
-        genus_tr_id = 1
-        species_tr_id = 1
-        for locale in self.locales:
-            for row in self.archive_index.get_parameters(
-                "forest_types", locale=locale["code"]
-            ):
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "forest_type_tr",
-                    id=forest_type_tr_id,
-                    forest_type_id=row.ForestTypeID,
-                    locale_id=locale["id"],
-                    name=row.ForestTypeName,
+                spatial_unit_writer.add_record(
+                    id=row.SPUID,
+                    admin_boundary_id=row.AdminBoundaryID,
+                    eco_boundary_id=row.EcoBoundaryID,
+                    root_parameter_id=1,
+                    spinup_parameter_id=spinup_parameter_id,
+                    mean_annual_temperature=current_climate[int(row.SPUID)],
                 )
 
-                forest_type_tr_id += 1
+    def _populate_species(self):
+        with self._record_writers(
+            "forest_type",
+            "genus",
+            "species",
+            "forest_type_tr",
+            "genus_tr",
+            "species_tr",
+        ) as (
+            forest_type_writer,
+            genus_writer,
+            species_writer,
+            forest_type_tr_writer,
+            genus_tr_writer,
+            species_tr_writer,
+        ):
+            for row in self.archive_index.get_parameters("forest_types"):
+                forest_type_writer.add_record(
+                    id=row.ForestTypeID
+                )
 
-            for row in self.archive_index.get_parameters(
-                "genus_types", locale=locale["code"]
-            ):
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "genus_tr",
-                    id=genus_tr_id,
+            for row in self.archive_index.get_parameters("genus_types"):
+                genus_writer.add_record(
+                    id=row.GenusID
+                )
+
+            for row in self.archive_index.get_parameters("species"):
+                species_writer.add_record(
+                    id=row.SpeciesTypeID,
+                    forest_type_id=row.ForestTypeID,
                     genus_id=row.GenusID,
-                    locale_id=locale["id"],
-                    name=row.GenusName,
                 )
-                genus_tr_id += 1
 
-            for row in self.archive_index.get_parameters(
-                "species", locale=locale["code"]
+            forest_type_tr_id = 1
+            genus_tr_id = 1
+            species_tr_id = 1
+            get_localized = self.archive_index.get_localized_parameters
+            localized_forest_types = get_localized(
+                "forest_types", self.locales
+            )
+            localized_genus_types = get_localized("genus_types", self.locales)
+            localized_species = get_localized("species", self.locales)
+            for (locale, forest_types), (_, genus_types), (_, species) in zip(
+                localized_forest_types,
+                localized_genus_types,
+                localized_species,
             ):
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "species_tr",
-                    id=species_tr_id,
-                    species_id=row.SpeciesTypeID,
-                    locale_id=locale["id"],
-                    name=row.SpeciesTypeName,
-                )
-                species_tr_id += 1
+                for row in forest_types:
+                    forest_type_tr_writer.add_record(
+                        id=forest_type_tr_id,
+                        forest_type_id=row.ForestTypeID,
+                        locale_id=locale["id"],
+                        name=row.ForestTypeName,
+                    )
 
-    def _insert_vol_to_bio_factor(self, volume_to_biomass_factor_id, row):
-        cbm_defaults_database.add_record(
-            self.connection,
-            "vol_to_bio_factor",
-            id=volume_to_biomass_factor_id,
+                    forest_type_tr_id += 1
+
+                for row in genus_types:
+                    genus_tr_writer.add_record(
+                        id=genus_tr_id,
+                        genus_id=row.GenusID,
+                        locale_id=locale["id"],
+                        name=row.GenusName,
+                    )
+                    genus_tr_id += 1
+
+                for row in species:
+                    species_tr_writer.add_record(
+                        id=species_tr_id,
+                        species_id=row.SpeciesTypeID,
+                        locale_id=locale["id"],
+                        name=row.SpeciesTypeName,
+                    )
+                    species_tr_id += 1
+
+    def _insert_vol_to_bio_factor(
+        self, vol_to_bio_factor_writer, vol_to_bio_factor_ids, row
+    ):
+        return self._add_parameter_record(
+            vol_to_bio_factor_writer,
+            vol_to_bio_factor_ids,
             a=row.A,
             b=row.B,
             a_nonmerch=row.a_nonmerch,
@@ -465,81 +904,95 @@ class CBMDefaultsBuilder:
         )
 
     def _populate_volume_to_biomass(self):
-        # Initialize #
-        vol_to_bio_parameter_id = 1
-        # Species (tblBioTotalStemwoodSpeciesTypeDefault) #
-        for row in self.archive_index.get_parameters("vol_to_bio_species"):
-            self._insert_vol_to_bio_factor(vol_to_bio_parameter_id, row)
-            cbm_defaults_database.add_record(
-                self.connection,
-                "vol_to_bio_species",
-                spatial_unit_id=row.DefaultSPUID,
-                species_id=row.DefaultSpeciesTypeID,
-                vol_to_bio_factor_id=vol_to_bio_parameter_id,
-            )
-            vol_to_bio_parameter_id += 1
-        # Genus (tblBioTotalStemwoodGenusDefault) #
-        for row in self.archive_index.get_parameters("vol_to_bio_genus"):
-            self._insert_vol_to_bio_factor(vol_to_bio_parameter_id, row)
-            cbm_defaults_database.add_record(
-                self.connection,
-                "vol_to_bio_genus",
-                spatial_unit_id=row.DefaultSPUID,
-                genus_id=row.DefaultGenusID,
-                vol_to_bio_factor_id=vol_to_bio_parameter_id,
-            )
-            vol_to_bio_parameter_id += 1
-        # Forest type (tblBioTotalStemwoodForestTypeDefault) #
-        for row in self.archive_index.get_parameters("vol_to_bio_forest_type"):
-            self._insert_vol_to_bio_factor(vol_to_bio_parameter_id, row)
-            cbm_defaults_database.add_record(
-                self.connection,
-                "vol_to_bio_forest_type",
-                spatial_unit_id=row.DefaultSPUID,
-                forest_type_id=row.DefaultForestTypeID,
-                vol_to_bio_factor_id=vol_to_bio_parameter_id,
-            )
-            vol_to_bio_parameter_id += 1
+        with self._record_writers(
+            "vol_to_bio_factor",
+            "vol_to_bio_species",
+            "vol_to_bio_genus",
+            "vol_to_bio_forest_type",
+        ) as (
+            vol_to_bio_factor_writer,
+            vol_to_bio_species_writer,
+            vol_to_bio_genus_writer,
+            vol_to_bio_forest_type_writer,
+        ):
+            # Initialize #
+            vol_to_bio_factor_ids = {}
+            # Species (tblBioTotalStemwoodSpeciesTypeDefault) #
+            for row in self.archive_index.get_parameters("vol_to_bio_species"):
+                vol_to_bio_parameter_id = self._insert_vol_to_bio_factor(
+                    vol_to_bio_factor_writer, vol_to_bio_factor_ids, row
+                )
+                vol_to_bio_species_writer.add_record(
+                    spatial_unit_id=row.DefaultSPUID,
+                    species_id=row.DefaultSpeciesTypeID,
+                    vol_to_bio_factor_id=vol_to_bio_parameter_id,
+                )
+            # Genus (tblBioTotalStemwoodGenusDefault) #
+            for row in self.archive_index.get_parameters("vol_to_bio_genus"):
+                vol_to_bio_parameter_id = self._insert_vol_to_bio_factor(
+                    vol_to_bio_factor_writer, vol_to_bio_factor_ids, row
+                )
+                vol_to_bio_genus_writer.add_record(
+                    spatial_unit_id=row.DefaultSPUID,
+                    genus_id=row.DefaultGenusID,
+                    vol_to_bio_factor_id=vol_to_bio_parameter_id,
+                )
+            # Forest type (tblBioTotalStemwoodForestTypeDefault) #
+            for row in self.archive_index.get_parameters(
+                "vol_to_bio_forest_type"
+            ):
+                vol_to_bio_parameter_id = self._insert_vol_to_bio_factor(
+                    vol_to_bio_factor_writer, vol_to_bio_factor_ids, row
+                )
+                vol_to_bio_forest_type_writer.add_record(
+                    spatial_unit_id=row.DefaultSPUID,
+                    forest_type_id=row.DefaultForestTypeID,
+                    vol_to_bio_factor_id=vol_to_bio_parameter_id,
+                )
 
     def _populate_land_types(self):
-        for row in local_csv_table.read_csv_file("landtype.csv"):
-            cbm_defaults_database.add_record(
-                self.connection,
-                "land_type",
-                id=row["id"],
-                land_type=row["land_type"],
-            )
+        with self._record_writers("land_type") as (
+            land_type_writer,
+        ):
+            for row in local_csv_table.read_csv_file("landtype.csv"):
+                land_type_writer.add_record(
+                    id=row["id"],
+                    land_type=row["land_type"],
+                )
 
     def _populate_land_classes(self):
-        for row in local_csv_table.read_csv_file("landclass.csv"):
-            cbm_defaults_database.add_record(
-                self.connection,
-                "land_class",
-                code=row["code"],
-                id=row["id"],
-                is_forest=helper.as_boolean(row["is_forest"]),
-                is_simulated=helper.as_boolean(row["is_simulated"]),
-                transitional_period=row["transitional_period"],
-                transition_id=row["transition_id"],
-                land_type_id_1=row["land_type_id_1"],
-                land_type_id_2=row["land_type_id_2"],
-            )
+        with self._record_writers(
+            "land_class",
+            "land_class_tr",
+        ) as (
+            land_class_writer,
+            land_class_tr_writer,
+        ):
+            for row in local_csv_table.read_csv_file("landclass.csv"):
+                land_class_writer.add_record(
+                    code=row["code"],
+                    id=row["id"],
+                    is_forest=helper.as_boolean(row["is_forest"]),
+                    is_simulated=helper.as_boolean(row["is_simulated"]),
+                    transitional_period=row["transitional_period"],
+                    transition_id=row["transition_id"],
+                    land_type_id_1=row["land_type_id_1"],
+                    land_type_id_2=row["land_type_id_2"],
+                )
 
-        land_class_tr_id = 1
-        for locale in self.locales:
-            localized_path = local_csv_table.get_localized_csv_file_path(
-                "landclass.csv", locale["code"]
-            )
-            for row in local_csv_table.read_csv_file(localized_path):
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "land_class_tr",
-                    id=land_class_tr_id,
-                    land_class_id=row["landclass_id"],
-                    locale_id=locale["id"],
-                    description=row["description"],
+            land_class_tr_id = 1
+            for locale in self.locales:
+                localized_path = local_csv_table.get_localized_csv_file_path(
+                    "landclass.csv", locale["code"]
                 )
-                land_class_tr_id += 1
+                for row in local_csv_table.read_csv_file(localized_path):
+                    land_class_tr_writer.add_record(
+                        id=land_class_tr_id,
+                        land_class_id=row["landclass_id"],
+                        locale_id=locale["id"],
+                        description=row["description"],
+                    )
+                    land_class_tr_id += 1
 
     def _get_multi_year_disturbance_info(self):
         """queries for disturbance types involved with "multi year
@@ -555,225 +1008,369 @@ class CBMDefaultsBuilder:
         self.multi_year_dmids = set([row.DMID for row in rows])
 
     def _populate_disturbance_types(self):
-        disturbance_type_land_type_lookup = {}
-        if self.archive_index.table_exists(
-            "tblDisturbanceTypeLandclassTransition"
+        with self._record_writers(
+            "disturbance_type",
+            "disturbance_type_tr",
+        ) as (
+            disturbance_type_writer,
+            disturbance_type_tr_writer,
         ):
-            landtype_df = pd.DataFrame(
-                list(local_csv_table.read_csv_file("landtype.csv"))
-            )
-
-            merged_land_type = self.archive_index.get_parameters_df(
-                "disturbance_type_landclass_transition"
-            ).merge(
-                landtype_df,
-                left_on="TransitionLandClass",
-                right_on="land_type"
-            )
-            for _, row in merged_land_type.iterrows():
-                disturbance_type_land_type_lookup[
-                    int(row["DefaultDistTypeID"])
-                ] = int(row["id"])
-
-        else:
-            for row in local_csv_table.read_csv_file(
-                "disturbance_type_land_type.csv"
+            disturbance_type_land_type_lookup = {}
+            if self.archive_index.table_exists(
+                "tblDisturbanceTypeLandclassTransition"
             ):
-                disturbance_type_land_type_lookup[
-                    int(row["DefaultDisturbanceTypeId"])
-                ] = int(row["land_type_id"])
-
-        for row in self.archive_index.get_parameters("disturbance_types"):
-            if row.DistTypeID in self.multi_year_disturbance_type_ids:
-                continue
-            land_type_id = (
-                disturbance_type_land_type_lookup[row.DistTypeID]
-                if row.DistTypeID in disturbance_type_land_type_lookup
-                else None
-            )
-            cbm_defaults_database.add_record(
-                self.connection,
-                "disturbance_type",
-                id=row.DistTypeID,
-                land_type_id=land_type_id,
-            )
+                landtype_df = pd.DataFrame(
+                    list(local_csv_table.read_csv_file("landtype.csv"))
+                )
 
-        tr_id = 1
-        for locale in self.locales:
-            for row in self.archive_index.get_parameters(
-                "disturbance_types", locale=locale["code"]
-            ):
+                merged_land_type = self.archive_index.get_parameters_df(
+                    "disturbance_type_landclass_transition"
+                ).merge(
+                    landtype_df,
+                    left_on="TransitionLandClass",
+                    right_on="land_type"
+                )
+                for _, row in merged_land_type.iterrows():
+                    disturbance_type_land_type_lookup[
+                        int(row["DefaultDistTypeID"])
+                    ] = int(row["id"])
+
+            else:
+                for row in local_csv_table.read_csv_file(
+                    "disturbance_type_land_type.csv"
+                ):
+                    disturbance_type_land_type_lookup[
+                        int(row["DefaultDisturbanceTypeId"])
+                    ] = int(row["land_type_id"])
+
+            for row in self.archive_index.get_parameters("disturbance_types"):
                 if row.DistTypeID in self.multi_year_disturbance_type_ids:
                     continue
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "disturbance_type_tr",
-                    id=tr_id,
-                    disturbance_type_id=row.DistTypeID,
-                    locale_id=locale["id"],
-                    name=row.DistTypeName,
-                    description=row.Description,
+                land_type_id = (
+                    disturbance_type_land_type_lookup[row.DistTypeID]
+                    if row.DistTypeID in disturbance_type_land_type_lookup
+                    else None
                 )
-                tr_id += 1
+                disturbance_type_writer.add_record(
+                    id=row.DistTypeID,
+                    land_type_id=land_type_id,
+                )
+
+            tr_id = 1
+            for locale, rows in self.archive_index.get_localized_parameters(
+                "disturbance_types", self.locales
+            ):
+                for row in rows:
+                    if row.DistTypeID in self.multi_year_disturbance_type_ids:
+                        continue
+                    disturbance_type_tr_writer.add_record(
+                        id=tr_id,
+                        disturbance_type_id=row.DistTypeID,
+                        locale_id=locale["id"],
+                        name=row.DistTypeName,
+                        description=row.Description,
+                    )
+                    tr_id += 1
+
+    def _get_dm_executor(self):
+        if not self.dm_workers:
+            return contextlib.nullcontext()
+        # spawned rather than forked workers, since build steps may be
+        # running in other threads
+        return ProcessPoolExecutor(
+            self.dm_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _deduplicate_dm_values(
+        self, dm_values, matrix_ids, dm_aliases, disturbance_matrix_writer
+    ):
+        """Drop the values of the matrices identical to a matrix already
+        seen, and add the matrices seen for the first time to the
+        disturbance_matrix table.
+
+        Args:
+            dm_values (pd.DataFrame): processed disturbance matrix values
+            matrix_ids (dict): the matrix digests seen so far, and the DMID
+                of the first matrix with each digest
+            dm_aliases (dict): updated with the DMID of the stored matrix
+                for each DMID in dm_values
+            disturbance_matrix_writer (RecordWriter): the writer for the
+                disturbance_matrix table
+
+        Returns:
+            pd.DataFrame: the values of the matrices to store
+        """
+        digests = dm_values_processor.hash_matrices(dm_values)
+        for dmid, digest in digests.items():
+            dm_aliases[dmid] = matrix_ids.setdefault(digest, dmid)
+            if dm_aliases[dmid] == dmid:
+                disturbance_matrix_writer.add_record(id=dmid)
+        disturbance_matrix_writer.flush()
+        dmids = dm_values["DMID"]
+        return dm_values[dmids.map(dm_aliases) == dmids]
 
     def _populate_disturbance_matrix_values(self):
-        pool_cross_walk: dict[int, int] = {}
-        for row in local_csv_table.read_csv_file("pool_cross_walk.csv"):
-            pool_cross_walk[int(row["cbm3_pool_code"])] = int(
-                row["cbm3_5_pool_code"]
-            )
+        with self._record_writers(
+            "disturbance_matrix",
+            "disturbance_matrix_alias",
+            "disturbance_matrix_tr",
+        ) as (
+            disturbance_matrix_writer,
+            disturbance_matrix_alias_writer,
+            disturbance_matrix_tr_writer,
+        ), self._get_dm_executor() as dm_executor:
+            pool_cross_walk: dict[int, int] = {}
+            for row in local_csv_table.read_csv_file("pool_cross_walk.csv"):
+                pool_cross_walk[int(row["cbm3_pool_code"])] = int(
+                    row["cbm3_5_pool_code"]
+                )
 
-        for row in self.archive_index.get_parameters(
-            "disturbance_matrix_names"
-        ):
-            if row.DMID in self.multi_year_dmids:
-                continue
-            cbm_defaults_database.add_record(
-                self.connection, "disturbance_matrix", id=row.DMID
-            )
+            dmids = [
+                row.DMID
+                for row in self.archive_index.get_parameters(
+                    "disturbance_matrix_names"
+                )
+                if row.DMID not in self.multi_year_dmids
+            ]
+            # if deduplicating, the matrices are added as their values are
+            # processed, since the identical matrices are not yet known
+            matrix_ids: dict[str, int] = {}
+            dm_aliases: dict[int, int] = {}
+            if not self.deduplicate_disturbance_matrices:
+                for dmid in dmids:
+                    disturbance_matrix_writer.add_record(id=dmid)
+                # the values are appended with pandas, outside of the
+                # writers
+                disturbance_matrix_writer.flush()
+
+            if self.dm_chunk_size:
+                # matrices are independent: process and write whole
+                # matrices one chunk at a time
+                dm_value_batches = dm_values_processor.iter_whole_matrices(
+                    self.archive_index.iter_parameters_arrays(
+                        "disturbance_matrix_by_dmid",
+                        batch_size=self.dm_chunk_size,
+                    )
+                )
+            else:
+                dm_value_batches = [
+                    self.archive_index.get_parameters_arrays(
+                        "disturbance_matrix"
+                    )
+                ]
 
-        dm_value_rows = [
-            row for row in self.archive_index.get_parameters(
-                "disturbance_matrix"
-            ) if row.DMID not in self.multi_year_dmids
-        ]
+            for dm_value_arrays in dm_value_batches:
+                not_multi_year = ~np.isin(
+                    dm_value_arrays["DMID"], list(self.multi_year_dmids)
+                )
+                if self.dm_chunk_size and not not_multi_year.any():
+                    continue
 
-        dm_values = dm_values_processor.process_dm_values(
-            [list(x) for x in dm_value_rows],
-            colnames=[str(x[0]) for x in dm_value_rows[0].cursor_description],
-            pool_cross_walk=pool_cross_walk
-        )
+                dm_value_arrays = {
+                    k: v[not_multi_year] for k, v in dm_value_arrays.items()
+                }
+                if dm_executor:
+                    dm_values = dm_values_processor.process_dm_values_parallel(
+                        dm_value_arrays,
+                        colnames=list(dm_value_arrays.keys()),
+                        pool_cross_walk=pool_cross_walk,
+                        executor=dm_executor,
+                        n_partitions=self.dm_workers,
+                    )
+                else:
+                    dm_values = dm_values_processor.process_dm_values(
+                        dm_value_arrays,
+                        colnames=list(dm_value_arrays.keys()),
+                        pool_cross_walk=pool_cross_walk
+                    )
+                del dm_value_arrays
+
+                if self.deduplicate_disturbance_matrices:
+                    dm_values = self._deduplicate_dm_values(
+                        dm_values,
+                        matrix_ids,
+                        dm_aliases,
+                        disturbance_matrix_writer,
+                    )
 
-        dm_values.rename(
-            columns={
-                "DMID": "disturbance_matrix_id",
-                "DMRow": "source_pool_id",
-                "DMColumn": "sink_pool_id",
-                "Proportion": "proportion",
-            }
-        ).to_sql(
-            name="disturbance_matrix_value",
-            con=self.connection,
-            if_exists="append",
-            index=False,
-        )
+                dm_values = dm_values.rename(
+                    columns={
+                        "DMID": "disturbance_matrix_id",
+                        "DMRow": "source_pool_id",
+                        "DMColumn": "sink_pool_id",
+                        "Proportion": "proportion",
+                    }
+                )
+                # inserted with executemany rather than DataFrame.to_sql,
+                # which commits, see build_database
+                columns = [
+                    "disturbance_matrix_id",
+                    "source_pool_id",
+                    "sink_pool_id",
+                    "proportion",
+                ]
+                with build_profiler.acquire_write_lock(self._write_lock):
+                    start = time.perf_counter()
+                    self.connection.executemany(
+                        "INSERT INTO disturbance_matrix_value ({}) "
+                        "VALUES (?, ?, ?, ?)".format(", ".join(columns)),
+                        dm_values[columns].itertuples(index=False, name=None),
+                    )
+                    build_profiler.record_write(
+                        time.perf_counter() - start, len(dm_values.index)
+                    )
+                del dm_values
+
+            if self.deduplicate_disturbance_matrices:
+                for dmid in sorted(dmids):
+                    # matrices without values are stored as they are
+                    if dmid not in dm_aliases:
+                        dm_aliases[dmid] = dmid
+                        disturbance_matrix_writer.add_record(id=dmid)
+                    disturbance_matrix_alias_writer.add_record(
+                        id=dmid, disturbance_matrix_id=dm_aliases[dmid]
+                    )
 
-        tr_id = 1
-        for locale in self.locales:
+            tr_id = 1
+            for locale, rows in self.archive_index.get_localized_parameters(
+                "disturbance_matrix_names", self.locales
+            ):
+                for row in rows:
+                    if row.DMID in self.multi_year_dmids:
+                        continue
+                    if dm_aliases.get(row.DMID, row.DMID) != row.DMID:
+                        continue
+                    disturbance_matrix_tr_writer.add_record(
+                        id=tr_id,
+                        disturbance_matrix_id=row.DMID,
+                        locale_id=locale["id"],
+                        name=row.Name,
+                        description=row.Description,
+                    )
+                    tr_id += 1
+
+    def _populate_disturbance_matrix_associations(self):
+        with self._record_writers("disturbance_matrix_association") as (
+            disturbance_matrix_association_writer,
+        ):
+            # the ids of deduplicated matrices, if any, are replaced by the
+            # ids of the stored matrices
+            with build_profiler.acquire_write_lock(self._write_lock):
+                dm_aliases = dict(
+                    self.connection.execute(
+                        "SELECT id, disturbance_matrix_id "
+                        "FROM disturbance_matrix_alias"
+                    ).fetchall()
+                )
+            spatial_unit_dm_associations = list(
+                self.archive_index.get_parameters(
+                    "spatial_unit_dm_associations"
+                )
+            )
+            spatial_unit_dm_association_keys = set(
+                [
+                    (row.SPUID, row.DefaultDisturbanceTypeID)
+                    for row in spatial_unit_dm_associations
+                ]
+            )
+            # Eco boundary (tblDMAssociationDefault join tblSPUDefault) #
             for row in self.archive_index.get_parameters(
-                "disturbance_matrix_names", locale=locale["code"]
+                "eco_boundary_dm_associations"
             ):
                 if row.DMID in self.multi_year_dmids:
                     continue
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "disturbance_matrix_tr",
-                    id=tr_id,
-                    disturbance_matrix_id=row.DMID,
-                    locale_id=locale["id"],
-                    name=row.Name,
-                    description=row.Description,
+                if (
+                    row.SPUID,
+                    row.DefaultDisturbanceTypeID,
+                ) in spatial_unit_dm_association_keys:
+                    # defer the insert to the next loop, meaning the
+                    # spatial_unit_dm_associations are prioritized
+                    continue
+                disturbance_matrix_association_writer.add_record(
+                    spatial_unit_id=row.SPUID,
+                    disturbance_type_id=row.DefaultDisturbanceTypeID,
+                    disturbance_matrix_id=dm_aliases.get(row.DMID, row.DMID),
+                )
+            # Spatial units (tblDMAssociationSPUDefault) #
+            for row in spatial_unit_dm_associations:
+                if row.DMID in self.multi_year_dmids:
+                    continue
+                disturbance_matrix_association_writer.add_record(
+                    spatial_unit_id=row.SPUID,
+                    disturbance_type_id=row.DefaultDisturbanceTypeID,
+                    disturbance_matrix_id=dm_aliases.get(row.DMID, row.DMID),
                 )
-                tr_id += 1
 
-    def _populate_disturbance_matrix_associations(self):
-        spatial_unit_dm_associations = list(
-            self.archive_index.get_parameters("spatial_unit_dm_associations")
-        )
-        spatial_unit_dm_association_keys = set(
-            [
-                (row.SPUID, row.DefaultDisturbanceTypeID)
-                for row in spatial_unit_dm_associations
-            ]
-        )
-        # Eco boundary (tblDMAssociationDefault join tblSPUDefault) #
-        for row in self.archive_index.get_parameters(
-            "eco_boundary_dm_associations"
-        ):
-            if row.DMID in self.multi_year_dmids:
-                continue
-            if (
-                row.SPUID,
-                row.DefaultDisturbanceTypeID,
-            ) in spatial_unit_dm_association_keys:
-                # defer the insert to the next loop, meaning the
-                # spatial_unit_dm_associations are prioritized
-                continue
-            cbm_defaults_database.add_record(
-                self.connection,
-                "disturbance_matrix_association",
-                spatial_unit_id=row.SPUID,
-                disturbance_type_id=row.DefaultDisturbanceTypeID,
-                disturbance_matrix_id=row.DMID,
-            )
-        # Spatial units (tblDMAssociationSPUDefault) #
-        for row in spatial_unit_dm_associations:
-            if row.DMID in self.multi_year_dmids:
-                continue
-            cbm_defaults_database.add_record(
-                self.connection,
-                "disturbance_matrix_association",
-                spatial_unit_id=row.SPUID,
-                disturbance_type_id=row.DefaultDisturbanceTypeID,
-                disturbance_matrix_id=row.DMID,
+    def _create_lookup_tables(self):
+        with build_profiler.acquire_write_lock(self._write_lock):
+            start = time.perf_counter()
+            row_counts = lookup_tables.create_lookup_tables(self.connection)
+            build_profiler.record_write(
+                time.perf_counter() - start, sum(row_counts.values())
             )
 
     def _populate_growth_multipliers(self):
-        growth_multiplier_id = 1
-        disturbance_types = [
-            x.DefaultDisturbanceTypeID
-            for x in self.archive_index.get_parameters(
-                "growth_multiplier_disturbance"
-            )
-            if x.DefaultDisturbanceTypeID
-            not in self.multi_year_disturbance_type_ids
-        ]
+        with self._record_writers(
+            "growth_multiplier_series",
+            "growth_multiplier_value",
+        ) as (
+            growth_multiplier_series_writer,
+            growth_multiplier_value_writer,
+        ):
+            growth_multiplier_id = 1
+            disturbance_types = [
+                x.DefaultDisturbanceTypeID
+                for x in self.archive_index.get_parameters(
+                    "growth_multiplier_disturbance"
+                )
+                if x.DefaultDisturbanceTypeID
+                not in self.multi_year_disturbance_type_ids
+            ]
 
-        for dist_type in disturbance_types:
-            cbm_defaults_database.add_record(
-                self.connection,
-                "growth_multiplier_series",
-                id=growth_multiplier_id,
-                disturbance_type_id=dist_type,
+            growth_multipliers = self.archive_index.get_parameters_batched(
+                "growth_multipliers_batched", "DistTypeID", disturbance_types
             )
 
-            for row in self.archive_index.get_parameters(
-                "growth_multipliers", params=(dist_type,)
-            ):
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "growth_multiplier_value",
-                    growth_multiplier_series_id=growth_multiplier_id,
-                    forest_type_id=row.ForestTypeID,
-                    time_step=row.AnnualOrder,
-                    value=row.GrowthMultiplier,
+            for dist_type in disturbance_types:
+                growth_multiplier_series_writer.add_record(
+                    id=growth_multiplier_id,
+                    disturbance_type_id=dist_type,
                 )
 
-            growth_multiplier_id += 1
+                for row in growth_multipliers[dist_type]:
+                    growth_multiplier_value_writer.add_record(
+                        growth_multiplier_series_id=growth_multiplier_id,
+                        forest_type_id=row.ForestTypeID,
+                        time_step=row.AnnualOrder,
+                        value=row.GrowthMultiplier,
+                    )
+
+                growth_multiplier_id += 1
 
     def _populate_flux_indicators(self):
         def insert_csv_file(table_name, csv_file_name):
-            for row in local_csv_table.read_csv_file(csv_file_name):
-                cbm_defaults_database.add_record(
-                    self.connection, table_name, **row
-                )
+            with self._record_writers(table_name) as (writer,):
+                for row in local_csv_table.read_csv_file(csv_file_name):
+                    writer.add_record(**row)
 
         def insert_csv(table_name):
             insert_csv_file(table_name, f"{table_name}.csv")
 
         def insert_localized_csv(table_name, locales):
             translation_id = 1
-            for locale in locales:
-                path = local_csv_table.get_localized_csv_file_path(
-                    f"{table_name}.csv", locale["code"]
-                )
-                for row in local_csv_table.read_csv_file(path):
-                    args = {"id": translation_id, "locale_id": locale["id"]}
-                    args.update(row)
-                    cbm_defaults_database.add_record(
-                        self.connection, f"{table_name}_tr", **args
+            with self._record_writers(f"{table_name}_tr") as (writer,):
+                for locale in locales:
+                    path = local_csv_table.get_localized_csv_file_path(
+                        f"{table_name}.csv", locale["code"]
                     )
-                    translation_id += 1
+                    for row in local_csv_table.read_csv_file(path):
+                        args = {
+                            "id": translation_id,
+                            "locale_id": locale["id"],
+                        }
+                        args.update(row)
+                        writer.add_record(**args)
+                        translation_id += 1
 
         insert_csv("flux_process")
         insert_csv("flux_indicator")
@@ -787,47 +1384,55 @@ class CBMDefaultsBuilder:
         insert_localized_csv("composite_flux_indicator", self.locales)
 
     def _populate_afforestation(self):
-        pool_id_map = {
-            x["code"]: x["id"]
-            for x in local_csv_table.read_csv_file("pool.csv")
-        }
-
-        for row in self.archive_index.get_parameters(
-            "afforestation_pre_types"
-        ):
-            cbm_defaults_database.add_record(
-                self.connection, "afforestation_pre_type", id=row.PreTypeID
-            )
-
-        afforestation_initial_pool_id = 1
-        for row in self.archive_index.get_parameters(
-            "afforestation_pre_type_values"
+        with self._record_writers(
+            "afforestation_pre_type",
+            "afforestation_initial_pool",
+            "afforestation_pre_type_tr",
+        ) as (
+            afforestation_pre_type_writer,
+            afforestation_initial_pool_writer,
+            afforestation_pre_type_tr_writer,
         ):
-            for pool_column, pool_name in AFFORESTATION_COLUMN_TO_POOL_MAPPING:
-                pool_value = getattr(row, pool_column)
-                if pool_value > 0:
-                    cbm_defaults_database.add_record(
-                        self.connection,
-                        "afforestation_initial_pool",
-                        id=afforestation_initial_pool_id,
-                        spatial_unit_id=row.SPUID,
-                        afforestation_pre_type_id=row.PreTypeID,
-                        pool_id=pool_id_map[pool_name],
-                        value=pool_value,
-                    )
-                    afforestation_initial_pool_id += 1
+            pool_id_map = {
+                x["code"]: x["id"]
+                for x in local_csv_table.read_csv_file("pool.csv")
+            }
 
-        afforestation_pre_type_tr_id = 1
-        for locale in self.locales:
             for row in self.archive_index.get_parameters(
-                "afforestation_pre_types", locale=locale["code"]
+                "afforestation_pre_types"
             ):
-                cbm_defaults_database.add_record(
-                    self.connection,
-                    "afforestation_pre_type_tr",
-                    id=afforestation_pre_type_tr_id,
-                    afforestation_pre_type_id=row.PreTypeID,
-                    locale_id=locale["id"],
-                    name=row.Name,
+                afforestation_pre_type_writer.add_record(
+                    id=row.PreTypeID
                 )
-                afforestation_pre_type_tr_id += 1
+
+            afforestation_initial_pool_id = 1
+            for row in self.archive_index.get_parameters(
+                "afforestation_pre_type_values"
+            ):
+                for (
+                    pool_column,
+                    pool_name,
+                ) in AFFORESTATION_COLUMN_TO_POOL_MAPPING:
+                    pool_value = getattr(row, pool_column)
+                    if pool_value > 0:
+                        afforestation_initial_pool_writer.add_record(
+                            id=afforestation_initial_pool_id,
+                            spatial_unit_id=row.SPUID,
+                            afforestation_pre_type_id=row.PreTypeID,
+                            pool_id=pool_id_map[pool_name],
+                            value=pool_value,
+                        )
+                        afforestation_initial_pool_id += 1
+
+            afforestation_pre_type_tr_id = 1
+            for locale, rows in self.archive_index.get_localized_parameters(
+                "afforestation_pre_types", self.locales
+            ):
+                for row in rows:
+                    afforestation_pre_type_tr_writer.add_record(
+                        id=afforestation_pre_type_tr_id,
+                        afforestation_pre_type_id=row.PreTypeID,
+                        locale_id=locale["id"],
+                        name=row.Name,
+                    )
+                    afforestation_pre_type_tr_id += 1
@@ -3,12 +3,18 @@ Methods for creating and adding data to a cbm_defaults database
 """
 
 import os
+import re
+import time
 import contextlib
 import sqlite3
 from cbm_defaults import helper
+from cbm_defaults import build_profiler
 
 logger = helper.get_logger()
 
+# the default number of rows buffered by a RecordWriter before it flushes
+DEFAULT_BATCH_SIZE = 10000
+
 
 ###############################################################################
 def create_database(sqlite_path):
@@ -35,7 +41,9 @@ def get_connection(sqlite_path):
     """
     logger.info("opening %s", sqlite_path)
     try:
-        conn = sqlite3.connect(sqlite_path)
+        # the connection may be shared by the threads of a parallel build,
+        # which serialize their writes
+        conn = sqlite3.connect(sqlite_path, check_same_thread=False)
         conn.execute("PRAGMA foreign_keys = 1")
         yield conn
     finally:
@@ -43,7 +51,81 @@ def get_connection(sqlite_path):
         conn.close()
 
 
-def execute_ddl_file(ddl_path, sqlite_path):
+@contextlib.contextmanager
+def get_staging_connection():
+    """yields a connection to a new in-memory sqlite database, tuned for
+    bulk loading: journaling and syncing are disabled, and foreign keys are
+    not enforced per row. Call :py:func:`check_foreign_keys` once the data
+    is loaded, and :py:func:`write_database` to save it.
+    """
+    logger.info("opening in-memory staging database")
+    try:
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA foreign_keys = 0")
+        yield conn
+    finally:
+        logger.info("closing in-memory staging database")
+        conn.close()
+
+
+def _read_ddl_statements(ddl_path):
+    """split the semicolon delimited statements in the specified file into
+    a list of table statements and a list of index statements
+    """
+    with open(ddl_path, "r") as ddl_file:
+        ddl_statements = [x for x in ddl_file.read().split(";") if x.strip()]
+    index_pattern = re.compile(r"\s*CREATE\s+(UNIQUE\s+)?INDEX\b", re.I)
+    tables = [x for x in ddl_statements if not index_pattern.match(x)]
+    indexes = [x for x in ddl_statements if index_pattern.match(x)]
+    return tables, indexes
+
+
+def execute_ddl(connection, ddl_path, indexes=True):
+    """Execute the semicolon delimited sqlite data definition (DDL) statements
+    in the specified *ddl_path* on the connected database.
+
+    Args:
+        connection (sqlite3.Connection): a connection to an sqlite database
+        ddl_path (str): path to a file containing semicolon delimited sqlite
+            DDL statements.
+        indexes (bool, optional): if False, the CREATE INDEX statements are
+            skipped, so that they can be run once the tables are loaded
+            using :py:func:`create_indexes`. Defaults to True.
+    """
+    table_statements, index_statements = _read_ddl_statements(ddl_path)
+    cursor = connection.cursor()
+    for ddl in table_statements:
+        cursor.execute(ddl)
+    if indexes:
+        for ddl in index_statements:
+            cursor.execute(ddl)
+
+
+def create_indexes(connection, ddl_path):
+    """Execute only the CREATE INDEX statements in the specified
+    *ddl_path* on the connected database. Building indexes once after the
+    tables are loaded is faster than maintaining them on every insert.
+
+    Args:
+        connection (sqlite3.Connection): a connection to an sqlite database
+        ddl_path (str): path to a file containing semicolon delimited sqlite
+            DDL statements.
+    """
+    _, index_statements = _read_ddl_statements(ddl_path)
+    start = time.perf_counter()
+    cursor = connection.cursor()
+    for ddl in index_statements:
+        cursor.execute(ddl)
+    logger.info(
+        "created %d indexes in %.3fs",
+        len(index_statements),
+        time.perf_counter() - start,
+    )
+
+
+def execute_ddl_file(ddl_path, sqlite_path, indexes=True):
     """Execute the semicolon delimited sqlite data definition (DDL) statements
     in the specified *ddl_path* on the database at the specified sqlite_path.
 
@@ -52,14 +134,61 @@ def execute_ddl_file(ddl_path, sqlite_path):
             DDL statements.
         sqlite_path (str): path to a sqlite database on which the statements
             will be run.
+        indexes (bool, optional): if False, the CREATE INDEX statements are
+            skipped. See :py:func:`execute_ddl`. Defaults to True.
     """
-    with get_connection(sqlite_path) as conn, open(ddl_path, "r") as ddl_file:
-        ddl_statements = [
-            x for x in ddl_file.read().split(";") if x is not None
-        ]
-        cursor = conn.cursor()
-        for ddl in ddl_statements:
-            cursor.execute(ddl)
+    with get_connection(sqlite_path) as conn:
+        execute_ddl(conn, ddl_path, indexes=indexes)
+
+
+def check_foreign_keys(connection):
+    """Check every foreign key constraint of the connected database at once.
+
+    Args:
+        connection (sqlite3.Connection): a connection to an sqlite database
+
+    Raises:
+        ValueError: one or more rows violate a foreign key constraint. The
+            message lists the first few violations.
+    """
+    violations = connection.execute("PRAGMA foreign_key_check").fetchall()
+    if violations:
+        details = "; ".join(
+            f"{table} rowid {rowid} references missing {parent} row"
+            for table, rowid, parent, _ in violations[:10]
+        )
+        raise ValueError(
+            f"{len(violations)} foreign key violations: {details}"
+        )
+
+
+def write_database(connection, sqlite_path, overwrite=False):
+    """Atomically write the connected database to a new file at the
+    specified path. The database is first written to a temporary file in
+    the same directory with ``VACUUM INTO``, which is then renamed to
+    *sqlite_path*, so the path is never left with a partial database.
+
+    Args:
+        connection (sqlite3.Connection): a connection to an sqlite database
+            with no pending transaction
+        sqlite_path (str): path to the new sqlite database
+        overwrite (bool, optional): if set to True, an existing database at
+            sqlite_path is replaced. Defaults to False.
+
+    Raises:
+        ValueError: the specified path already exists, and overwrite is
+            not set
+    """
+    if os.path.exists(sqlite_path) and not overwrite:
+        raise ValueError(f"specified path already exists {sqlite_path}")
+    temp_path = f"{sqlite_path}.{os.getpid()}.tmp"
+    logger.info("writing %s", sqlite_path)
+    try:
+        connection.execute("VACUUM INTO ?", (temp_path,))
+        os.replace(temp_path, sqlite_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 
 def add_record(connection, table_name, **kwargs):
@@ -80,3 +209,106 @@ def add_record(connection, table_name, **kwargs):
     params = [kwargs[k] for k in col_list]
     cursor = connection.cursor()
     cursor.execute(query, params)
+
+
+###############################################################################
+class RecordWriter:
+    """Buffered writer which adds records to a single table of a connected
+    database. Rows are accumulated and inserted with ``executemany`` using a
+    cached INSERT statement once *batch_size* rows are buffered, and when
+    the writer is flushed or closed.
+
+    Writers can be used as context managers, in which case they are closed
+    on exit, unless an exception was raised.
+
+    Args:
+        connection (sqlite3.Connection): a connection to an sqlite database
+        table_name (str): the name of the table to which records are added
+        batch_size (int, optional): the number of rows buffered before they
+            are inserted. Defaults to DEFAULT_BATCH_SIZE.
+        depends_on (iterable, optional): writers for tables referenced by
+            foreign keys in this writer's table. They are flushed before
+            this writer so that referenced rows always exist before the rows
+            referencing them. Defaults to None.
+        lock (threading.Lock, optional): if specified, inserts are made
+            while holding this lock, so that writers used by several threads
+            on a shared connection write one at a time. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        connection,
+        table_name,
+        batch_size=DEFAULT_BATCH_SIZE,
+        depends_on=None,
+        lock=None,
+    ):
+        self.connection = connection
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.depends_on = list(depends_on) if depends_on else []
+        self.lock = lock if lock else contextlib.nullcontext()
+        self.row_count = 0
+        self.write_time = 0.0
+        self._columns = None
+        self._statement = None
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    def add_record(self, **kwargs):
+        """Add a record with the column name, row value pairs specified by
+        keyword args.
+        """
+        columns = tuple(kwargs.keys())
+        if columns != self._columns:
+            self.flush()
+            self._columns = columns
+            self._statement = (
+                "INSERT INTO {table_name} ({col_list}) VALUES ({values})"
+            ).format(
+                table_name=self.table_name,
+                col_list=",".join(columns),
+                values=",".join(["?"] * len(columns)),
+            )
+        self._rows.append(tuple(kwargs.values()))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Insert all buffered rows, after flushing the writers this writer
+        depends on.
+        """
+        for writer in self.depends_on:
+            writer.flush()
+        if not self._rows:
+            return
+        with build_profiler.acquire_write_lock(self.lock):
+            start = time.perf_counter()
+            cursor = self.connection.cursor()
+            cursor.executemany(self._statement, self._rows)
+            cursor.close()
+            elapsed = time.perf_counter() - start
+        self.write_time += elapsed
+        self.row_count += len(self._rows)
+        build_profiler.record_write(elapsed, len(self._rows))
+        self._rows = []
+
+    def close(self):
+        """Flush the buffered rows, and log the number of rows written and
+        the insert rate.
+        """
+        self.flush()
+        if self.row_count:
+            logger.info(
+                "%s: %d rows in %.3fs (%.0f rows/s)",
+                self.table_name,
+                self.row_count,
+                self.write_time,
+                self.row_count / self.write_time if self.write_time else 0,
+            )
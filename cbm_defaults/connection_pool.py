@@ -0,0 +1,118 @@
+"""
+A small thread-safe pool of long-lived database connections keyed by
+database path.
+"""
+
+import contextlib
+import threading
+
+
+###############################################################################
+class ConnectionPool:
+    """Bounded pool of reusable database connections, grouped by key
+    (normally the path of the database being connected to).
+
+    Connections are created lazily with the *connect* function, handed out
+    to one user at a time, and returned to the pool when released so that
+    later queries on the same key can reuse them. At most *max_size*
+    connections are open for any one key; when all of them are in use,
+    :py:meth:`connection` blocks until one is released.
+
+    Args:
+        connect (callable): function of a single key argument which returns
+            a new DBAPI connection.
+        max_size (int, optional): maximum number of open connections per
+            key. Defaults to 2.
+    """
+
+    def __init__(self, connect, max_size=2):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.max_size = max_size
+        self._condition = threading.Condition()
+        self._idle = {}
+        self._open_counts = {}
+        self._closed = False
+        self.opened = 0
+        self.reused = 0
+
+    def _acquire(self, key):
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise ValueError("connection pool is closed")
+                idle = self._idle.setdefault(key, [])
+                if idle:
+                    self.reused += 1
+                    return idle.pop()
+                if self._open_counts.get(key, 0) < self.max_size:
+                    self._open_counts[key] = self._open_counts.get(key, 0) + 1
+                    break
+                self._condition.wait()
+        try:
+            connection = self._connect(key)
+        except BaseException:
+            with self._condition:
+                self._open_counts[key] -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.opened += 1
+        return connection
+
+    def _release(self, key, connection, discard=False):
+        with self._condition:
+            if self._closed or discard:
+                self._open_counts[key] -= 1
+                connection.close()
+            else:
+                self._idle[key].append(connection)
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def connection(self, key):
+        """yields a pooled connection for the specified key, returning it to
+        the pool on exit. Connections in use when an error was raised are
+        closed rather than reused.
+
+        Args:
+            key (str): the pool key, normally a database path
+        """
+        connection = self._acquire(key)
+        discard = False
+        try:
+            yield connection
+        except Exception:
+            discard = True
+            raise
+        finally:
+            self._release(key, connection, discard)
+
+    def get_stats(self):
+        """Gets counters describing the pool's activity.
+
+        Returns:
+            dict: the number of connections "opened", the number of times an
+                existing connection was "reused", and the number of currently
+                "idle" connections.
+        """
+        with self._condition:
+            return {
+                "opened": self.opened,
+                "reused": self.reused,
+                "idle": sum(len(x) for x in self._idle.values()),
+            }
+
+    def close(self):
+        """Close all idle connections. Connections still in use are closed
+        as they are released.
+        """
+        with self._condition:
+            self._closed = True
+            for key, idle in self._idle.items():
+                for connection in idle:
+                    connection.close()
+                self._open_counts[key] -= len(idle)
+                idle.clear()
+            self._condition.notify_all()
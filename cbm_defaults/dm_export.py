@@ -0,0 +1,207 @@
+"""
+Export the disturbance matrices of a built cbm_defaults database to numpy
+files which simulators can load directly, rather than rebuilding each
+matrix from the rows of the disturbance_matrix_value table.
+
+The export directory contains:
+
+    * ``disturbance_matrices_csr.npz``: every matrix as a block of rows of
+      one compressed sparse row (CSR) matrix, with ``indptr``, ``indices``
+      and ``data`` arrays. The rows of the matrix at index i are the rows
+      ``i * n_pool`` to ``(i + 1) * n_pool`` of the CSR matrix, and rows and
+      columns are indexes in ``pool_ids``. The bundle also holds the
+      ``shape``, the ``disturbance_matrix_ids`` and the ``pool_ids`` arrays.
+    * ``disturbance_matrix_index.json``: the pool ids, and the index of the
+      matrix of each disturbance matrix id, including the ids listed in the
+      disturbance_matrix_alias table.
+    * ``disturbance_matrices_dense.npy``, optionally: a
+      ``[n_dm, n_pool, n_pool]`` float64 array, which can be memory mapped
+      with ``numpy.load(path, mmap_mode="r")`` and so shared by the
+      processes of a node.
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from cbm_defaults import helper
+from cbm_defaults import cbm_defaults_database
+
+logger = helper.get_logger()
+
+CSR_FILENAME = "disturbance_matrices_csr.npz"
+DENSE_FILENAME = "disturbance_matrices_dense.npy"
+INDEX_FILENAME = "disturbance_matrix_index.json"
+
+
+def _read_ids(connection, query):
+    return np.array(
+        [row[0] for row in connection.execute(query)], dtype="int64"
+    )
+
+
+def get_disturbance_matrix_index(connection):
+    """Get the index of the matrix of each disturbance matrix id in the
+    exported arrays.
+
+    Args:
+        connection (sqlite3.Connection): connection to a cbm_defaults
+            database
+
+    Returns:
+        tuple: the sorted disturbance_matrix ids (np.ndarray), and a dict of
+            disturbance matrix id to matrix index which also maps the
+            aliased ids to the index of the matrix stored for them
+    """
+    dmids = _read_ids(
+        connection, "SELECT id FROM disturbance_matrix ORDER BY id"
+    )
+    index = {int(dmid): i for i, dmid in enumerate(dmids)}
+    for alias_id, dmid in connection.execute(
+        "SELECT id, disturbance_matrix_id FROM disturbance_matrix_alias"
+    ):
+        index.setdefault(alias_id, index[dmid])
+    return dmids, index
+
+
+def get_csr_arrays(connection):
+    """Read the disturbance matrix values of a cbm_defaults database into
+    the arrays of a CSR matrix of n_dm * n_pool rows by n_pool columns.
+
+    Args:
+        connection (sqlite3.Connection): connection to a cbm_defaults
+            database
+
+    Returns:
+        dict: the "indptr", "indices", "data", "shape",
+            "disturbance_matrix_ids" and "pool_ids" arrays
+    """
+    dmids = _read_ids(
+        connection, "SELECT id FROM disturbance_matrix ORDER BY id"
+    )
+    pool_ids = _read_ids(connection, "SELECT id FROM pool ORDER BY id")
+    values = pd.read_sql_query(
+        "SELECT disturbance_matrix_id, source_pool_id, sink_pool_id, "
+        "proportion FROM disturbance_matrix_value "
+        "ORDER BY disturbance_matrix_id, source_pool_id, sink_pool_id",
+        connection,
+    )
+    n_dm = len(dmids)
+    n_pool = len(pool_ids)
+    rows = np.searchsorted(
+        dmids, values["disturbance_matrix_id"].to_numpy()
+    ) * n_pool + np.searchsorted(
+        pool_ids, values["source_pool_id"].to_numpy()
+    )
+    indptr = np.zeros(n_dm * n_pool + 1, dtype="int64")
+    np.cumsum(np.bincount(rows, minlength=n_dm * n_pool), out=indptr[1:])
+    return {
+        "indptr": indptr,
+        "indices": np.searchsorted(
+            pool_ids, values["sink_pool_id"].to_numpy()
+        ).astype("int32"),
+        "data": values["proportion"].to_numpy(dtype="float64"),
+        "shape": np.array([n_dm * n_pool, n_pool], dtype="int64"),
+        "disturbance_matrix_ids": dmids,
+        "pool_ids": pool_ids,
+    }
+
+
+def write_dense(path, csr_arrays):
+    """Write the matrices of the specified CSR arrays to a
+    ``[n_dm, n_pool, n_pool]`` float64 .npy file, filled through a memory
+    map rather than in memory.
+
+    Args:
+        path (str): path of the .npy file
+        csr_arrays (dict): arrays returned by :py:func:`get_csr_arrays`
+    """
+    n_dm = len(csr_arrays["disturbance_matrix_ids"])
+    n_pool = len(csr_arrays["pool_ids"])
+    dense = np.lib.format.open_memmap(
+        path, mode="w+", dtype="float64", shape=(n_dm, n_pool, n_pool)
+    )
+    rows = np.repeat(
+        np.arange(n_dm * n_pool), np.diff(csr_arrays["indptr"])
+    )
+    dense[
+        rows // n_pool, rows % n_pool, csr_arrays["indices"]
+    ] = csr_arrays["data"]
+    dense.flush()
+    del dense
+
+
+def export_disturbance_matrices(sqlite_path, output_dir, dense=False):
+    """Export the disturbance matrices of a cbm_defaults database, see the
+    module documentation for the files written.
+
+    Args:
+        sqlite_path (str): path to a cbm_defaults database
+        output_dir (str): directory into which the files are written,
+            created if it does not exist
+        dense (bool, optional): if set to True, the dense matrices are
+            written too. Defaults to False.
+
+    Returns:
+        dict: the file name of each of the files written, by "csr", "index"
+            and "dense" (None unless dense is set)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with cbm_defaults_database.get_connection(sqlite_path) as connection:
+        csr_arrays = get_csr_arrays(connection)
+        _, dm_index = get_disturbance_matrix_index(connection)
+
+    logger.info(
+        "exporting %d disturbance matrices to %s",
+        len(csr_arrays["disturbance_matrix_ids"]),
+        output_dir,
+    )
+    np.savez(os.path.join(output_dir, CSR_FILENAME), **csr_arrays)
+    with open(os.path.join(output_dir, INDEX_FILENAME), "w") as index_file:
+        json.dump(
+            {
+                "pool_ids": csr_arrays["pool_ids"].tolist(),
+                "disturbance_matrix_index": {
+                    str(k): v for k, v in sorted(dm_index.items())
+                },
+            },
+            index_file,
+            indent=4,
+        )
+    if dense:
+        write_dense(os.path.join(output_dir, DENSE_FILENAME), csr_arrays)
+    return {
+        "csr": CSR_FILENAME,
+        "index": INDEX_FILENAME,
+        "dense": DENSE_FILENAME if dense else None,
+    }
+
+
+def load_disturbance_matrix_index(output_dir):
+    """Load the index written by :py:func:`export_disturbance_matrices`
+
+    Args:
+        output_dir (str): the export directory
+
+    Returns:
+        tuple: the pool ids (list), and a dict of disturbance matrix id
+            (int) to matrix index
+    """
+    with open(os.path.join(output_dir, INDEX_FILENAME)) as index_file:
+        index = json.load(index_file)
+    return index["pool_ids"], {
+        int(k): v for k, v in index["disturbance_matrix_index"].items()
+    }
+
+
+def load_dense(output_dir):
+    """Memory map the dense matrices written by
+    :py:func:`export_disturbance_matrices`, read only.
+
+    Args:
+        output_dir (str): the export directory
+
+    Returns:
+        np.memmap: the ``[n_dm, n_pool, n_pool]`` matrices
+    """
+    return np.load(os.path.join(output_dir, DENSE_FILENAME), mmap_mode="r")
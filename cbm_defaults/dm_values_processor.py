@@ -1,13 +1,38 @@
+import hashlib
+from typing import Iterable
+from typing import Iterator
+from concurrent.futures import Executor
 import pandas as pd
 import numpy as np
-import itertools
+
+
+class DMValuesQAError(ValueError):
+    """Raised when rows of processed disturbance matrices do not sum to
+    1.0.
+
+    Args:
+        report (pd.DataFrame): one row per failing matrix row, with the
+            columns "DMID", "DMRow" (the cbm_defaults source pool id of the
+            row) and "rowsum"
+    """
+
+    def __init__(self, report: pd.DataFrame):
+        self.report = report
+        super().__init__(
+            f"rowsums not close to 1.0 in {len(report.index)} rows of "
+            f"{report['DMID'].nunique()} disturbance matrices:\n"
+            + report.head(20).to_string(index=False)
+        )
+
+    def __reduce__(self):
+        return (type(self), (self.report,))
 
 
 def process_dm_values(
-    rows: list, colnames: list[str], pool_cross_walk: dict[int, int]
+    rows: list | dict, colnames: list[str], pool_cross_walk: dict[int, int]
 ) -> pd.DataFrame:
 
-    # rows is a list of dicts with the following keys:
+    # rows is a list of dicts, or a dict of columns, with the following keys:
     # tblDMValuesLookup.DMID,
     # tblDMValuesLookup.DMRow,
     # tblDMValuesLookup.DMColumn,
@@ -54,40 +79,33 @@ def process_dm_values(
         # exclude the unmapped, and emission pools so they dont
         # appear in the diagonal to match CBM-CFS3 format
     ]
-    dmid_pool_id_combinations = list(
-        itertools.product(unique_dmids, all_unique_pool_ids)
-    )
 
+    # the diagonal value of every combination of DMID and pool: one minus
+    # the sum of the off-diagonal values of the row, or 1.0 for rows with no
+    # off-diagonal values
+    diag_dmids = np.repeat(
+        unique_dmids.to_numpy(dtype="int64"), len(all_unique_pool_ids)
+    )
+    diag_dmrow_dmcol = np.tile(
+        np.array(all_unique_pool_ids, dtype="int64"), len(unique_dmids)
+    )
     off_diag_rowsums = (
         aidb_dm_values.loc[
             aidb_dm_values["DMRow"] != aidb_dm_values["DMColumn"]
-        ][["DMID", "DMRow", "Proportion"]]
-        .groupby(["DMID", "DMRow"])
+        ]
+        .groupby(["DMID", "DMRow"])["Proportion"]
         .sum()
-        .reset_index()
+        .reindex(pd.MultiIndex.from_arrays([diag_dmids, diag_dmrow_dmcol]))
+        .to_numpy(dtype="float64")
+    )
+    retention = 1.0 - off_diag_rowsums
+    diag_proportions = np.where(
+        np.isnan(off_diag_rowsums),
+        1.0,
+        np.where(
+            np.isclose(np.abs(retention), 0.0, atol=1.e-5), 0.0, retention
+        ),
     )
-
-    off_diag_rowsums_dict = {
-        (int(row["DMID"]), int(row["DMRow"])): float(row["Proportion"])
-        for _, row in off_diag_rowsums.iterrows()
-    }
-
-    diag_proportions: list[float] = []
-    diag_dmids: list[int] = []
-    diag_dmrow_dmcol: list[int] = []
-    for combo in dmid_pool_id_combinations:
-        diag_dmids.append(int(combo[0]))
-        diag_dmrow_dmcol.append(int(combo[1]))
-        key = (int(combo[0]), int(combo[1]))
-        if key in off_diag_rowsums_dict:
-            row_sum = off_diag_rowsums_dict[key]
-            retention = 1.0 - row_sum
-            if np.isclose(abs(retention), 0.0, atol=1.e-5):
-                diag_proportions.append(0.0)
-            else:
-                diag_proportions.append(retention)
-        else:
-            diag_proportions.append(1.0)
 
     diag_dm_values = pd.DataFrame(
         columns=["DMID", "DMRow", "DMColumn", "Proportion"],
@@ -134,9 +152,166 @@ def process_dm_values(
         .groupby(["DMID", "DMRow"])
         .sum()["Proportion"]
     )
-    if not np.allclose(rowsums, 1.0, rtol=1e-3, atol=1.e-3):
-        raise ValueError("rowsums not close to 1.0")
+    rowsums_close = np.isclose(rowsums, 1.0, rtol=1e-3, atol=1.e-3)
+    if not rowsums_close.all():
+        raise DMValuesQAError(
+            rowsums[~rowsums_close].rename("rowsum").reset_index()
+        )
 
     return output_dm_values.sort_values(
         by=["DMID", "DMRow", "DMColumn"]
     ).reset_index(drop=True)
+
+
+def _process_partition(
+    rows: dict, colnames: list[str], pool_cross_walk: dict[int, int]
+) -> tuple:
+    """process_dm_values, returning the QA report rather than raising it"""
+    try:
+        return process_dm_values(rows, colnames, pool_cross_walk), None
+    except DMValuesQAError as error:
+        return None, error.report
+
+
+def process_dm_values_parallel(
+    rows: dict,
+    colnames: list[str],
+    pool_cross_walk: dict[int, int],
+    executor: Executor,
+    n_partitions: int,
+) -> pd.DataFrame:
+    """Run :py:func:`process_dm_values` on partitions of the matrices,
+    concurrently with the specified executor, normally a
+    ProcessPoolExecutor. The result is the same as processing all of the
+    matrices at once.
+
+    Args:
+        rows (dict): dictionary of column name to numpy array, see
+            :py:func:`process_dm_values`
+        colnames (list): the column names
+        pool_cross_walk (dict): CBM-CFS3 pool code to cbm_defaults pool id
+        executor (Executor): runs the partitions
+        n_partitions (int): the number of partitions of contiguous DMIDs
+
+    Raises:
+        DMValuesQAError: rows of one or more matrices do not sum to 1.0.
+            The report lists the failing rows of every partition.
+
+    Returns:
+        pd.DataFrame: the processed disturbance matrix values
+    """
+    # a stable sort keeps the order of the values within each matrix
+    order = np.argsort(rows["DMID"], kind="stable")
+    dmids = rows["DMID"][order]
+    unique_dmids = np.unique(dmids)
+    boundaries = np.searchsorted(
+        dmids,
+        [x[0] for x in np.array_split(unique_dmids, n_partitions) if len(x)],
+    )
+    boundaries = list(boundaries[1:]) + [len(dmids)]
+    futures = []
+    start = 0
+    for end in boundaries:
+        partition_order = order[start:end]
+        futures.append(
+            executor.submit(
+                _process_partition,
+                {k: v[partition_order] for k, v in rows.items()},
+                colnames,
+                pool_cross_walk,
+            )
+        )
+        start = end
+
+    results = []
+    reports = []
+    for future in futures:
+        result, report = future.result()
+        if report is not None:
+            reports.append(report)
+        else:
+            results.append(result)
+    if reports:
+        raise DMValuesQAError(pd.concat(reports, ignore_index=True))
+    return pd.concat(results, ignore_index=True)
+
+
+def iter_whole_matrices(batches: Iterable[dict]) -> Iterator[dict]:
+    """Regroup batches of disturbance matrix values into batches containing
+    only whole matrices, so that each can be passed to
+    :py:func:`process_dm_values` on its own.
+
+    The values of a matrix spanning several input batches are held back
+    until its last value is read, so at most one input batch, plus the
+    values of the matrix it ends in, are held at a time.
+
+    Args:
+        batches (iterable): dictionaries of column name to numpy array,
+            with at least a "DMID" column, ordered by DMID across all
+            batches
+
+    Raises:
+        ValueError: the values are not ordered by DMID
+
+    Yields:
+        dict: dictionaries of column name to numpy array, each containing
+            all of the values of the matrices it contains
+    """
+    pending = None
+    last_dmid = None
+    for batch in batches:
+        dmids = batch["DMID"]
+        if len(dmids) == 0:
+            continue
+        if (np.diff(dmids) < 0).any() or (
+            last_dmid is not None and dmids[0] < last_dmid
+        ):
+            raise ValueError(
+                "disturbance matrix values are not ordered by DMID"
+            )
+        last_dmid = dmids[-1]
+        if pending is not None:
+            batch = {
+                k: np.concatenate([pending[k], v]) for k, v in batch.items()
+            }
+        # the values of the last matrix may continue in the next batch
+        split = int(np.searchsorted(batch["DMID"], last_dmid, side="left"))
+        if split > 0:
+            yield {k: v[:split] for k, v in batch.items()}
+        pending = {k: v[split:] for k, v in batch.items()}
+    if pending is not None:
+        yield pending
+
+
+def hash_matrices(dm_values: pd.DataFrame) -> dict[int, str]:
+    """Compute a digest of each of the processed disturbance matrices, so
+    that identical matrices can be found. Two matrices have the same digest
+    when they have exactly the same rows (DMRow, DMColumn, Proportion),
+    regardless of their DMID.
+
+    Args:
+        dm_values (pd.DataFrame): processed disturbance matrix values, as
+            returned by :py:func:`process_dm_values`: sorted by DMID, DMRow
+            and DMColumn
+
+    Returns:
+        dict: DMID to the hexadecimal sha256 digest of the matrix, in
+            DMID order
+    """
+    dmids = dm_values["DMID"].to_numpy()
+    if len(dmids) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, dmids[1:] != dmids[:-1]])
+    ends = np.r_[starts[1:], len(dmids)]
+    pools = np.ascontiguousarray(
+        dm_values[["DMRow", "DMColumn"]].to_numpy(dtype="int64")
+    )
+    proportions = np.ascontiguousarray(
+        dm_values["Proportion"].to_numpy(dtype="float64")
+    )
+    digests = {}
+    for start, end in zip(starts, ends):
+        digest = hashlib.sha256(pools[start:end].tobytes())
+        digest.update(proportions[start:end].tobytes())
+        digests[int(dmids[start])] = digest.hexdigest()
+    return digests
@@ -0,0 +1,73 @@
+"""
+Denormalized lookup tables, optionally created in the built database: the
+joins of the example queries in the ``sql`` directory of this package,
+materialized for every locale, with covering indexes.
+
+For example, the values of the disturbance matrix of a disturbance type in
+a spatial unit, by name, are a single indexed read::
+
+    SELECT source, sink, proportion FROM disturbance_matrix_lookup
+    WHERE locale_code = 'en-CA'
+        AND admin_boundary_name = 'British Columbia'
+        AND eco_boundary_name = 'Pacific Maritime'
+        AND disturbance_type_name = 'Wildfire'
+"""
+
+import os
+
+# the lookup tables, and the tables they are joined from
+LOOKUP_TABLES = {
+    "disturbance_matrix_lookup": [
+        "disturbance_matrix_association",
+        "disturbance_matrix_value",
+        "spatial_unit",
+        "admin_boundary_tr",
+        "eco_boundary_tr",
+        "disturbance_type_tr",
+        "locale",
+        "pool",
+    ],
+    "spatial_unit_lookup": [
+        "spatial_unit",
+        "admin_boundary_tr",
+        "eco_boundary_tr",
+        "locale",
+    ],
+    "species_lookup": ["species_tr", "locale"],
+    "composite_flux_indicator_lookup": [
+        "composite_flux_indicator_category_tr",
+        "composite_flux_indicator",
+        "composite_flux_indicator_tr",
+        "composite_flux_indicator_value",
+        "flux_indicator",
+        "locale",
+    ],
+}
+
+
+def get_sql_dir():
+    """Gets the path to the directory of sql files bundled with this
+    package"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+
+
+def create_lookup_tables(connection):
+    """(Re)create the lookup tables, and their indexes, from the tables of
+    the connected cbm_defaults database.
+
+    Args:
+        connection (sqlite3.Connection): connection to a cbm_defaults
+            database
+
+    Returns:
+        dict: the number of rows of each lookup table
+    """
+    with open(os.path.join(get_sql_dir(), "lookup_tables.sql")) as sql_file:
+        statements = [x for x in sql_file.read().split(";") if x.strip()]
+    cursor = connection.cursor()
+    for statement in statements:
+        cursor.execute(statement)
+    return {
+        table: cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in LOOKUP_TABLES
+    }
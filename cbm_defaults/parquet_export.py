@@ -0,0 +1,218 @@
+"""
+Export the tables of a built cbm_defaults database to a Parquet dataset,
+for analytics which read whole tables or columns rather than running SQL
+queries. Requires the pyarrow package.
+
+The dataset directory contains one ``<table>.parquet`` file per table
+defined in the cbm_defaults schema, and a ``manifest.json`` file listing,
+for each table, its file, its row count and its columns with their arrow
+types, so that loaders can read only the tables and columns they need, see
+:py:func:`read_table`.
+
+Column types are derived from the declared types of the schema: integer
+columns are int64, double columns are float64 and text columns are
+strings, except for the integer columns of DECLARED_TYPE_OVERRIDES, which
+hold other values. The text columns of the localized (``_tr``) tables are
+dictionary encoded, since their values repeat across locales and rows.
+"""
+
+import os
+import json
+import sqlite3
+import contextlib
+import pandas as pd
+from cbm_defaults import helper
+from cbm_defaults import cbm_defaults_database
+from cbm_defaults import schema
+
+logger = helper.get_logger()
+
+MANIFEST_FILENAME = "manifest.json"
+
+# the number of rows read from the database and written per row group
+EXPORT_BATCH_SIZE = 100000
+
+# columns declared as integers in the schema which hold other values
+DECLARED_TYPE_OVERRIDES = {
+    ("locale", "code"): "varchar(255)",
+    ("biomass_to_carbon_rate", "rate"): "double(10)",
+    ("spinup_parameter", "historic_mean_temperature"): "double(10)",
+    ("random_return_interval", "a_Nu"): "double(10)",
+    ("random_return_interval", "b_Nu"): "double(10)",
+    ("random_return_interval", "a_Lambda"): "double(10)",
+    ("random_return_interval", "b_Lambda"): "double(10)",
+}
+
+
+def _get_arrow_type(declared_type, dictionary):
+    """get the arrow type of a column from its declared sqlite type, using
+    the sqlite type affinity rules
+    """
+    import pyarrow
+
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return pyarrow.int64()
+    if any(x in declared_type for x in ["CHAR", "CLOB", "TEXT"]):
+        if dictionary:
+            return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        return pyarrow.string()
+    if any(x in declared_type for x in ["REAL", "FLOA", "DOUB"]):
+        return pyarrow.float64()
+    raise ValueError(f"unsupported column type {declared_type}")
+
+
+def get_table_schemas(ddl_path=None):
+    """Get the arrow schema of each table defined in the cbm_defaults
+    schema.
+
+    Args:
+        ddl_path (str, optional): path to the DDL file. Defaults to the
+            DDL bundled with this package.
+
+    Returns:
+        dict: table name to pyarrow.Schema, in the order of the DDL
+    """
+    import pyarrow
+
+    if ddl_path is None:
+        ddl_path = schema.get_ddl_path()
+    with contextlib.closing(sqlite3.connect(":memory:")) as connection:
+        cbm_defaults_database.execute_ddl(connection, ddl_path, indexes=False)
+        table_names = [
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "ORDER BY rowid"
+            )
+        ]
+        table_schemas = {}
+        for table_name in table_names:
+            fields = []
+            for _, name, declared_type, notnull, _, pk in connection.execute(
+                f"PRAGMA table_info({table_name})"
+            ):
+                declared_type = DECLARED_TYPE_OVERRIDES.get(
+                    (table_name, name), declared_type
+                )
+                fields.append(
+                    pyarrow.field(
+                        name,
+                        _get_arrow_type(
+                            declared_type, table_name.endswith("_tr")
+                        ),
+                        nullable=not (notnull or pk),
+                    )
+                )
+            table_schemas[table_name] = pyarrow.schema(fields)
+    return table_schemas
+
+
+def _write_table(connection, table_name, table_schema, path):
+    """write the rows of a table to a parquet file, EXPORT_BATCH_SIZE rows
+    at a time, and return the number of rows written. Values are cast
+    safely to the column types, so that a value which does not fit its
+    column, such as a real number in an integer column, raises
+    pyarrow.ArrowInvalid rather than being truncated.
+    """
+    import pyarrow
+    import pyarrow.parquet
+
+    cursor = connection.execute(
+        "SELECT {columns} FROM {table}".format(
+            columns=", ".join(table_schema.names), table=table_name
+        )
+    )
+    n_rows = 0
+    with pyarrow.parquet.ParquetWriter(path, table_schema) as writer:
+        for rows in iter(lambda: cursor.fetchmany(EXPORT_BATCH_SIZE), []):
+            writer.write_table(
+                pyarrow.Table.from_arrays(
+                    [
+                        pyarrow.array(values).cast(field.type)
+                        for values, field in zip(zip(*rows), table_schema)
+                    ],
+                    schema=table_schema,
+                )
+            )
+            n_rows += len(rows)
+    return n_rows
+
+
+def export_parquet(sqlite_path, output_dir):
+    """Export every table of the cbm_defaults schema from a cbm_defaults
+    database to a Parquet dataset. See the module documentation.
+
+    Args:
+        sqlite_path (str): path to a cbm_defaults database
+        output_dir (str): directory into which the dataset is written,
+            created if it does not exist
+
+    Returns:
+        dict: the dataset manifest, which is also written to
+            manifest.json in output_dir
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"tables": {}}
+    with cbm_defaults_database.get_connection(sqlite_path) as connection:
+        for table_name, table_schema in get_table_schemas().items():
+            filename = f"{table_name}.parquet"
+            n_rows = _write_table(
+                connection,
+                table_name,
+                table_schema,
+                os.path.join(output_dir, filename),
+            )
+            logger.info("exported %d rows of %s", n_rows, table_name)
+            manifest["tables"][table_name] = {
+                "path": filename,
+                "num_rows": n_rows,
+                "columns": [
+                    {
+                        "name": field.name,
+                        "type": str(field.type),
+                        "nullable": field.nullable,
+                    }
+                    for field in table_schema
+                ],
+            }
+    with open(
+        os.path.join(output_dir, MANIFEST_FILENAME), "w"
+    ) as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    return manifest
+
+
+def read_manifest(dataset_dir):
+    """Read the manifest of a dataset written by :py:func:`export_parquet`
+
+    Args:
+        dataset_dir (str): the dataset directory
+
+    Returns:
+        dict: the dataset manifest
+    """
+    with open(os.path.join(dataset_dir, MANIFEST_FILENAME)) as manifest_file:
+        return json.load(manifest_file)
+
+
+def read_table(dataset_dir, table_name, columns=None):
+    """Read one table of a dataset written by :py:func:`export_parquet`
+
+    Args:
+        dataset_dir (str): the dataset directory
+        table_name (str): the name of the table
+        columns (list, optional): the columns to read. Defaults to all
+            columns.
+
+    Raises:
+        KeyError: the table is not in the dataset
+
+    Returns:
+        pandas.DataFrame: the table, with categorical dtypes for
+            dictionary encoded columns
+    """
+    table = read_manifest(dataset_dir)["tables"][table_name]
+    return pd.read_parquet(
+        os.path.join(dataset_dir, table["path"]), columns=columns
+    )
@@ -0,0 +1,152 @@
+"""
+Timing statistics of archive index queries, and a log of the queries
+slower than a configurable threshold.
+
+Slow queries are logged as warnings to the "cbm_defaults.slow_queries"
+logger, so that they can be routed to a separate log file with a handler
+on that logger.
+"""
+
+import logging
+import threading
+
+slow_query_logger = logging.getLogger("cbm_defaults.slow_queries")
+
+
+###############################################################################
+class QueryRecord:
+    """The statistics of a single archive index query.
+
+    Args:
+        name (str): the name of the query file, or the start of the sql for
+            queries not loaded from a file
+        locale (str): the code of the locale queried
+        param_count (int): the number of query parameters
+        rows (int): the number of rows fetched
+        connect_time (float): seconds spent opening, or waiting for, a
+            pooled connection
+        query_time (float): seconds spent running the query and fetching
+            its rows
+    """
+
+    __slots__ = [
+        "name",
+        "locale",
+        "param_count",
+        "rows",
+        "connect_time",
+        "query_time",
+    ]
+
+    def __init__(
+        self, name, locale, param_count, rows, connect_time, query_time
+    ):
+        self.name = name
+        self.locale = locale
+        self.param_count = param_count
+        self.rows = rows
+        self.connect_time = connect_time
+        self.query_time = query_time
+
+    @property
+    def total_time(self):
+        return self.connect_time + self.query_time
+
+    def to_dict(self):
+        return {x: getattr(self, x) for x in self.__slots__}
+
+
+###############################################################################
+class QueryStats:
+    """Thread-safe collector of :py:class:`QueryRecord`.
+
+    Args:
+        slow_query_threshold (float, optional): queries whose total time,
+            in seconds, is at least this threshold are kept in
+            :py:attr:`slow_queries` and logged. If unspecified, no query is
+            considered slow. Defaults to None.
+    """
+
+    def __init__(self, slow_query_threshold=None):
+        self.slow_query_threshold = slow_query_threshold
+        self._records = []
+        self._slow_queries = []
+        self._lock = threading.Lock()
+
+    @property
+    def records(self):
+        """list: every query recorded, in the order they completed"""
+        with self._lock:
+            return list(self._records)
+
+    @property
+    def slow_queries(self):
+        """list: the queries at or above the slow query threshold"""
+        with self._lock:
+            return list(self._slow_queries)
+
+    def add(self, record):
+        """Add the statistics of a query, and log it if it is slow.
+
+        Args:
+            record (QueryRecord): the query statistics
+        """
+        slow = (
+            self.slow_query_threshold is not None
+            and record.total_time >= self.slow_query_threshold
+        )
+        with self._lock:
+            self._records.append(record)
+            if slow:
+                self._slow_queries.append(record)
+        if slow:
+            slow_query_logger.warning(
+                "slow query %s (locale %s, %d params): %d rows in %.3fs, "
+                "connection %.3fs",
+                record.name,
+                record.locale,
+                record.param_count,
+                record.rows,
+                record.query_time,
+                record.connect_time,
+            )
+
+    def clear(self):
+        """Remove all recorded queries"""
+        with self._lock:
+            self._records = []
+            self._slow_queries = []
+
+    def get_summary(self):
+        """Get the statistics of the recorded queries grouped by query name,
+        with the queries taking the most total time first.
+
+        Returns:
+            list: one json serializable dictionary per query name with the
+                number of "calls", the "total_time", "connect_time",
+                "query_time" and "max_time" in seconds, and the "rows"
+                fetched
+        """
+        summary = {}
+        for record in self.records:
+            item = summary.setdefault(
+                record.name,
+                {
+                    "name": record.name,
+                    "calls": 0,
+                    "total_time": 0.0,
+                    "connect_time": 0.0,
+                    "query_time": 0.0,
+                    "max_time": 0.0,
+                    "rows": 0,
+                },
+            )
+            item["calls"] += 1
+            item["total_time"] += record.total_time
+            item["connect_time"] += record.connect_time
+            item["query_time"] += record.query_time
+            item["max_time"] = max(item["max_time"], record.total_time)
+            item["rows"] += record.rows
+        return sorted(
+            summary.values(), key=lambda x: x["total_time"], reverse=True
+        )
@@ -0,0 +1,59 @@
+"""Callable python script to export archive index databases to a snapshot
+"""
+import os
+import argparse
+import datetime
+from cbm_defaults import helper
+from cbm_defaults import app
+from cbm_defaults import aidb_snapshot
+
+logger = helper.get_logger()
+
+
+def main():
+    """
+    Runs :py:func:`cbm_defaults.app.export_snapshot`
+    """
+    try:
+        logpath = os.path.join(
+            "{0}_{1}.log".format(
+                "cbm_defaults_aidb_snapshot",
+                datetime.datetime.now().strftime("%Y-%m-%d %H_%M_%S"),
+            )
+        )
+        helper.start_logging(logpath, "w+")
+
+        parser = argparse.ArgumentParser(
+            description="""script to copy the CBM-CFS3 archive index tables
+            used by cbm_defaults into a local SQLite or Parquet snapshot"""
+        )
+        parser.add_argument(
+            "--config_path",
+            required=True,
+            help="path to a json formatted config file",
+        )
+        parser.add_argument(
+            "--output_dir",
+            required=True,
+            type=os.path.abspath,
+            help="directory into which the snapshot is written",
+        )
+        parser.add_argument(
+            "--format",
+            default="sqlite",
+            choices=aidb_snapshot.SNAPSHOT_FORMATS,
+            help="snapshot storage format",
+        )
+        args = parser.parse_args()
+
+        logger.info("startup")
+        config = os.path.abspath(args.config_path)
+        app.export_snapshot(config, args.output_dir, args.format)
+        logger.info("finished")
+
+    except:  # noqa E722
+        logger.exception("")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """Callable python script to create cbm_defaults database
 """
 import os
+import json
 import argparse
 import datetime
 from cbm_defaults import helper
@@ -32,10 +33,38 @@ def main():
             required=True,
             help="path to a json formatted config file",
         )
+        parser.add_argument(
+            "--fast_build",
+            action="store_true",
+            help="build the database in memory and write it to the output "
+            "path once complete",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="if the output path exists, only rebuild the tables whose "
+            "inputs changed since it was built",
+        )
+        parser.add_argument(
+            "--profile-report",
+            help="path of a json file to which the time, rows and peak "
+            "memory of each build step are written",
+        )
         args = parser.parse_args()
 
         logger.info("startup")
         config = os.path.abspath(args.config_path)
+        if args.fast_build or args.incremental or args.profile_report:
+            with open(config, "r") as config_file:
+                config = json.load(config_file)
+            if args.fast_build:
+                config["fast_build"] = True
+            if args.incremental:
+                config["incremental"] = True
+            if args.profile_report:
+                config["profile_report"] = os.path.abspath(
+                    args.profile_report
+                )
         app.run(config)
         logger.info("finished")
 
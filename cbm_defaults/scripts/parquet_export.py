@@ -0,0 +1,52 @@
+"""Callable python script to export a cbm_defaults database to Parquet
+"""
+import os
+import argparse
+import datetime
+from cbm_defaults import helper
+from cbm_defaults import parquet_export
+
+logger = helper.get_logger()
+
+
+def main():
+    """
+    Runs :py:func:`cbm_defaults.parquet_export.export_parquet`
+    """
+    try:
+        logpath = os.path.join(
+            "{0}_{1}.log".format(
+                "cbm_defaults_parquet_export",
+                datetime.datetime.now().strftime("%Y-%m-%d %H_%M_%S"),
+            )
+        )
+        helper.start_logging(logpath, "w+")
+
+        parser = argparse.ArgumentParser(
+            description="""script to export every table of a cbm_defaults
+            database to a Parquet dataset"""
+        )
+        parser.add_argument(
+            "--db_path",
+            required=True,
+            type=os.path.abspath,
+            help="path to a cbm_defaults database",
+        )
+        parser.add_argument(
+            "--output_dir",
+            required=True,
+            type=os.path.abspath,
+            help="directory into which the dataset is written",
+        )
+        args = parser.parse_args()
+
+        logger.info("startup")
+        parquet_export.export_parquet(args.db_path, args.output_dir)
+        logger.info("finished")
+
+    except:  # noqa E722
+        logger.exception("")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Export the parameters of each spatial unit of a built cbm_defaults
+database to a numpy structured array, so that simulations can look up the
+parameters of their stands by indexing the array with spatial unit ids,
+rather than joining the parameter tables for each stand.
+
+Each record pre-joins a spatial_unit row with its admin_boundary and
+stump_parameter, its eco_boundary and turnover_parameter, its
+root_parameter and its spinup_parameter. The record of a spatial unit is
+at the index of its id, and the records of ids with no spatial unit, such
+as index 0, are zeros, including their ``spatial_unit_id`` field. The
+array is written as a .npy file, which can be memory mapped with
+:py:func:`load_spatial_unit_parameters`.
+"""
+
+import numpy as np
+from cbm_defaults import helper
+from cbm_defaults import cbm_defaults_database
+from cbm_defaults.parquet_export import DECLARED_TYPE_OVERRIDES
+
+logger = helper.get_logger()
+
+# the joined tables: the name of each table, and the join condition of the
+# tables after spatial_unit
+PARAMETER_TABLES = [
+    ("spatial_unit", None),
+    ("admin_boundary", "admin_boundary.id = spatial_unit.admin_boundary_id"),
+    (
+        "stump_parameter",
+        "stump_parameter.id = admin_boundary.stump_parameter_id",
+    ),
+    ("eco_boundary", "eco_boundary.id = spatial_unit.eco_boundary_id"),
+    (
+        "turnover_parameter",
+        "turnover_parameter.id = eco_boundary.turnover_parameter_id",
+    ),
+    ("root_parameter", "root_parameter.id = spatial_unit.root_parameter_id"),
+    (
+        "spinup_parameter",
+        "spinup_parameter.id = spatial_unit.spinup_parameter_id",
+    ),
+]
+
+
+def _get_numpy_dtype(declared_type):
+    """get the numpy dtype of a column from its declared sqlite type"""
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return "int64"
+    if any(x in declared_type for x in ["REAL", "FLOA", "DOUB"]):
+        return "float64"
+    raise ValueError(f"unsupported column type {declared_type}")
+
+
+def get_parameter_columns(connection):
+    """Get the columns of the spatial unit parameter records: every column
+    of the joined tables except their ids, which are already the foreign
+    keys of the table joining them, and the spatial unit id.
+
+    Args:
+        connection (sqlite3.Connection): connection to a cbm_defaults
+            database
+
+    Returns:
+        list: (field name, "table.column", numpy dtype) tuples
+    """
+    columns = [("spatial_unit_id", "spatial_unit.id", "int64")]
+    for table_name, _ in PARAMETER_TABLES:
+        for _, name, declared_type, _, _, _ in connection.execute(
+            f"PRAGMA table_info({table_name})"
+        ):
+            if name == "id":
+                continue
+            if name in [x[0] for x in columns]:
+                raise ValueError(f"duplicate parameter column {name}")
+            columns.append(
+                (
+                    name,
+                    f"{table_name}.{name}",
+                    _get_numpy_dtype(
+                        DECLARED_TYPE_OVERRIDES.get(
+                            (table_name, name), declared_type
+                        )
+                    ),
+                )
+            )
+    return columns
+
+
+def get_spatial_unit_parameters(connection):
+    """Read the parameters of every spatial unit into a structured array
+    indexed by spatial unit id. See the module documentation.
+
+    Args:
+        connection (sqlite3.Connection): connection to a cbm_defaults
+            database
+
+    Returns:
+        np.ndarray: structured array of length max(spatial unit id) + 1
+    """
+    columns = get_parameter_columns(connection)
+    joins = "".join(
+        f" INNER JOIN {table_name} ON {condition}"
+        for table_name, condition in PARAMETER_TABLES[1:]
+    )
+    rows = connection.execute(
+        "SELECT {columns} FROM spatial_unit{joins} "
+        "ORDER BY spatial_unit.id".format(
+            columns=", ".join(x[1] for x in columns), joins=joins
+        )
+    ).fetchall()
+    dtype = np.dtype([(name, dtype) for name, _, dtype in columns])
+    records = np.array(rows, dtype=dtype)
+    result = np.zeros(
+        records["spatial_unit_id"].max() + 1 if len(rows) else 0,
+        dtype=dtype,
+    )
+    result[records["spatial_unit_id"]] = records
+    return result
+
+
+def export_spatial_unit_parameters(sqlite_path, output_path):
+    """Export the parameters of every spatial unit of a cbm_defaults
+    database to a .npy file. See the module documentation.
+
+    Args:
+        sqlite_path (str): path to a cbm_defaults database
+        output_path (str): path of the .npy file
+    """
+    with cbm_defaults_database.get_connection(sqlite_path) as connection:
+        parameters = get_spatial_unit_parameters(connection)
+    logger.info(
+        "exporting the parameters of %d spatial units to %s",
+        np.count_nonzero(parameters["spatial_unit_id"]),
+        output_path,
+    )
+    np.save(output_path, parameters)
+
+
+def load_spatial_unit_parameters(path):
+    """Memory map, read only, the spatial unit parameters written by
+    :py:func:`export_spatial_unit_parameters`.
+
+    Example::
+
+        parameters = load_spatial_unit_parameters(path)
+        # the turnover parameters of each stand
+        stand_parameters = parameters[stand_spatial_unit_ids]
+        sw_foliage = stand_parameters["sw_foliage"]
+
+    Args:
+        path (str): path of the .npy file
+
+    Returns:
+        np.memmap: the structured array of the parameters, indexed by
+            spatial unit id
+    """
+    return np.load(path, mmap_mode="r")
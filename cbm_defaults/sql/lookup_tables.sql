@@ -0,0 +1,102 @@
+-- denormalized versions of the views in this directory, for every locale,
+-- each with covering indexes for its lookups: filter on locale_code and
+-- the name or id columns leading an index, and select columns of the same
+-- index, for a single indexed read.
+-- See cbm_defaults.lookup_tables
+drop table if exists disturbance_matrix_lookup;
+create table disturbance_matrix_lookup as
+select
+ locale.code as locale_code,
+ admin_boundary_tr.name as admin_boundary_name,
+ eco_boundary_tr.name as eco_boundary_name,
+ disturbance_type_tr.name as disturbance_type_name,
+ disturbance_matrix_association.spatial_unit_id,
+ disturbance_matrix_association.disturbance_type_id,
+ disturbance_matrix_value.disturbance_matrix_id,
+ source_pool.code as source,
+ sink_pool.code as sink,
+ disturbance_matrix_value.proportion
+from disturbance_matrix_association
+inner join disturbance_matrix_value
+    on disturbance_matrix_value.disturbance_matrix_id = disturbance_matrix_association.disturbance_matrix_id
+inner join spatial_unit on spatial_unit.id = disturbance_matrix_association.spatial_unit_id
+inner join admin_boundary_tr on admin_boundary_tr.admin_boundary_id = spatial_unit.admin_boundary_id
+inner join eco_boundary_tr
+    on eco_boundary_tr.eco_boundary_id = spatial_unit.eco_boundary_id
+    and eco_boundary_tr.locale_id = admin_boundary_tr.locale_id
+inner join disturbance_type_tr
+    on disturbance_type_tr.disturbance_type_id = disturbance_matrix_association.disturbance_type_id
+    and disturbance_type_tr.locale_id = admin_boundary_tr.locale_id
+inner join locale on locale.id = admin_boundary_tr.locale_id
+inner join pool source_pool on source_pool.id = disturbance_matrix_value.source_pool_id
+inner join pool sink_pool on sink_pool.id = disturbance_matrix_value.sink_pool_id
+order by locale_code, admin_boundary_name, eco_boundary_name, disturbance_type_name, source, sink;
+create index disturbance_matrix_lookup_by_name on disturbance_matrix_lookup (
+ locale_code, admin_boundary_name, eco_boundary_name, disturbance_type_name,
+ source, sink, proportion, disturbance_matrix_id);
+create index disturbance_matrix_lookup_by_id on disturbance_matrix_lookup (
+ locale_code, spatial_unit_id, disturbance_type_id,
+ source, sink, proportion, disturbance_matrix_id);
+
+drop table if exists spatial_unit_lookup;
+create table spatial_unit_lookup as
+select
+ locale.code as locale_code,
+ spatial_unit.id as spatial_unit_id,
+ admin_boundary_tr.name as admin_boundary_name,
+ eco_boundary_tr.name as eco_boundary_name
+from spatial_unit
+inner join admin_boundary_tr on admin_boundary_tr.admin_boundary_id = spatial_unit.admin_boundary_id
+inner join eco_boundary_tr
+    on eco_boundary_tr.eco_boundary_id = spatial_unit.eco_boundary_id
+    and eco_boundary_tr.locale_id = admin_boundary_tr.locale_id
+inner join locale on locale.id = admin_boundary_tr.locale_id
+order by locale_code, spatial_unit_id;
+create index spatial_unit_lookup_by_name on spatial_unit_lookup (
+ locale_code, admin_boundary_name, eco_boundary_name, spatial_unit_id);
+create index spatial_unit_lookup_by_id on spatial_unit_lookup (
+ locale_code, spatial_unit_id, admin_boundary_name, eco_boundary_name);
+
+drop table if exists species_lookup;
+create table species_lookup as
+select
+ locale.code as locale_code,
+ species_tr.species_id,
+ species_tr.name as species_name
+from species_tr
+inner join locale on locale.id = species_tr.locale_id
+order by locale_code, species_id;
+create index species_lookup_by_name on species_lookup (
+ locale_code, species_name, species_id);
+create index species_lookup_by_id on species_lookup (
+ locale_code, species_id, species_name);
+
+drop table if exists composite_flux_indicator_lookup;
+create table composite_flux_indicator_lookup as
+select
+ locale.code as locale_code,
+ composite_flux_indicator.id as composite_flux_indicator_id,
+ composite_flux_indicator_category_tr.category_name,
+ composite_flux_indicator_category_tr.subcategory_name,
+ composite_flux_indicator_tr.name,
+ flux_indicator.id as flux_indicator_id,
+ flux_indicator.name as flux_indicator_name
+from composite_flux_indicator_category_tr
+inner join composite_flux_indicator
+    on composite_flux_indicator.composite_flux_indicator_category_id = composite_flux_indicator_category_tr.composite_flux_indicator_category_id
+inner join composite_flux_indicator_tr
+    on composite_flux_indicator_tr.composite_flux_indicator_id = composite_flux_indicator.id
+    and composite_flux_indicator_tr.locale_id = composite_flux_indicator_category_tr.locale_id
+inner join composite_flux_indicator_value
+    on composite_flux_indicator_value.composite_flux_indicator_id = composite_flux_indicator.id
+inner join flux_indicator on flux_indicator.id = composite_flux_indicator_value.flux_indicator_id
+inner join locale on locale.id = composite_flux_indicator_category_tr.locale_id
+order by locale_code, composite_flux_indicator_id, flux_indicator_id;
+create index composite_flux_indicator_lookup_by_name
+ on composite_flux_indicator_lookup (
+ locale_code, name, flux_indicator_id, flux_indicator_name,
+ composite_flux_indicator_id, category_name, subcategory_name);
+create index composite_flux_indicator_lookup_by_category
+ on composite_flux_indicator_lookup (
+ locale_code, category_name, subcategory_name, name,
+ composite_flux_indicator_id, flux_indicator_id, flux_indicator_name);
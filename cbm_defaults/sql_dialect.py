@@ -0,0 +1,192 @@
+"""
+Translation of MS-Access (Jet) SQL queries into the SQLite dialect, so that
+the archive index queries can run against a SQLite copy of the archive
+index database.
+
+The following Access constructs are rewritten:
+
+    * ``IIF(condition, a, b)`` becomes ``CASE WHEN condition THEN a ELSE b
+      END``
+    * ``[bracket quoted]`` identifiers become ``"double quoted"``
+      identifiers, and ``"double quoted"`` string literals become
+      ``'single quoted'`` literals
+    * ``#date#`` literals become ISO formatted string literals
+    * ``&`` string concatenation becomes ``||``, and ``MOD`` becomes ``%``
+    * ``True``/``False`` become ``1``/``0``, and ``DISTINCTROW`` becomes
+      ``DISTINCT``
+    * the ``Nz``, ``Len``, ``UCase``, ``LCase`` and ``Mid`` functions become
+      ``ifnull``, ``length``, ``upper``, ``lower`` and ``substr``
+    * the ``*`` and ``?`` wildcards in ``LIKE`` patterns become ``%`` and
+      ``_``
+    * a trailing ``;`` is removed
+
+Parenthesised nested joins and ``?`` query parameters are valid SQLite and
+are left as they are.
+"""
+
+import re
+import datetime
+import functools
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+    | (?P<bracket>\[[^\]]*\])
+    | (?P<date>\#[^#]*\#)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+    | (?P<space>\s+)
+    | (?P<op><>|<=|>=|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_FUNCTIONS = {
+    "NZ": "ifnull",
+    "LEN": "length",
+    "UCASE": "upper",
+    "LCASE": "lower",
+    "MID": "substr",
+}
+
+_KEYWORDS = {
+    "TRUE": "1",
+    "FALSE": "0",
+    "DISTINCTROW": "DISTINCT",
+    "MOD": "%",
+}
+
+_DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y",
+    "%m/%d/%Y %H:%M:%S",
+]
+
+
+def _tokenize(sql):
+    return [(m.lastgroup, m.group()) for m in _TOKEN_PATTERN.finditer(sql)]
+
+
+def _next_token_index(tokens, index):
+    """index of the next non-whitespace token at or after index"""
+    while index < len(tokens) and tokens[index][0] == "space":
+        index += 1
+    return index
+
+
+def _split_call_args(tokens, open_index):
+    """split the tokens of a function call at top level commas, returning the
+    argument token lists and the index of the closing parenthesis
+    """
+    args = [[]]
+    depth = 0
+    for index in range(open_index + 1, len(tokens)):
+        kind, text = tokens[index]
+        if kind == "op" and text == "(":
+            depth += 1
+        elif kind == "op" and text == ")":
+            if depth == 0:
+                return args, index
+            depth -= 1
+        elif kind == "op" and text == "," and depth == 0:
+            args.append([])
+            continue
+        args[-1].append(tokens[index])
+    raise ValueError("unbalanced parentheses in query")
+
+
+def _translate_string(text):
+    if text.startswith('"'):
+        value = text[1:-1].replace('""', '"').replace("'", "''")
+        return f"'{value}'"
+    return text
+
+
+def _translate_date(text):
+    value = text[1:-1].strip()
+    for date_format in _DATE_FORMATS:
+        try:
+            parsed = datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        if parsed.time() == datetime.time():
+            return f"'{parsed.date().isoformat()}'"
+        return f"'{parsed.isoformat(sep=' ')}'"
+    raise ValueError(f"unsupported date literal {text}")
+
+
+def _translate_tokens(tokens):
+    output = []
+    previous_word = None
+    index = 0
+    while index < len(tokens):
+        kind, text = tokens[index]
+        upper = text.upper()
+        if kind == "word":
+            open_index = _next_token_index(tokens, index + 1)
+            is_call = (
+                open_index < len(tokens) and tokens[open_index] == ("op", "(")
+            )
+            if is_call and upper == "IIF":
+                args, close_index = _split_call_args(tokens, open_index)
+                if len(args) != 3:
+                    raise ValueError("IIF expects exactly 3 arguments")
+                condition, true_part, false_part = [
+                    _translate_tokens(x).strip() for x in args
+                ]
+                output.append(
+                    f"CASE WHEN {condition} THEN {true_part} "
+                    f"ELSE {false_part} END"
+                )
+                index = close_index + 1
+                previous_word = None
+                continue
+            elif is_call and upper in _FUNCTIONS:
+                output.append(_FUNCTIONS[upper])
+            elif upper in _KEYWORDS:
+                output.append(_KEYWORDS[upper])
+            else:
+                output.append(text)
+            previous_word = upper
+        elif kind == "string":
+            value = _translate_string(text)
+            if previous_word == "LIKE":
+                value = value.replace("*", "%").replace("?", "_")
+            output.append(value)
+            previous_word = None
+        elif kind == "bracket":
+            value = text[1:-1].replace('"', '""')
+            output.append(f'"{value}"')
+            previous_word = None
+        elif kind == "date":
+            output.append(_translate_date(text))
+            previous_word = None
+        elif kind == "op" and text == "&":
+            output.append("||")
+            previous_word = None
+        else:
+            output.append(text)
+            if kind != "space":
+                previous_word = None
+        index += 1
+    return "".join(output)
+
+
+@functools.lru_cache(maxsize=None)
+def to_sqlite(sql):
+    """Translate the specified MS-Access query into the SQLite dialect.
+    Results are cached, so repeated translations of the same query text
+    are free.
+
+    Args:
+        sql (str): an MS-Access query
+
+    Raises:
+        ValueError: the query contains a construct that cannot be
+            translated
+
+    Returns:
+        str: the equivalent SQLite query
+    """
+    return _translate_tokens(_tokenize(sql)).strip().rstrip(";").rstrip()
@@ -40,7 +40,9 @@ def _1x_to_2x_updates(input_db_path: str, output_db_path: str):
         # Run the DDL file on it to create all tables #
         schema_path = schema.get_ddl_path()
         logger.info("running DDL statements %s", schema_path)
-        cbm_defaults_database.execute_ddl_file(schema_path, output_path)
+        cbm_defaults_database.execute_ddl_file(
+            schema_path, output_path, indexes=False
+        )
 
         land_type_df = load_land_classes(input_db_engine, output_db_engine)
 
@@ -52,10 +54,22 @@ def _1x_to_2x_updates(input_db_path: str, output_db_path: str):
         input_db_engine.dispose()
         output_db_engine.dispose()
 
+    # indexes are built once all tables are loaded #
+    with cbm_defaults_database.get_connection(output_path) as connection:
+        cbm_defaults_database.create_indexes(connection, schema_path)
+        connection.commit()
+
 
 def load_other_tables(input_db_engine, output_db_engine):
     output_db_inspector = sqlalchemy.inspect(output_db_engine)
+    input_table_names = set(
+        sqlalchemy.inspect(input_db_engine).get_table_names()
+    )
     for table in output_db_inspector.get_table_names():
+        if table not in input_table_names:
+            # tables added to the schema after 1.x, such as
+            # disturbance_matrix_alias, are left empty
+            continue
         if table in [
             "disturbance_type",
             "land_class",
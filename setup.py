@@ -31,13 +31,23 @@ setup(
             "schema/cbmDefaults.ddl",
             "tables/*.csv",
             "archive_index_queries/*.sql",
+            "archive_index_queries/*.json",
+            "sql/*.sql",
         ]
     },
     entry_points={
         "console_scripts": [
             "cbm_defaults_export = cbm_defaults.scripts.main:main",
             "cbm_defaults_db_update = cbm_defaults.scripts.db_update:main",
+            "cbm_defaults_aidb_snapshot = "
+            "cbm_defaults.scripts.aidb_snapshot:main",
+            "cbm_defaults_parquet_export = "
+            "cbm_defaults.scripts.parquet_export:main",
         ]
     },
     install_requires=requirements,
+    extras_require={
+        "parquet": ["pyarrow"],
+        "test": ["pytest", "pytest-benchmark"],
+    },
 )
@@ -0,0 +1,163 @@
+"""
+SQLite stand-in for the CBM-CFS3 archive index database schema, restricted
+to the tables and columns read by cbm_defaults.
+"""
+
+AFFORESTATION_POOL_COLUMNS = [
+    "SW_FoliageBiomassCarbon",
+    "SW_MerchantableBiomassCarbon",
+    "SW_OtherBiomassCarbon",
+    "SW_CoarseRootBiomassCarbon",
+    "SW_FineRootBiomassCarbon",
+    "HW_FoliageBiomassCarbon",
+    "HW_MerchantableBiomassCarbon",
+    "HW_OtherBiomassCarbon",
+    "HW_CoarseRootBiomassCarbon",
+    "HW_FineRootBiomassCarbon",
+    "VFSoilPoolC_AG",
+    "VFSoilPoolC_BG",
+    "FSoilPoolC_AG",
+    "FSoilPoolC_BG",
+    "MSoilPoolC",
+    "SSoilPoolC_AG",
+    "SSoilPoolC_BG",
+    "StemSnagPoolC_SW",
+    "BranchSnagPoolC_SW",
+    "StemSnagPoolC_HW",
+    "BranchSnagPoolC_HW",
+]
+
+VOL_TO_BIO_COLUMNS = [
+    "A",
+    "B",
+    "a_nonmerch",
+    "b_nonmerch",
+    "k_nonmerch",
+    "cap_nonmerch",
+    "a_sap",
+    "b_sap",
+    "k_sap",
+    "cap_sap",
+    "a1",
+    "a2",
+    "a3",
+    "b1",
+    "b2",
+    "b3",
+    "c1",
+    "c2",
+    "c3",
+    "min_volume",
+    "max_volume",
+    "low_stemwood_prop",
+    "high_stemwood_prop",
+    "low_stembark_prop",
+    "high_stembark_prop",
+    "low_branches_prop",
+    "high_branches_prop",
+    "low_foliage_prop",
+    "high_foliage_prop",
+]
+
+AIDB_TABLES = {
+    "tblAdminBoundaryDefault": [
+        "AdminBoundaryID",
+        "AdminBoundaryName",
+        "SoftwoodTopProportion",
+        "SoftwoodStumpProportion",
+        "HardwoodTopProportion",
+        "HardwoodStumpProportion",
+    ],
+    "tblEcoBoundaryDefault": [
+        "EcoBoundaryID",
+        "EcoBoundaryName",
+        "AverageAge",
+        "SoftwoodFoliageFallRate",
+        "HardwoodFoliageFallRate",
+        "StemAnnualTurnOverRate",
+        "SoftwoodBranchTurnOverRate",
+        "HardwoodBranchTurnOverRate",
+        "SoftwoodStemSnagToDOM",
+        "SoftwoodBranchSnagToDOM",
+        "HardwoodStemSnagToDOM",
+        "HardwoodBranchSnagToDOM",
+    ],
+    "tblSPUDefault": ["SPUID", "AdminBoundaryID", "EcoBoundaryID"],
+    "tblClimateDefault": ["DefaultSPUID", "Year", "MeanAnnualTemp"],
+    "tblDOMParametersDefault": [
+        "SoilPoolID",
+        "OrganicMatterDecayRate",
+        "ReferenceTemp",
+        "Q10",
+        "PropToAtmosphere",
+    ],
+    "tblForestTypeDefault": ["ForestTypeID", "ForestTypeName"],
+    "tblGenusTypeDefault": ["GenusID", "GenusName"],
+    "tblSpeciesTypeDefault": [
+        "SpeciesTypeID",
+        "SpeciesTypeName",
+        "ForestTypeID",
+        "GenusID",
+    ],
+    "tblBioTotalStemwoodSpeciesTypeDefault": [
+        "DefaultSPUID",
+        "DefaultSpeciesTypeID",
+    ]
+    + VOL_TO_BIO_COLUMNS,
+    "tblBioTotalStemwoodGenusDefault": ["DefaultSPUID", "DefaultGenusID"]
+    + VOL_TO_BIO_COLUMNS,
+    "tblBioTotalStemwoodForestTypeDefault": [
+        "DefaultSPUID",
+        "DefaultForestTypeID",
+    ]
+    + VOL_TO_BIO_COLUMNS,
+    "tblDisturbanceTypeDefault": [
+        "DistTypeID",
+        "DistTypeName",
+        "Description",
+    ],
+    "tblDisturbanceTypeLandclassTransition": [
+        "DefaultDistTypeID",
+        "TransitionLandClass",
+    ],
+    "tblDM": ["DMID", "Name", "Description"],
+    "tblDMValuesLookup": ["DMID", "DMRow", "DMColumn", "Proportion"],
+    "tblDMAssociationDefault": [
+        "DefaultDisturbanceTypeID",
+        "DefaultEcoBoundaryID",
+        "AnnualOrder",
+        "DMID",
+    ],
+    "tblDMAssociationSPUDefault": [
+        "DefaultDisturbanceTypeID",
+        "SPUID",
+        "DMID",
+    ],
+    "tblGrowthMultiplierDefault": [
+        "DefaultDisturbanceTypeID",
+        "DefaultSpeciesTypeID",
+        "AnnualOrder",
+        "GrowthMultiplier",
+    ],
+    "tblAfforestationPreTypeDefault": ["PreTypeID", "Name"],
+    "tblSVLAttributesDefaultAfforestation": [
+        "AdminBoundaryID",
+        "EcoBoundaryID",
+        "PreTypeID",
+    ]
+    + AFFORESTATION_POOL_COLUMNS,
+}
+
+
+def create_tables(connection):
+    """create empty archive index tables on the specified sqlite connection
+
+    Args:
+        connection (sqlite3.Connection): connection to the target database
+    """
+    for table, columns in AIDB_TABLES.items():
+        connection.execute(
+            "CREATE TABLE {table} ({columns})".format(
+                table=table, columns=", ".join(columns)
+            )
+        )
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import contextlib
+from tempfile import TemporaryDirectory
+import pytest
+from cbm_defaults import aidb_snapshot
+
+
+def create_source_db(path):
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        connection.executescript(
+            """
+            CREATE TABLE tblForestTypeDefault (
+                ForestTypeID integer, ForestTypeName text);
+            CREATE TABLE tblGenusTypeDefault (
+                GenusID integer, GenusName text);
+            CREATE TABLE tblUnrelated (id integer);
+            INSERT INTO tblForestTypeDefault VALUES (1, 'Softwood');
+            INSERT INTO tblForestTypeDefault VALUES (3, 'Hardwood');
+            INSERT INTO tblGenusTypeDefault VALUES (1, 'Spruce');
+            """
+        )
+        connection.commit()
+
+
+def test_get_referenced_tables():
+    tables = aidb_snapshot.get_referenced_tables()
+    assert "tblDMValuesLookup" in tables
+    assert "tblDisturbanceTypeDefault" in tables
+    assert "tbldisturbancetypedefault" not in tables
+    assert len(tables) == len(set(x.lower() for x in tables))
+
+
+@pytest.mark.parametrize("snapshot_format", aidb_snapshot.SNAPSHOT_FORMATS)
+def test_export_and_query_snapshot(snapshot_format):
+    if snapshot_format == "parquet":
+        pytest.importorskip("pyarrow")
+    with TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "source.db")
+        create_source_db(source_path)
+        locales = [{"id": 1, "code": "en-CA"}]
+        source = aidb_snapshot.SnapshotArchiveIndex(
+            locales, "en-CA", [{"locale": "en-CA", "path": source_path}]
+        )
+        snapshot_dir = os.path.join(temp_dir, "snapshot")
+        with source:
+            manifest = aidb_snapshot.export_snapshot(
+                source, snapshot_dir, snapshot_format
+            )
+        assert manifest["archive_index_data"][0]["tables"] == {
+            "tblForestTypeDefault": 2,
+            "tblGenusTypeDefault": 1,
+        }
+        with pytest.raises(ValueError):
+            aidb_snapshot.export_snapshot(
+                source, snapshot_dir, snapshot_format
+            )
+
+        with aidb_snapshot.open_snapshot(snapshot_dir, locales) as snapshot:
+            assert snapshot.table_exists("tblforesttypedefault")
+            assert not snapshot.table_exists("tblUnrelated")
+            rows = list(snapshot.get_parameters("forest_types"))
+            assert [(x.ForestTypeID, x.ForestTypeName) for x in rows] == [
+                (1, "Softwood"),
+                (3, "Hardwood"),
+            ]
+            df = snapshot.get_parameters_df("genus_types")
+            assert df.to_dict("records") == [
+                {"GenusID": 1, "GenusName": "Spruce"}
+            ]
+
+
+def test_parquet_snapshot_is_loaded_once(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    source_path = str(tmp_path / "source.db")
+    create_source_db(source_path)
+    locales = [{"id": 1, "code": "en-CA"}]
+    snapshot_dir = str(tmp_path / "snapshot")
+    with aidb_snapshot.SnapshotArchiveIndex(
+        locales, "en-CA", [{"locale": "en-CA", "path": source_path}]
+    ) as source:
+        aidb_snapshot.export_snapshot(source, snapshot_dir, "parquet")
+
+    loaded = []
+    read_parquet = aidb_snapshot.pd.read_parquet
+
+    def counting_read_parquet(path, *args, **kwargs):
+        loaded.append(os.path.basename(path))
+        return read_parquet(path, *args, **kwargs)
+
+    monkeypatch.setattr(
+        aidb_snapshot.pd, "read_parquet", counting_read_parquet
+    )
+    snapshot = aidb_snapshot.open_snapshot(snapshot_dir, locales)
+    # two concurrent queries use two pooled connections
+    first = snapshot.get_parameters("forest_types")
+    assert next(first).ForestTypeID == 1
+    assert [x.GenusID for x in snapshot.get_parameters("genus_types")] == [1]
+    assert list(first)[0].ForestTypeID == 3
+    assert snapshot.get_connection_stats()["opened"] == 2
+    assert sorted(loaded) == [
+        "tblForestTypeDefault.parquet",
+        "tblGenusTypeDefault.parquet",
+    ]
+    temp_dir = snapshot._parquet_dir
+    assert os.path.isdir(temp_dir)
+    snapshot.close()
+    assert not os.path.exists(temp_dir)
@@ -0,0 +1,89 @@
+import os
+import json
+import sqlite3
+import contextlib
+from cbm_defaults import app
+from test import synthetic_aidb
+
+
+def get_tables(path):
+    """get the rows of every table of the database at path, by table name"""
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        return {
+            table: connection.execute(
+                f"SELECT rowid, * FROM {table} ORDER BY rowid"
+            ).fetchall()
+            for (table,) in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name != 'build_manifest'"
+            )
+        }
+
+
+def test_incremental_build(tmp_path):
+    snapshot_dir = str(tmp_path / "snapshot")
+    config = synthetic_aidb.create_snapshot(snapshot_dir)
+    config["output_path"] = str(tmp_path / "incremental.db")
+    config["incremental"] = True
+    app.run(dict(config))
+
+    # nothing changed
+    report = app.run(dict(config))
+    assert report["steps"] == []
+    # the disturbance matrix chunk size does not change the built tables
+    report = app.run(dict(config, dm_chunk_size=50))
+    assert report["steps"] == []
+
+    # change a table of the archive index of one locale
+    with contextlib.closing(
+        sqlite3.connect(os.path.join(snapshot_dir, "fr-CA.db"))
+    ) as connection:
+        connection.execute(
+            "UPDATE tblSpeciesTypeDefault "
+            "SET SpeciesTypeName = 'renamed ' || SpeciesTypeName"
+        )
+        connection.commit()
+    report = app.run(dict(config))
+    rebuilt = [step["name"] for step in report["steps"]]
+    assert "populate species" in rebuilt
+    assert "populate disturbance matrix values" not in rebuilt
+
+    fresh_config = dict(config, output_path=str(tmp_path / "fresh.db"))
+    del fresh_config["incremental"]
+    app.run(fresh_config)
+    expected = get_tables(fresh_config["output_path"])
+    result = get_tables(config["output_path"])
+    assert list(result) == list(expected)
+    for table, rows in expected.items():
+        assert result[table] == rows, table
+    assert any("renamed" in str(row) for row in expected["species_tr"])
+
+
+def test_parallel_streamed_build(tmp_path):
+    config = synthetic_aidb.create_snapshot(str(tmp_path / "snapshot"))
+    app.run(dict(config, output_path=str(tmp_path / "serial.db")))
+    # every build worker may hold a connection to the default locale, the
+    # disturbance matrix step for the whole step
+    app.run(
+        dict(
+            config,
+            output_path=str(tmp_path / "parallel.db"),
+            build_workers=4,
+            dm_chunk_size=10,
+        )
+    )
+    assert get_tables(str(tmp_path / "parallel.db")) == get_tables(
+        str(tmp_path / "serial.db")
+    )
+
+
+def test_profile_report(tmp_path):
+    config = synthetic_aidb.create_snapshot(str(tmp_path / "snapshot"))
+    config["output_path"] = str(tmp_path / "cbm_defaults.db")
+    config["profile_report"] = str(tmp_path / "profile.json")
+    config["build_workers"] = 4
+    report = app.run(config)
+    with open(config["profile_report"]) as report_file:
+        assert json.load(report_file) == json.loads(json.dumps(report))
+    assert report["queries"]
+    assert all(step["write_wait_time"] >= 0 for step in report["steps"])
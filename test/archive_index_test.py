@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import contextlib
+from tempfile import TemporaryDirectory
+import numpy as np
+import pytest
+from cbm_defaults.archive_index import _append_array
+from cbm_defaults.aidb_snapshot import SnapshotArchiveIndex
+from test import aidb_fixture
+
+
+LOCALES = [{"id": 1, "code": "en-CA"}, {"id": 2, "code": "fr-CA"}]
+
+
+@pytest.fixture(params=[None, 2])
+def archive_index(request):
+    with TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "aidb.db")
+        with contextlib.closing(sqlite3.connect(path)) as connection:
+            aidb_fixture.create_tables(connection)
+            connection.executemany(
+                "INSERT INTO tblDisturbanceTypeDefault VALUES (?, ?, ?)",
+                [(i, f"dist {i}", "") for i in range(1, 6)],
+            )
+            connection.executemany(
+                "INSERT INTO tblForestTypeDefault VALUES (?, ?)",
+                [(1, "Softwood"), (3, "Hardwood")],
+            )
+            connection.executemany(
+                "INSERT INTO tblGrowthMultiplierDefault VALUES (?, ?, ?, ?)",
+                [
+                    (dist_type, species_type, annual_order, 0.1 * dist_type)
+                    for dist_type in [1, 2, 4]
+                    for species_type in [1, 2]
+                    for annual_order in [1, 2, 3]
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO tblDMValuesLookup VALUES (?, ?, ?, ?)",
+                [(dmid, row, 13, 0.5) for dmid in [1, 2] for row in [1, 2, 3]],
+            )
+            connection.commit()
+        with SnapshotArchiveIndex(
+            LOCALES,
+            "en-CA",
+            [{"locale": x["code"], "path": path} for x in LOCALES],
+            max_workers=request.param,
+        ) as archive_index:
+            yield archive_index
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 250])
+def test_get_parameters_batched(archive_index, chunk_size):
+    disturbance_types = [4, 1, 2, 3, 1]
+    result = archive_index.get_parameters_batched(
+        "growth_multipliers_batched",
+        "DistTypeID",
+        disturbance_types,
+        chunk_size=chunk_size,
+    )
+    assert list(result.keys()) == [4, 1, 2, 3]
+    assert result[3] == []
+    for dist_type in [1, 2, 4]:
+        expected = [
+            tuple(x)
+            for x in archive_index.get_parameters(
+                "growth_multipliers", params=(dist_type,)
+            )
+        ]
+        assert len(expected) == 6
+        assert [tuple(x)[1:] for x in result[dist_type]] == expected
+
+
+def test_get_localized_parameters(archive_index):
+    result = archive_index.get_localized_parameters("forest_types", LOCALES)
+    assert [locale for locale, _ in result] == LOCALES
+    for _, rows in result:
+        assert [tuple(x) for x in rows] == [(1, "Softwood"), (3, "Hardwood")]
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 100])
+def test_get_parameters_arrays(archive_index, batch_size):
+    result = archive_index.get_parameters_arrays(
+        "disturbance_matrix", batch_size=batch_size
+    )
+    assert list(result.keys()) == ["DMID", "DMRow", "DMColumn", "Proportion"]
+    assert result["DMID"].dtype == np.int32
+    assert result["Proportion"].dtype == np.float64
+    np.testing.assert_array_equal(result["DMID"], [1, 1, 1, 2, 2, 2])
+    np.testing.assert_array_equal(result["DMRow"], [1, 2, 3, 1, 2, 3])
+
+    batches = list(
+        archive_index.iter_parameters_arrays(
+            "disturbance_matrix", batch_size=batch_size
+        )
+    )
+    assert max(len(x["DMID"]) for x in batches) <= batch_size
+
+
+def test_append_array():
+    array = np.array([1, 2], dtype="int32")
+    for n_rows, values in [(2, [3]), (3, [4, 5, 6]), (6, [7.5])]:
+        array = _append_array(array, n_rows, np.array(values))
+    assert array.dtype == np.float64
+    np.testing.assert_array_equal(array[:7], [1, 2, 3, 4, 5, 6, 7.5])
+
+
+def test_get_parameters_arrays_empty_result(archive_index):
+    result = archive_index.get_parameters_arrays("afforestation_pre_types")
+    assert list(result.keys()) == ["PreTypeID", "Name"]
+    assert all(len(x) == 0 for x in result.values())
+
+
+def test_get_parameters_arrays_as_arrow(archive_index):
+    pytest.importorskip("pyarrow")
+    result = archive_index.get_parameters_arrays(
+        "disturbance_matrix", as_arrow=True
+    )
+    assert result.num_rows == 6
+    assert str(result.schema.field("DMRow").type) == "int32"
+
+
+def test_query_stats(archive_index):
+    archive_index.query_stats.slow_query_threshold = 0.0
+    archive_index.get_localized_parameters("forest_types", LOCALES)
+    archive_index.get_parameters_batched(
+        "growth_multipliers_batched", "DistTypeID", [1, 2, 3], chunk_size=2
+    )
+    records = archive_index.query_stats.records
+    # locales may be queried concurrently, in any order
+    assert sorted(
+        (x.name, x.locale, x.param_count, x.rows) for x in records
+    ) == [
+        ("forest_types", "en-CA", 0, 2),
+        ("forest_types", "fr-CA", 0, 2),
+        ("growth_multipliers_batched", "en-CA", 1, 0),
+        ("growth_multipliers_batched", "en-CA", 2, 12),
+    ]
+    assert archive_index.query_stats.slow_queries == records
+    summary = {
+        x["name"]: x for x in archive_index.query_stats.get_summary()
+    }
+    assert summary["forest_types"]["calls"] == 2
+    assert summary["growth_multipliers_batched"]["rows"] == 12
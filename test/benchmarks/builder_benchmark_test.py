@@ -0,0 +1,97 @@
+import os
+import sqlite3
+from unittest.mock import MagicMock
+import pytest
+from cbm_defaults import app
+from cbm_defaults import aidb_snapshot
+from cbm_defaults import cbm_defaults_database
+from cbm_defaults import schema
+from cbm_defaults.cbm_defaults_builder import CBMDefaultsBuilder
+from test import synthetic_aidb
+from test.benchmarks.scaling import SCALES
+from test.benchmarks.scaling import ROUNDS
+from test.benchmarks.scaling import get_aidb_kwargs
+
+pytest.importorskip("pytest_benchmark")
+
+STEP_NAMES = [
+    step.name
+    for step in CBMDefaultsBuilder(
+        sqlite3.connect(":memory:"), [], MagicMock()
+    ).get_build_steps()
+]
+
+
+@pytest.fixture(scope="module", params=SCALES)
+def step_inputs(request, tmp_path_factory):
+    """yields the scale, the config, an open archive index, and for each
+    build step an in-memory database populated by the steps before it
+    """
+    scale = request.param
+    config = synthetic_aidb.create_snapshot(
+        str(tmp_path_factory.mktemp("snapshot")), **get_aidb_kwargs(scale)
+    )
+    with aidb_snapshot.open_snapshot(
+        config["archive_index_snapshot"],
+        config["locales"],
+        config["default_locale"],
+    ) as archive_index:
+        connection = sqlite3.connect(":memory:")
+        cbm_defaults_database.execute_ddl(
+            connection, schema.get_ddl_path(), indexes=False
+        )
+        builder = CBMDefaultsBuilder(
+            connection, config["locales"], archive_index
+        )
+        databases = {}
+        for name in STEP_NAMES:
+            connection.commit()
+            databases[name] = sqlite3.connect(":memory:")
+            connection.backup(databases[name])
+            builder.build_database([name])
+        yield scale, config, archive_index, databases
+        for database in databases.values():
+            database.close()
+        connection.close()
+
+
+@pytest.mark.parametrize("step_name", STEP_NAMES)
+def test_populate_step(benchmark, step_inputs, step_name):
+    scale, config, archive_index, databases = step_inputs
+
+    def setup():
+        connection = sqlite3.connect(":memory:")
+        databases[step_name].backup(connection)
+        builder = CBMDefaultsBuilder(
+            connection, config["locales"], archive_index
+        )
+        return (builder, [step_name]), {}
+
+    benchmark.group = f"populate: {step_name}"
+    benchmark.extra_info["scale"] = scale
+    benchmark.pedantic(
+        CBMDefaultsBuilder.build_database, setup=setup, rounds=ROUNDS
+    )
+
+
+@pytest.mark.parametrize("n_locales", [1, len(synthetic_aidb.LOCALES)])
+@pytest.mark.parametrize("scale", SCALES)
+def test_build_database(benchmark, tmp_path, scale, n_locales):
+    config = synthetic_aidb.create_snapshot(
+        str(tmp_path / "snapshot"),
+        locales=synthetic_aidb.LOCALES[:n_locales],
+        **get_aidb_kwargs(scale),
+    )
+    config["output_path"] = str(tmp_path / "cbm_defaults.db")
+    config["fast_build"] = True
+
+    def setup():
+        if os.path.exists(config["output_path"]):
+            os.remove(config["output_path"])
+
+    benchmark.group = f"build database, {n_locales} locales"
+    benchmark.extra_info["scale"] = scale
+    report = benchmark.pedantic(
+        app.run, args=(config,), setup=setup, rounds=ROUNDS
+    )
+    assert report["totals"]["rows_written"] > 0
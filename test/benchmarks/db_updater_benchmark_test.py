@@ -0,0 +1,57 @@
+import os
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from cbm_defaults import app
+from cbm_defaults.update import db_updater
+from test import synthetic_aidb
+from test.benchmarks.scaling import SCALES
+from test.benchmarks.scaling import ROUNDS
+from test.benchmarks.scaling import get_aidb_kwargs
+
+pytest.importorskip("pytest_benchmark")
+
+# the land class transitions of the synthetic disturbance types, by land
+# type, see synthetic_aidb.TRANSITION_LAND_TYPES
+TRANSITION_LAND_CLASS_IDS = {3: 11, 4: 12, 5: 13, 8: 15}
+
+
+def read_sql_query_1x(query, engine):
+    """returns disturbance_type as if it were in schema 1.x, returns all
+    other tables without changes
+    """
+    df = pd.read_sql_query(query, engine)
+    if query == "select * from disturbance_type":
+        df["transition_land_class_id"] = df["land_type_id"].map(
+            TRANSITION_LAND_CLASS_IDS
+        )
+        df = df.drop(columns=["land_type_id"])
+    return df
+
+
+@pytest.mark.parametrize("scale", SCALES)
+def test_update(benchmark, tmp_path, scale):
+    config = synthetic_aidb.create_snapshot(
+        str(tmp_path / "snapshot"), **get_aidb_kwargs(scale)
+    )
+    input_db_path = str(tmp_path / "cbm_defaults.db")
+    output_db_path = str(tmp_path / "cbm_defaults_updated.db")
+    config["output_path"] = input_db_path
+    config["fast_build"] = True
+    app.run(config)
+
+    def setup():
+        if os.path.exists(output_db_path):
+            os.remove(output_db_path)
+
+    def update():
+        with patch(
+            "cbm_defaults.update.db_updater.read_sql_query",
+            side_effect=read_sql_query_1x,
+        ):
+            db_updater.update("1x_to_2x", input_db_path, output_db_path)
+
+    benchmark.group = "db_updater.update"
+    benchmark.extra_info["scale"] = scale
+    benchmark.pedantic(update, setup=setup, rounds=ROUNDS)
+    assert os.path.exists(output_db_path)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from cbm_defaults import dm_values_processor
+from cbm_defaults import local_csv_table
+from test import synthetic_aidb
+from test.benchmarks.scaling import SCALES
+from test.benchmarks.scaling import ROUNDS
+
+pytest.importorskip("pytest_benchmark")
+
+COLUMNS = ["DMID", "DMRow", "DMColumn", "Proportion"]
+
+# the number of distinct synthetic matrices, which are repeated under new
+# DMIDs to reach the benchmarked number of matrices
+DISTINCT_DMS = 100
+
+
+def get_dm_values(n_dm):
+    """get the column arrays of n_dm synthetic disturbance matrices"""
+    rows = synthetic_aidb.generate_dm_values(DISTINCT_DMS)
+    columns = {
+        column: np.array(values) for column, values in zip(COLUMNS, zip(*rows))
+    }
+    repeats = n_dm // DISTINCT_DMS
+    dm_values = {
+        column: np.tile(values, repeats) for column, values in columns.items()
+    }
+    dm_values["DMID"] += np.repeat(
+        np.arange(repeats) * DISTINCT_DMS, len(rows)
+    )
+    return dm_values
+
+
+@pytest.mark.parametrize("scale", SCALES)
+def test_process_dm_values(benchmark, scale):
+    pool_cross_walk = {
+        int(row["cbm3_pool_code"]): int(row["cbm3_5_pool_code"])
+        for row in local_csv_table.read_csv_file("pool_cross_walk.csv")
+    }
+    n_dm = 10000 * scale
+    dm_values = get_dm_values(n_dm)
+    benchmark.group = "process_dm_values"
+    benchmark.extra_info["scale"] = scale
+    benchmark.extra_info["disturbance_matrices"] = n_dm
+    result = benchmark.pedantic(
+        dm_values_processor.process_dm_values,
+        args=(dm_values, COLUMNS, pool_cross_walk),
+        rounds=ROUNDS,
+    )
+    assert result["DMID"].nunique() == n_dm
@@ -0,0 +1,52 @@
+import sqlite3
+import pytest
+from cbm_defaults import app
+from test import synthetic_aidb
+from test.lookup_queries import QUERIES
+from test.lookup_queries import get_parameters
+from test.benchmarks.scaling import SCALES
+from test.benchmarks.scaling import ROUNDS
+from test.benchmarks.scaling import get_aidb_kwargs
+
+pytest.importorskip("pytest_benchmark")
+
+# the number of times each query is run per timed round
+ITERATIONS = 100
+
+
+@pytest.fixture(scope="module", params=SCALES)
+def database(request, tmp_path_factory):
+    """yields the scale, a connection to a database built at that scale,
+    and the parameters of the canonical queries
+    """
+    tmp_path = tmp_path_factory.mktemp("lookup")
+    config = synthetic_aidb.create_snapshot(
+        str(tmp_path / "snapshot"), **get_aidb_kwargs(request.param)
+    )
+    config["output_path"] = str(tmp_path / "cbm_defaults.db")
+    config["fast_build"] = True
+    app.run(config)
+    connection = sqlite3.connect(config["output_path"])
+    yield request.param, connection, get_parameters(connection)
+    connection.close()
+
+
+@pytest.mark.parametrize("query_name", list(QUERIES))
+def test_lookup_query(benchmark, database, query_name):
+    scale, connection, parameters = database
+    sql, _ = QUERIES[query_name]
+    query_plan = [
+        row[-1]
+        for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+    ]
+    benchmark.group = f"lookup: {query_name}"
+    benchmark.extra_info["scale"] = scale
+    benchmark.extra_info["query_plan"] = query_plan
+
+    def run_query():
+        return connection.execute(sql, parameters).fetchall()
+
+    result = benchmark.pedantic(
+        run_query, rounds=ROUNDS, iterations=ITERATIONS
+    )
+    assert result
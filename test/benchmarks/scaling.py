@@ -0,0 +1,42 @@
+"""
+Scale factors of the benchmark suite.
+
+Each benchmark runs once per scale factor listed, comma separated, in the
+CBM_DEFAULTS_BENCHMARK_SCALES environment variable, and reports the scale
+in its extra info, so that the benchmarks of a group form a scaling curve,
+for example::
+
+    CBM_DEFAULTS_BENCHMARK_SCALES=1,4,16 python -m pytest test/benchmarks \\
+        --benchmark-group-by=group --benchmark-sort=name
+
+CBM_DEFAULTS_BENCHMARK_ROUNDS sets the number of timed rounds of each
+benchmark.
+"""
+
+import os
+
+SCALES = [
+    int(x)
+    for x in os.environ.get("CBM_DEFAULTS_BENCHMARK_SCALES", "1,2").split(",")
+]
+
+ROUNDS = int(os.environ.get("CBM_DEFAULTS_BENCHMARK_ROUNDS", "3"))
+
+
+def get_aidb_kwargs(scale):
+    """Get the :py:func:`test.synthetic_aidb.create_aidb` arguments at the
+    specified scale: the number of spatial units, the number of disturbance
+    types and so the number of disturbance matrices grow linearly with it.
+
+    Args:
+        scale (int): the scale factor
+
+    Returns:
+        dict: keyword arguments of create_aidb
+    """
+    return {
+        "n_admin": 2 * scale,
+        "n_eco": 3,
+        "n_disturbance_types": 4 * scale,
+        "dms_per_disturbance_type": 2,
+    }
@@ -0,0 +1,103 @@
+import os
+from cbm_defaults import app
+from cbm_defaults import build_cache
+from cbm_defaults.build_cache import BuildCache
+from test import synthetic_aidb
+
+
+def write_file(path, content):
+    with open(path, "wb") as output_file:
+        output_file.write(content)
+
+
+def read_file(path):
+    with open(path, "rb") as input_file:
+        return input_file.read()
+
+
+def test_get_cache_key(tmp_path):
+    aidb_path = str(tmp_path / "aidb.mdb")
+    write_file(aidb_path, b"aidb")
+    config = {
+        "default_locale": "en-CA",
+        "locales": [{"id": 1, "code": "en-CA"}],
+        "archive_index_data": [{"locale": "en-CA", "path": aidb_path}],
+        "output_path": "a.db",
+    }
+    key = build_cache.get_cache_key(config)
+    # options which do not affect the output are not part of the key
+    assert key == build_cache.get_cache_key(
+        dict(config, output_path="b.db", build_workers=4)
+    )
+    assert key != build_cache.get_cache_key(
+        dict(config, deduplicate_parameters=True)
+    )
+    write_file(aidb_path, b"modified aidb")
+    assert key != build_cache.get_cache_key(config)
+
+
+def test_get_and_put(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    built_path = str(tmp_path / "built.db")
+    write_file(built_path, b"database")
+    assert not cache.get("key", str(tmp_path / "a.db"))
+    cache.put("key", built_path)
+    assert cache.get("key", str(tmp_path / "a.db"))
+    assert read_file(str(tmp_path / "a.db")) == b"database"
+
+
+def test_hardlink(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), hardlink=True)
+    built_path = str(tmp_path / "built.db")
+    write_file(built_path, b"database")
+    cache.put("key", built_path)
+    assert cache.get("key", str(tmp_path / "a.db"))
+    assert read_file(str(tmp_path / "a.db")) == b"database"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    cache = BuildCache(cache_dir, max_size=20)
+    built_path = str(tmp_path / "built.db")
+    write_file(built_path, b"0123456789")
+    cache.put("a", built_path)
+    os.utime(os.path.join(cache_dir, "a.db"), (1, 1))
+    cache.put("b", built_path)
+    os.utime(os.path.join(cache_dir, "b.db"), (2, 2))
+    # using "a" makes "b" the least recently used entry
+    assert cache.get("a", str(tmp_path / "out.db"))
+    cache.put("c", built_path)
+    assert sorted(os.listdir(cache_dir)) == ["a.db", "c.db"]
+
+
+def test_hash_files_ignores_other_files(tmp_path):
+    write_file(str(tmp_path / "module.py"), b"source")
+    expected = build_cache._hash_files(str(tmp_path), {".py"})
+    os.makedirs(str(tmp_path / "__pycache__"))
+    write_file(str(tmp_path / "__pycache__" / "module.py"), b"compiled")
+    write_file(str(tmp_path / "module.pyc"), b"compiled")
+    assert build_cache._hash_files(str(tmp_path), {".py"}) == expected
+    write_file(str(tmp_path / "module.py"), b"modified source")
+    assert build_cache._hash_files(str(tmp_path), {".py"}) != expected
+
+
+def test_run_uses_the_cache(tmp_path):
+    config = synthetic_aidb.create_snapshot(str(tmp_path / "snapshot"))
+    config["build_cache_dir"] = str(tmp_path / "cache")
+    config["fast_build"] = True
+
+    def run(output_name, **kwargs):
+        output_path = str(tmp_path / output_name)
+        return app.run(dict(config, output_path=output_path, **kwargs))
+
+    assert run("a.db") is not None
+    cached = os.listdir(config["build_cache_dir"])
+    assert len(cached) == 1
+    # a build of the same config is copied from the cache
+    assert run("b.db") is None
+    assert read_file(str(tmp_path / "b.db")) == read_file(
+        os.path.join(config["build_cache_dir"], cached[0])
+    )
+    # options which affect the content of the database are a cache miss
+    assert run("c.db", deduplicate_parameters=True) is not None
+    assert len(os.listdir(config["build_cache_dir"])) == 2
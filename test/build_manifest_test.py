@@ -0,0 +1,100 @@
+import sqlite3
+from cbm_defaults import build_manifest
+from cbm_defaults.build_scheduler import BuildStep
+from cbm_defaults.build_scheduler import get_dependencies
+
+
+def test_hash_rows_is_order_independent():
+    rows = [(1, "a", 0.5), (2, "b", 0.25), (2, "b", 0.25)]
+    assert build_manifest.hash_rows(rows) == build_manifest.hash_rows(
+        reversed(rows)
+    )
+    assert build_manifest.hash_rows(rows) != build_manifest.hash_rows(
+        rows[:2]
+    )
+    assert build_manifest.hash_rows([]) != build_manifest.hash_rows(
+        [(1, "a", 0.5)]
+    )
+
+
+def test_get_input_names():
+    locales = [{"id": 1, "code": "en-CA"}, {"id": 2, "code": "fr-CA"}]
+    names = build_manifest.get_input_names(
+        locales,
+        "en-CA",
+        queries=["dom_parameters"],
+        localized_queries=["species"],
+        csv_files=["pool.csv"],
+        localized_csv_files=["pool.csv"],
+    )
+    assert names == [
+        "query/dom_parameters",
+        "query/species",
+        "aidb/en-CA/tblDOMParametersDefault",
+        "aidb/en-CA/tblSpeciesTypeDefault",
+        "aidb/fr-CA/tblSpeciesTypeDefault",
+        "csv/pool.csv",
+        "csv/pool_en-CA.csv",
+        "csv/pool_fr-CA.csv",
+    ]
+
+
+def test_get_input_names_is_keyed_on_tables():
+    locales = [{"id": 1, "code": "en-CA"}, {"id": 2, "code": "fr-CA"}]
+
+    def aidb_inputs(query):
+        return [
+            name
+            for name in build_manifest.get_input_names(
+                locales, "en-CA", queries=[query]
+            )
+            if name.startswith("aidb/")
+        ]
+
+    assert aidb_inputs("disturbance_matrix") == aidb_inputs(
+        "disturbance_matrix_by_dmid"
+    )
+    assert aidb_inputs("disturbance_matrix") == [
+        "aidb/en-CA/tblDMValuesLookup"
+    ]
+
+
+def test_manifest_round_trip():
+    connection = sqlite3.connect(":memory:")
+    assert build_manifest.read_manifest(connection) is None
+    build_manifest.write_manifest(connection, {"a": "1", "b": "2"})
+    build_manifest.write_manifest(connection, {"a": "3"})
+    assert build_manifest.read_manifest(connection) == {"a": "3"}
+
+
+def test_get_changed_steps():
+    steps = [
+        BuildStep("a", None, writes=["t1"], inputs=["csv/a.csv"]),
+        BuildStep("b", None, reads=["t1"], writes=["t2"], inputs=["q/b"]),
+        BuildStep("c", None, writes=["t3"], inputs=["q/c"]),
+    ]
+    dependencies = get_dependencies(steps)
+    old = {
+        "schema": "s",
+        "config": "c",
+        "csv/a.csv": "1",
+        "q/b": "1",
+        "q/c": "1",
+    }
+
+    def changed(new=None):
+        hashes = dict(old)
+        hashes.update(new or {})
+        return build_manifest.get_changed_steps(
+            steps, dependencies, old, hashes
+        )
+
+    assert changed() == []
+    assert changed({"q/c": "2"}) == ["c"]
+    assert changed({"q/b": "2"}) == ["b"]
+    # steps depending on a changed step are rebuilt too
+    assert changed({"csv/a.csv": "2"}) == ["a", "b"]
+    assert changed({"schema": "2"}) == ["a", "b", "c"]
+    assert build_manifest.get_changed_steps(
+        steps, dependencies, None, old
+    ) == ["a", "b", "c"]
@@ -0,0 +1,76 @@
+import json
+import threading
+from cbm_defaults import build_profiler
+from cbm_defaults.build_profiler import BuildProfiler
+from cbm_defaults.build_scheduler import BuildStep
+from cbm_defaults.build_scheduler import run_steps
+
+
+def test_queries_and_writes_are_attributed_to_the_current_step():
+    profiler = BuildProfiler()
+    # nothing is recorded outside of a profiled step
+    build_profiler.record_query(1.0, 10)
+    with profiler.step("a"):
+        build_profiler.record_query(0.25, 10)
+        build_profiler.record_query(0.25, 5)
+        build_profiler.record_write(0.5, 3)
+    with profiler.step("b"):
+        build_profiler.record_write(0.1, 1)
+    report = profiler.get_report()
+    step_a, step_b = report["steps"]
+    assert step_a["name"] == "a"
+    assert step_a["queries"] == 2
+    assert step_a["query_time"] == 0.5
+    assert step_a["rows_read"] == 15
+    assert step_a["write_time"] == 0.5
+    assert step_a["rows_written"] == 3
+    assert step_a["peak_memory"] is None
+    assert step_b["rows_read"] == 0
+    assert report["totals"]["rows_written"] == 4
+
+
+def test_run_steps_with_profiler():
+    def write(rows):
+        return lambda: build_profiler.record_write(0.0, rows)
+
+    steps = [
+        BuildStep("a", write(1), writes=["t1"]),
+        BuildStep("b", write(2), reads=["t1"], writes=["t2"]),
+        BuildStep("c", write(3), writes=["t3"]),
+    ]
+    for max_workers in [None, 4]:
+        profiler = BuildProfiler(trace_memory=True)
+        with profiler.build():
+            run_steps(steps, max_workers, profiler)
+        report = profiler.get_report()
+        rows_written = {x["name"]: x["rows_written"] for x in report["steps"]}
+        assert rows_written == {"a": 1, "b": 2, "c": 3}
+        assert all(x["peak_memory"] is not None for x in report["steps"])
+        assert set(report["critical_path"]).issubset({"a", "b", "c"})
+
+
+def test_write_lock_wait_is_not_transform_time():
+    profiler = BuildProfiler()
+    lock = threading.Lock()
+    lock.acquire()
+    timer = threading.Timer(0.1, lock.release)
+    timer.start()
+    with profiler.step("a"):
+        with build_profiler.acquire_write_lock(lock):
+            pass
+    timer.join()
+    (step,) = profiler.get_report()["steps"]
+    assert step["write_wait_time"] >= 0.05
+    assert step["transform_time"] < step["write_wait_time"]
+
+
+def test_write_report(tmp_path):
+    profiler = BuildProfiler()
+    with profiler.step("a"):
+        build_profiler.record_write(0.5, 3)
+    path = str(tmp_path / "profile.json")
+    profiler.write_report(path, queries=[])
+    with open(path) as report_file:
+        assert json.load(report_file) == dict(
+            profiler.get_report(), queries=[]
+        )
@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+from unittest.mock import MagicMock
+import pytest
+from cbm_defaults import schema
+from cbm_defaults import cbm_defaults_database
+from cbm_defaults.build_scheduler import BuildStep
+from cbm_defaults.build_scheduler import get_dependencies
+from cbm_defaults.build_scheduler import get_critical_path
+from cbm_defaults.build_scheduler import run_steps
+from cbm_defaults.cbm_defaults_builder import CBMDefaultsBuilder
+
+
+def test_get_dependencies():
+    steps = [
+        BuildStep("a", None, writes=["t1"]),
+        BuildStep("b", None, reads=["t1"], writes=["t2"]),
+        BuildStep("c", None, writes=["t3"]),
+        BuildStep("d", None, writes=["t1"]),
+    ]
+    assert get_dependencies(steps) == {
+        "a": set(),
+        "b": {"a"},
+        "c": set(),
+        "d": {"a", "b"},
+    }
+
+
+def test_get_critical_path():
+    steps = [
+        BuildStep("a", None, writes=["t1"]),
+        BuildStep("b", None, writes=["t2"]),
+        BuildStep("c", None, reads=["t1", "t2"], writes=["t3"]),
+    ]
+    durations = {"a": 1.0, "b": 2.0, "c": 1.0}
+    assert get_critical_path(
+        steps, get_dependencies(steps), durations
+    ) == ["b", "c"]
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_run_steps_respects_dependencies(max_workers):
+    finished = []
+    lock = threading.Lock()
+
+    def func(name):
+        def run():
+            with lock:
+                finished.append(name)
+
+        return run
+
+    steps = [
+        BuildStep("a", func("a"), writes=["t1"]),
+        BuildStep("b", func("b"), writes=["t2"]),
+        BuildStep("c", func("c"), reads=["t1", "t2"], writes=["t3"]),
+        BuildStep("d", func("d"), reads=["t3"]),
+    ]
+    durations = run_steps(steps, max_workers)
+    assert set(durations) == {"a", "b", "c", "d"}
+    assert set(finished[:2]) == {"a", "b"}
+    assert finished[2:] == ["c", "d"]
+
+
+def test_run_steps_raises_step_errors():
+    def fail():
+        raise RuntimeError()
+
+    ran = []
+    steps = [
+        BuildStep("a", fail, writes=["t1"]),
+        BuildStep("b", lambda: ran.append("b"), reads=["t1"]),
+    ]
+    with pytest.raises(RuntimeError):
+        run_steps(steps, max_workers=2)
+    assert not ran
+
+
+def test_builder_steps_read_referenced_tables():
+    connection = sqlite3.connect(":memory:")
+    cbm_defaults_database.execute_ddl(connection, schema.get_ddl_path())
+    builder = CBMDefaultsBuilder(connection, [], MagicMock())
+    written = set()
+    for step in builder.get_build_steps():
+        for table in step.writes:
+            referenced = {
+                row[2]
+                for row in connection.execute(
+                    f"PRAGMA foreign_key_list({table})"
+                )
+            }
+            assert referenced - step.writes <= step.reads
+        assert step.reads <= written
+        written |= step.writes
+    tables = {
+        row[0]
+        for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    assert written == tables
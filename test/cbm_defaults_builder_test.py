@@ -0,0 +1,209 @@
+import sqlite3
+import pytest
+from cbm_defaults import aidb_snapshot
+from cbm_defaults import cbm_defaults_database
+from cbm_defaults import schema
+from cbm_defaults.cbm_defaults_builder import CBMDefaultsBuilder
+from test import synthetic_aidb
+
+
+@pytest.fixture(scope="module")
+def snapshot_config(tmp_path_factory):
+    return synthetic_aidb.create_snapshot(
+        str(tmp_path_factory.mktemp("snapshot"))
+    )
+
+
+def build(config, **kwargs):
+    """build a database from the snapshot, and return its connection"""
+    connection = sqlite3.connect(":memory:")
+    cbm_defaults_database.execute_ddl(connection, schema.get_ddl_path())
+    with aidb_snapshot.open_snapshot(
+        config["archive_index_snapshot"],
+        config["locales"],
+        config["default_locale"],
+    ) as archive_index:
+        CBMDefaultsBuilder(
+            connection, config["locales"], archive_index, **kwargs
+        ).build_database()
+    cbm_defaults_database.check_foreign_keys(connection)
+    return connection
+
+
+def get_rows(connection, table):
+    return connection.execute(f"SELECT rowid, * FROM {table}").fetchall()
+
+
+@pytest.mark.parametrize("dm_chunk_size", [1, 50])
+def test_chunked_disturbance_matrix_values(snapshot_config, dm_chunk_size):
+    expected = build(snapshot_config)
+    result = build(snapshot_config, dm_chunk_size=dm_chunk_size)
+    for table in ["disturbance_matrix", "disturbance_matrix_value"]:
+        assert get_rows(result, table) == get_rows(expected, table)
+
+
+def test_parallel_disturbance_matrix_values(snapshot_config):
+    expected = build(snapshot_config)
+    result = build(snapshot_config, dm_chunk_size=100, dm_workers=2)
+    assert get_rows(result, "disturbance_matrix_value") == get_rows(
+        expected, "disturbance_matrix_value"
+    )
+
+
+@pytest.fixture(scope="module")
+def repeated_dm_snapshot_config(tmp_path_factory):
+    return synthetic_aidb.create_snapshot(
+        str(tmp_path_factory.mktemp("snapshot")), distinct_dms=3
+    )
+
+
+def get_association_values(connection):
+    return connection.execute(
+        """
+        SELECT a.spatial_unit_id, a.disturbance_type_id, v.source_pool_id,
+            v.sink_pool_id, v.proportion
+        FROM disturbance_matrix_association a
+        INNER JOIN disturbance_matrix_value v
+            ON v.disturbance_matrix_id = a.disturbance_matrix_id
+        ORDER BY a.spatial_unit_id, a.disturbance_type_id,
+            v.source_pool_id, v.sink_pool_id
+        """
+    ).fetchall()
+
+
+@pytest.mark.parametrize("dm_chunk_size", [None, 50])
+def test_deduplicate_disturbance_matrices(
+    repeated_dm_snapshot_config, dm_chunk_size
+):
+    expected = build(repeated_dm_snapshot_config)
+    result = build(
+        repeated_dm_snapshot_config,
+        dm_chunk_size=dm_chunk_size,
+        deduplicate_disturbance_matrices=True,
+    )
+    assert get_association_values(result) == get_association_values(
+        expected
+    )
+    dmids = [
+        x[0] for x in expected.execute("SELECT id FROM disturbance_matrix")
+    ]
+    aliases = dict(
+        result.execute(
+            "SELECT id, disturbance_matrix_id FROM disturbance_matrix_alias"
+        )
+    )
+    assert sorted(aliases) == sorted(dmids)
+    assert sorted(
+        x[0] for x in result.execute("SELECT id FROM disturbance_matrix")
+    ) == sorted(set(aliases.values()))
+    assert len(set(aliases.values())) <= 3
+    assert result.execute(
+        "SELECT COUNT(*) FROM disturbance_matrix_tr "
+        "WHERE disturbance_matrix_id NOT IN "
+        "(SELECT id FROM disturbance_matrix)"
+    ).fetchone() == (0,)
+    assert expected.execute(
+        "SELECT COUNT(*) FROM disturbance_matrix_alias"
+    ).fetchone() == (0,)
+
+
+def get_columns(connection, table):
+    """get the columns of a table, other than its id"""
+    return [
+        f"{table}.{row[1]}"
+        for row in connection.execute(f"PRAGMA table_info({table})")
+        if row[1] != "id"
+    ]
+
+
+def get_spatial_unit_parameters(connection):
+    """get the parameter values of each spatial unit, without their ids"""
+    tables = [
+        "stump_parameter",
+        "turnover_parameter",
+        "root_parameter",
+        "spinup_parameter",
+    ]
+    return connection.execute(
+        """
+        SELECT spatial_unit.id, {columns} FROM spatial_unit
+        INNER JOIN admin_boundary
+            ON admin_boundary.id = spatial_unit.admin_boundary_id
+        INNER JOIN stump_parameter
+            ON stump_parameter.id = admin_boundary.stump_parameter_id
+        INNER JOIN eco_boundary
+            ON eco_boundary.id = spatial_unit.eco_boundary_id
+        INNER JOIN turnover_parameter
+            ON turnover_parameter.id = eco_boundary.turnover_parameter_id
+        INNER JOIN root_parameter
+            ON root_parameter.id = spatial_unit.root_parameter_id
+        INNER JOIN spinup_parameter
+            ON spinup_parameter.id = spatial_unit.spinup_parameter_id
+        ORDER BY spatial_unit.id
+        """.format(
+            columns=", ".join(
+                column
+                for table in tables
+                for column in get_columns(connection, table)
+            )
+        )
+    ).fetchall()
+
+
+def get_vol_to_bio_parameters(connection):
+    """get the volume to biomass factors of each species and spatial unit,
+    without their ids
+    """
+    return connection.execute(
+        """
+        SELECT vol_to_bio_species.spatial_unit_id,
+            vol_to_bio_species.species_id, {columns}
+        FROM vol_to_bio_species
+        INNER JOIN vol_to_bio_factor
+            ON vol_to_bio_factor.id = vol_to_bio_species.vol_to_bio_factor_id
+        ORDER BY vol_to_bio_species.spatial_unit_id,
+            vol_to_bio_species.species_id
+        """.format(
+            columns=", ".join(get_columns(connection, "vol_to_bio_factor"))
+        )
+    ).fetchall()
+
+
+@pytest.fixture(scope="module")
+def boundaries_snapshot_config(tmp_path_factory):
+    return synthetic_aidb.create_snapshot(
+        str(tmp_path_factory.mktemp("snapshot")), n_admin=4, n_eco=5
+    )
+
+
+def test_deduplicate_parameters(boundaries_snapshot_config):
+    expected = build(boundaries_snapshot_config)
+    result = build(boundaries_snapshot_config, deduplicate_parameters=True)
+    assert get_spatial_unit_parameters(
+        result
+    ) == get_spatial_unit_parameters(expected)
+    assert get_vol_to_bio_parameters(result) == get_vol_to_bio_parameters(
+        expected
+    )
+
+    def count(connection, table, distinct=False):
+        return connection.execute(
+            "SELECT COUNT(*) FROM (SELECT {distinct} {columns} FROM {table})"
+            .format(
+                distinct="DISTINCT" if distinct else "",
+                columns=", ".join(get_columns(connection, table)),
+                table=table,
+            )
+        ).fetchone()[0]
+
+    for table in [
+        "stump_parameter",
+        "turnover_parameter",
+        "root_parameter",
+        "spinup_parameter",
+        "vol_to_bio_factor",
+    ]:
+        # identical rows share one id
+        assert count(result, table) == count(expected, table, distinct=True)
+    for table in ["stump_parameter", "turnover_parameter"]:
+        assert count(result, table) < count(expected, table)
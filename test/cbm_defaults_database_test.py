@@ -0,0 +1,105 @@
+import os
+import sqlite3
+from contextlib import closing
+import pytest
+from cbm_defaults.cbm_defaults_database import RecordWriter
+from cbm_defaults import schema
+from cbm_defaults.cbm_defaults_database import check_foreign_keys
+from cbm_defaults.cbm_defaults_database import create_indexes
+from cbm_defaults.cbm_defaults_database import execute_ddl
+from cbm_defaults.cbm_defaults_database import get_staging_connection
+from cbm_defaults.cbm_defaults_database import write_database
+
+
+def get_connection():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("PRAGMA foreign_keys = 1")
+    connection.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+    connection.execute(
+        "CREATE TABLE child (id INTEGER PRIMARY KEY, parent_id INTEGER, "
+        "name TEXT, FOREIGN KEY(parent_id) REFERENCES parent(id))"
+    )
+    return connection
+
+
+def count(connection, table):
+    return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_rows_are_inserted_in_batches():
+    connection = get_connection()
+    writer = RecordWriter(connection, "parent", batch_size=3)
+    for i in range(1, 5):
+        writer.add_record(id=i)
+    assert count(connection, "parent") == 3
+    writer.close()
+    assert count(connection, "parent") == 4
+    assert writer.row_count == 4
+
+
+def test_dependencies_are_flushed_first():
+    connection = get_connection()
+    with RecordWriter(connection, "parent", batch_size=100) as parent:
+        with RecordWriter(
+            connection, "child", batch_size=1, depends_on=[parent]
+        ) as child:
+            parent.add_record(id=1)
+            child.add_record(id=1, parent_id=1)
+            assert count(connection, "parent") == 1
+            assert count(connection, "child") == 1
+
+
+def test_column_changes_are_supported():
+    connection = get_connection()
+    with RecordWriter(connection, "parent") as parent:
+        parent.add_record(id=1)
+    with RecordWriter(connection, "child") as child:
+        child.add_record(id=1, parent_id=1)
+        child.add_record(id=2, name="b", parent_id=1)
+        child.add_record(parent_id=1, id=3)
+    assert connection.execute(
+        "SELECT id, parent_id, name FROM child ORDER BY id"
+    ).fetchall() == [(1, 1, None), (2, 1, "b"), (3, 1, None)]
+
+
+def test_check_foreign_keys():
+    connection = get_connection()
+    connection.execute("PRAGMA foreign_keys = 0")
+    connection.execute("INSERT INTO child (id, parent_id) VALUES (1, 2)")
+    with pytest.raises(ValueError):
+        check_foreign_keys(connection)
+    connection.execute("INSERT INTO parent (id) VALUES (2)")
+    check_foreign_keys(connection)
+
+
+def test_write_database(tmp_path):
+    output_path = str(tmp_path / "output.db")
+    with get_staging_connection() as connection:
+        connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        connection.execute("INSERT INTO t (id) VALUES (1)")
+        connection.commit()
+        write_database(connection, output_path)
+        with pytest.raises(ValueError):
+            write_database(connection, output_path)
+    assert os.listdir(tmp_path) == ["output.db"]
+    with closing(sqlite3.connect(output_path)) as output:
+        assert output.execute("SELECT id FROM t").fetchall() == [(1,)]
+
+
+def test_indexes_can_be_deferred():
+    def get_index_names(connection):
+        return {
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'index' AND sql IS NOT NULL"
+            )
+        }
+
+    with get_staging_connection() as connection:
+        execute_ddl(connection, schema.get_ddl_path(), indexes=False)
+        assert not get_index_names(connection)
+        create_indexes(connection, schema.get_ddl_path())
+        assert "disturbance_matrix_value_disturbance_matrix_id" in (
+            get_index_names(connection)
+        )
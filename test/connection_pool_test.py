@@ -0,0 +1,50 @@
+import sqlite3
+import threading
+import pytest
+from cbm_defaults.connection_pool import ConnectionPool
+
+
+def test_connections_are_reused_per_key():
+    pool = ConnectionPool(lambda key: sqlite3.connect(":memory:"))
+    with pool.connection("a") as first:
+        pass
+    with pool.connection("a") as second:
+        assert second is first
+    with pool.connection("b") as other:
+        assert other is not first
+    assert pool.get_stats() == {"opened": 2, "reused": 1, "idle": 2}
+    pool.close()
+    assert pool.get_stats()["idle"] == 0
+
+
+def test_pool_size_is_bounded():
+    pool = ConnectionPool(
+        lambda key: sqlite3.connect(":memory:", check_same_thread=False),
+        max_size=1,
+    )
+    acquired = threading.Event()
+
+    def worker():
+        with pool.connection("a"):
+            acquired.set()
+
+    with pool.connection("a"):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        assert not acquired.wait(0.2)
+    thread.join()
+    assert acquired.is_set()
+    assert pool.get_stats()["opened"] == 1
+    pool.close()
+
+
+def test_failed_connection_is_discarded():
+    pool = ConnectionPool(lambda key: sqlite3.connect(":memory:"))
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection("a") as connection:
+            connection.execute("select * from missing_table")
+    assert pool.get_stats()["idle"] == 0
+    pool.close()
+    with pytest.raises(ValueError):
+        with pool.connection("a"):
+            pass
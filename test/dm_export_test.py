@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import numpy as np
+import pytest
+from cbm_defaults import app
+from cbm_defaults import dm_export
+from test import synthetic_aidb
+
+
+@pytest.fixture(scope="module", params=[False, True])
+def exported(request, tmp_path_factory):
+    """build a database with dm_export_dir set, with and without
+    deduplicated matrices, and return the config
+    """
+    tmp_path = tmp_path_factory.mktemp("dm_export")
+    config = synthetic_aidb.create_snapshot(
+        str(tmp_path / "snapshot"), distinct_dms=3
+    )
+    config["output_path"] = str(tmp_path / "cbm_defaults.db")
+    config["fast_build"] = True
+    config["deduplicate_disturbance_matrices"] = request.param
+    config["dm_export_dir"] = str(tmp_path / "dm_export")
+    config["dm_export_dense"] = True
+    app.run(config)
+    return config
+
+
+def get_expected_matrices(config):
+    """read each disturbance matrix of the database as a dict of
+    (source_pool_id, sink_pool_id) to proportion, by matrix id and alias
+    """
+    connection = sqlite3.connect(config["output_path"])
+    matrices = {}
+    for dmid, source, sink, proportion in connection.execute(
+        "SELECT disturbance_matrix_id, source_pool_id, sink_pool_id, "
+        "proportion FROM disturbance_matrix_value"
+    ):
+        matrices.setdefault(dmid, {})[(source, sink)] = proportion
+    for alias_id, dmid in connection.execute(
+        "SELECT id, disturbance_matrix_id FROM disturbance_matrix_alias"
+    ):
+        matrices[alias_id] = matrices[dmid]
+    connection.close()
+    return matrices
+
+
+def test_export_dense(exported):
+    export_dir = exported["dm_export_dir"]
+    pool_ids, dm_index = dm_export.load_disturbance_matrix_index(export_dir)
+    dense = dm_export.load_dense(export_dir)
+    assert isinstance(dense, np.memmap)
+    expected_matrices = get_expected_matrices(exported)
+    assert sorted(dm_index) == sorted(expected_matrices)
+    for dmid, values in expected_matrices.items():
+        expected = np.zeros((len(pool_ids), len(pool_ids)))
+        for (source, sink), proportion in values.items():
+            expected[pool_ids.index(source), pool_ids.index(sink)] = (
+                proportion
+            )
+        np.testing.assert_array_equal(dense[dm_index[dmid]], expected)
+
+
+def test_export_csr(exported):
+    export_dir = exported["dm_export_dir"]
+    dense = dm_export.load_dense(export_dir)
+    csr = np.load(os.path.join(export_dir, dm_export.CSR_FILENAME))
+    n_rows, n_pool = csr["shape"]
+    assert dense.shape == (len(csr["disturbance_matrix_ids"]), n_pool, n_pool)
+    result = np.zeros((n_rows, n_pool))
+    for row in range(n_rows):
+        start, end = csr["indptr"][row], csr["indptr"][row + 1]
+        result[row, csr["indices"][start:end]] = csr["data"][start:end]
+    np.testing.assert_array_equal(result, dense.reshape(n_rows, n_pool))
@@ -1,6 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+import pytest
 from cbm_defaults import dm_values_processor
 from cbm_defaults import local_csv_table
+from test import synthetic_aidb
 
 
 def test_dm_values_processor():
@@ -242,3 +246,131 @@ def test_dm_values_processor_zero_retentions():
         ).reset_index(drop=True),
         result
     )
+
+
+def test_dm_values_processor_matrices_are_independent():
+    # processing many matrices at once gives the same result as processing
+    # each matrix on its own
+    pool_cross_walk: dict[int, int] = {}
+    for row in local_csv_table.read_csv_file("pool_cross_walk.csv"):
+        pool_cross_walk[int(row["cbm3_pool_code"])] = int(
+            row["cbm3_5_pool_code"]
+        )
+    colnames = ["DMID", "DMRow", "DMColumn", "Proportion"]
+    input = pd.DataFrame(
+        columns=colnames, data=synthetic_aidb.generate_dm_values(20)
+    )
+    result = dm_values_processor.process_dm_values(
+        input.to_dict("list"), colnames, pool_cross_walk
+    )
+    expected_result = pd.concat(
+        [
+            dm_values_processor.process_dm_values(
+                dm_input.to_dict("list"), colnames, pool_cross_walk
+            )
+            for _, dm_input in input.groupby("DMID")
+        ]
+    ).reset_index(drop=True)
+    pd.testing.assert_frame_equal(expected_result, result)
+
+
+def test_iter_whole_matrices():
+    dmids = np.array([1, 1, 2, 2, 2, 2, 3, 5, 5])
+    for batch_size in [1, 2, 4, 100]:
+        batches = [
+            {"DMID": dmids[i:i + batch_size], "x": dmids[i:i + batch_size]}
+            for i in range(0, len(dmids), batch_size)
+        ]
+        chunks = list(dm_values_processor.iter_whole_matrices(batches))
+        np.testing.assert_array_equal(
+            np.concatenate([x["DMID"] for x in chunks]), dmids
+        )
+        np.testing.assert_array_equal(
+            np.concatenate([x["x"] for x in chunks]), dmids
+        )
+        # no matrix is split across chunks
+        chunk_dmids = [set(x["DMID"]) for x in chunks]
+        for i, a in enumerate(chunk_dmids):
+            for b in chunk_dmids[i + 1:]:
+                assert not a & b
+
+
+def test_iter_whole_matrices_requires_ordered_dmids():
+    batches = [{"DMID": np.array([1, 2])}, {"DMID": np.array([1])}]
+    with pytest.raises(ValueError):
+        list(dm_values_processor.iter_whole_matrices(batches))
+
+
+def get_dm_value_arrays(n_dm):
+    colnames = ["DMID", "DMRow", "DMColumn", "Proportion"]
+    rows = synthetic_aidb.generate_dm_values(n_dm)
+    return {
+        column: np.array(values)
+        for column, values in zip(colnames, zip(*rows))
+    }
+
+
+@pytest.mark.parametrize("n_partitions", [1, 3, 100])
+def test_process_dm_values_parallel(n_partitions):
+    pool_cross_walk: dict[int, int] = {}
+    for row in local_csv_table.read_csv_file("pool_cross_walk.csv"):
+        pool_cross_walk[int(row["cbm3_pool_code"])] = int(
+            row["cbm3_5_pool_code"]
+        )
+    rows = get_dm_value_arrays(20)
+    # matrices need not be contiguous
+    rows = {k: v[::-1] for k, v in rows.items()}
+    colnames = list(rows.keys())
+    expected_result = dm_values_processor.process_dm_values(
+        rows, colnames, pool_cross_walk
+    )
+    with ThreadPoolExecutor(2) as executor:
+        result = dm_values_processor.process_dm_values_parallel(
+            rows, colnames, pool_cross_walk, executor, n_partitions
+        )
+    pd.testing.assert_frame_equal(expected_result, result)
+
+
+def test_process_dm_values_qa_report():
+    pool_cross_walk: dict[int, int] = {}
+    for row in local_csv_table.read_csv_file("pool_cross_walk.csv"):
+        pool_cross_walk[int(row["cbm3_pool_code"])] = int(
+            row["cbm3_5_pool_code"]
+        )
+    colnames = ["DMID", "DMRow", "DMColumn", "Proportion"]
+    rows = {
+        "DMID": np.array([1, 1, 2, 3, 3]),
+        "DMRow": np.array([1, 1, 1, 2, 2]),
+        "DMColumn": np.array([1, 13, 13, 2, 13]),
+        "Proportion": np.array([0.5, 0.25, 1.0, 0.5, 0.75]),
+    }
+    with ThreadPoolExecutor(2) as executor:
+        for n_partitions in [1, 3]:
+            with pytest.raises(dm_values_processor.DMValuesQAError) as error:
+                dm_values_processor.process_dm_values_parallel(
+                    rows, colnames, pool_cross_walk, executor, n_partitions
+                )
+            assert error.value.report.to_dict("list") == {
+                "DMID": [1, 3],
+                "DMRow": [1, 2],
+                "rowsum": [0.75, 1.25],
+            }
+    # the QA error is a ValueError
+    with pytest.raises(ValueError):
+        dm_values_processor.process_dm_values(rows, colnames, pool_cross_walk)
+
+
+def test_hash_matrices():
+    dm_values = pd.DataFrame(
+        {
+            "DMID": [1, 1, 2, 2, 3, 3, 4],
+            "DMRow": [1, 1, 1, 1, 1, 1, 1],
+            "DMColumn": [1, 2, 1, 2, 1, 2, 1],
+            "Proportion": [0.5, 0.5, 0.5, 0.5, 0.25, 0.75, 1.0],
+        }
+    )
+    digests = dm_values_processor.hash_matrices(dm_values)
+    assert list(digests.keys()) == [1, 2, 3, 4]
+    assert digests[1] == digests[2]
+    assert len(set(digests.values())) == 3
+    assert dm_values_processor.hash_matrices(dm_values.iloc[:0]) == {}
@@ -0,0 +1,213 @@
+"""
+The canonical read queries of cbm_defaults databases, checked for full
+table scans by test/schema_test.py and timed by
+test/benchmarks/lookup_benchmark_test.py.
+"""
+
+import os
+from cbm_defaults import lookup_tables
+
+# the localized tables with a name column, and the id column they translate
+NAMED_TR_TABLES = {
+    "pool_tr": "pool_id",
+    "disturbance_type_tr": "disturbance_type_id",
+    "disturbance_matrix_tr": "disturbance_matrix_id",
+    "admin_boundary_tr": "admin_boundary_id",
+    "eco_boundary_tr": "eco_boundary_id",
+    "genus_tr": "genus_id",
+    "species_tr": "species_id",
+    "forest_type_tr": "forest_type_id",
+    "composite_flux_indicator_tr": "composite_flux_indicator_id",
+    "afforestation_pre_type_tr": "afforestation_pre_type_id",
+}
+
+
+def read_view(name, replacements=None):
+    """read one of the example queries of the sql directory, with its
+    hard-coded values replaced by named parameters
+    """
+    with open(os.path.join(lookup_tables.get_sql_dir(), name)) as sql_file:
+        sql = sql_file.read()
+    for value, parameter in (replacements or {}).items():
+        assert value in sql
+        sql = sql.replace(value, parameter)
+    return sql
+
+
+# the canonical read queries of cbm_defaults databases: the name of each
+# query, its sql, and whether it lists a whole table, in which case its
+# outer loop may scan that table
+QUERIES = {
+    "disturbance_matrix_view": (
+        read_view(
+            "disturbance_matrix_view.sql",
+            {
+                '"British Columbia"': ":admin_boundary_name",
+                '"Pacific Maritime"': ":eco_boundary_name",
+                '"Wildfire"': ":disturbance_type_name",
+                '"en-CA"': ":locale_code",
+            },
+        ),
+        False,
+    ),
+    "spatial_unit_view": (
+        read_view("spatial_unit_view.sql", {'"en-CA"': ":locale_code"}),
+        True,
+    ),
+    "species_view": (
+        read_view("species_view.sql", {'"en-CA"': ":locale_code"}),
+        True,
+    ),
+    "composite_flux_indicators": (
+        read_view("composite_flux_indicators.sql"),
+        True,
+    ),
+    "spatial unit by name": (
+        """
+        SELECT spatial_unit.id FROM spatial_unit
+        INNER JOIN admin_boundary_tr
+            ON admin_boundary_tr.admin_boundary_id =
+                spatial_unit.admin_boundary_id
+        INNER JOIN eco_boundary_tr
+            ON eco_boundary_tr.eco_boundary_id = spatial_unit.eco_boundary_id
+        WHERE admin_boundary_tr.locale_id = :locale_id
+            AND admin_boundary_tr.name = :admin_boundary_name
+            AND eco_boundary_tr.locale_id = :locale_id
+            AND eco_boundary_tr.name = :eco_boundary_name
+        """,
+        False,
+    ),
+    "disturbance matrix association": (
+        """
+        SELECT disturbance_matrix_id FROM disturbance_matrix_association
+        WHERE spatial_unit_id = :spatial_unit_id
+            AND disturbance_type_id = :disturbance_type_id
+        """,
+        False,
+    ),
+    "disturbance matrix values": (
+        """
+        SELECT source_pool_id, sink_pool_id, proportion
+        FROM disturbance_matrix_value
+        WHERE disturbance_matrix_id = :disturbance_matrix_id
+        """,
+        False,
+    ),
+    "volume to biomass by species": (
+        """
+        SELECT vol_to_bio_factor.* FROM vol_to_bio_species
+        INNER JOIN vol_to_bio_factor
+            ON vol_to_bio_factor.id = vol_to_bio_species.vol_to_bio_factor_id
+        WHERE vol_to_bio_species.spatial_unit_id = :spatial_unit_id
+            AND vol_to_bio_species.species_id = :species_id
+        """,
+        False,
+    ),
+    "spatial unit parameters": (
+        """
+        SELECT * FROM spatial_unit
+        INNER JOIN admin_boundary
+            ON admin_boundary.id = spatial_unit.admin_boundary_id
+        INNER JOIN stump_parameter
+            ON stump_parameter.id = admin_boundary.stump_parameter_id
+        INNER JOIN eco_boundary
+            ON eco_boundary.id = spatial_unit.eco_boundary_id
+        INNER JOIN turnover_parameter
+            ON turnover_parameter.id = eco_boundary.turnover_parameter_id
+        INNER JOIN root_parameter
+            ON root_parameter.id = spatial_unit.root_parameter_id
+        INNER JOIN spinup_parameter
+            ON spinup_parameter.id = spatial_unit.spinup_parameter_id
+        WHERE spatial_unit.id = :spatial_unit_id
+        """,
+        False,
+    ),
+}
+QUERIES.update(
+    {
+        f"{table} by name": (
+            f"SELECT {id_column} FROM {table} "
+            f"WHERE locale_id = :locale_id AND name = :{table}_name",
+            False,
+        )
+        for table, id_column in NAMED_TR_TABLES.items()
+    }
+)
+
+
+def get_full_scans(query_plan, full_listing=False):
+    """Get the steps of a query plan which read a whole table or index:
+    table and index scans, and automatic indexes, which sqlite builds by
+    scanning a table.
+
+    Args:
+        query_plan (list): the detail column of the EXPLAIN QUERY PLAN rows
+        full_listing (bool, optional): if set, the query lists a whole
+            table, and the scan of its outer loop is allowed
+
+    Returns:
+        list: the full scan steps
+    """
+    scans = [
+        x for x in query_plan if x.startswith("SCAN ") or "AUTOMATIC" in x
+    ]
+    if full_listing and scans and scans[0] == query_plan[0]:
+        scans = scans[1:]
+    return scans
+
+
+def get_parameters(connection):
+    """get parameter values of the canonical queries which match rows of
+    the database
+    """
+    parameters = dict(
+        zip(
+            [
+                "locale_id",
+                "locale_code",
+                "admin_boundary_name",
+                "eco_boundary_name",
+                "disturbance_type_name",
+                "spatial_unit_id",
+                "disturbance_type_id",
+                "disturbance_matrix_id",
+            ],
+            connection.execute(
+                """
+                SELECT locale.id, locale.code, admin_boundary_tr.name,
+                    eco_boundary_tr.name, disturbance_type_tr.name,
+                    disturbance_matrix_association.spatial_unit_id,
+                    disturbance_matrix_association.disturbance_type_id,
+                    disturbance_matrix_association.disturbance_matrix_id
+                FROM disturbance_matrix_association
+                INNER JOIN spatial_unit ON spatial_unit.id =
+                    disturbance_matrix_association.spatial_unit_id
+                INNER JOIN admin_boundary_tr
+                    ON admin_boundary_tr.admin_boundary_id =
+                        spatial_unit.admin_boundary_id
+                INNER JOIN eco_boundary_tr
+                    ON eco_boundary_tr.eco_boundary_id =
+                        spatial_unit.eco_boundary_id
+                    AND eco_boundary_tr.locale_id =
+                        admin_boundary_tr.locale_id
+                INNER JOIN disturbance_type_tr
+                    ON disturbance_type_tr.disturbance_type_id =
+                        disturbance_matrix_association.disturbance_type_id
+                    AND disturbance_type_tr.locale_id =
+                        admin_boundary_tr.locale_id
+                INNER JOIN locale ON locale.id = admin_boundary_tr.locale_id
+                ORDER BY locale.id
+                """
+            ).fetchone(),
+        )
+    )
+    parameters["species_id"] = connection.execute(
+        "SELECT species_id FROM vol_to_bio_species WHERE spatial_unit_id = ?",
+        (parameters["spatial_unit_id"],),
+    ).fetchone()[0]
+    for table in NAMED_TR_TABLES:
+        parameters[f"{table}_name"] = connection.execute(
+            f"SELECT name FROM {table} WHERE locale_id = ?",
+            (parameters["locale_id"],),
+        ).fetchone()[0]
+    return parameters
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import pytest
+from cbm_defaults import app
+from cbm_defaults import lookup_tables
+from test import synthetic_aidb
+
+
+@pytest.fixture(scope="module")
+def connection(tmp_path_factory):
+    """build a database with lookup tables, and yield a connection to it"""
+    tmp_path = tmp_path_factory.mktemp("lookup_tables")
+    config = synthetic_aidb.create_snapshot(str(tmp_path / "snapshot"))
+    config["output_path"] = str(tmp_path / "cbm_defaults.db")
+    config["fast_build"] = True
+    config["lookup_tables"] = True
+    app.run(config)
+    connection = sqlite3.connect(config["output_path"])
+    yield connection
+    connection.close()
+
+
+def read_view(name, replacements):
+    """read one of the example queries of the sql directory, with its
+    hard-coded names replaced by parameters
+    """
+    with open(os.path.join(lookup_tables.get_sql_dir(), name)) as sql_file:
+        sql = sql_file.read()
+    for value in replacements:
+        assert value in sql
+        sql = sql.replace(value, "?")
+    return sql
+
+
+def test_disturbance_matrix_lookup(connection):
+    names = connection.execute(
+        "SELECT DISTINCT admin_boundary_name, eco_boundary_name, "
+        "disturbance_type_name FROM disturbance_matrix_lookup "
+        "WHERE locale_code = 'en-CA'"
+    ).fetchall()
+    assert names
+    view = read_view(
+        "disturbance_matrix_view.sql",
+        ['"British Columbia"', '"Pacific Maritime"', '"Wildfire"'],
+    )
+    for admin_name, eco_name, disturbance_type_name in names:
+        expected = connection.execute(
+            view, (admin_name, eco_name, disturbance_type_name)
+        ).fetchall()
+        result = connection.execute(
+            "SELECT disturbance_matrix_id, source, sink, proportion "
+            "FROM disturbance_matrix_lookup WHERE locale_code = 'en-CA' "
+            "AND admin_boundary_name = ? AND eco_boundary_name = ? "
+            "AND disturbance_type_name = ?",
+            (admin_name, eco_name, disturbance_type_name),
+        ).fetchall()
+        assert sorted(result) == sorted(expected)
+
+
+def test_spatial_unit_and_species_lookup(connection):
+    assert connection.execute(
+        "SELECT spatial_unit_id, admin_boundary_name, eco_boundary_name "
+        "FROM spatial_unit_lookup WHERE locale_code = 'en-CA' "
+        "ORDER BY spatial_unit_id"
+    ).fetchall() == connection.execute(
+        read_view("spatial_unit_view.sql", [])
+    ).fetchall()
+    assert sorted(
+        connection.execute(
+            "SELECT species_id, species_name FROM species_lookup "
+            "WHERE locale_code = 'en-CA'"
+        ).fetchall()
+    ) == sorted(
+        connection.execute(read_view("species_view.sql", [])).fetchall()
+    )
+
+
+def test_lookups_use_covering_indexes(connection):
+    queries = [
+        "SELECT source, sink, proportion FROM disturbance_matrix_lookup "
+        "WHERE locale_code = 'en-CA' AND admin_boundary_name = 'a' "
+        "AND eco_boundary_name = 'b' AND disturbance_type_name = 'c'",
+        "SELECT disturbance_matrix_id FROM disturbance_matrix_lookup "
+        "WHERE locale_code = 'en-CA' AND spatial_unit_id = 1 "
+        "AND disturbance_type_id = 1",
+        "SELECT spatial_unit_id FROM spatial_unit_lookup "
+        "WHERE locale_code = 'en-CA' AND admin_boundary_name = 'a' "
+        "AND eco_boundary_name = 'b'",
+        "SELECT species_id FROM species_lookup "
+        "WHERE locale_code = 'en-CA' AND species_name = 'a'",
+        "SELECT flux_indicator_name FROM composite_flux_indicator_lookup "
+        "WHERE locale_code = 'en-CA' AND name = 'a'",
+    ]
+    for query in queries:
+        plan = connection.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+        assert len(plan) == 1
+        assert "USING COVERING INDEX" in plan[0][-1]
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import pandas as pd
+import pytest
+from cbm_defaults import app
+from cbm_defaults import parquet_export
+from test import synthetic_aidb
+
+pyarrow = pytest.importorskip("pyarrow")
+pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """build a database with parquet_export_dir set, and return the
+    config
+    """
+    tmp_path = tmp_path_factory.mktemp("parquet_export")
+    config = synthetic_aidb.create_snapshot(str(tmp_path / "snapshot"))
+    config["output_path"] = str(tmp_path / "cbm_defaults.db")
+    config["fast_build"] = True
+    config["parquet_export_dir"] = str(tmp_path / "parquet")
+    app.run(config)
+    return config
+
+
+def test_get_table_schemas():
+    table_schemas = parquet_export.get_table_schemas()
+    value_schema = table_schemas["disturbance_matrix_value"]
+    assert value_schema.field("disturbance_matrix_id").type == pyarrow.int64()
+    assert value_schema.field("proportion").type == pyarrow.float64()
+    assert not value_schema.field("proportion").nullable
+    assert table_schemas["pool"].field("code").type == pyarrow.string()
+    assert table_schemas["pool_tr"].field("name").type == pyarrow.dictionary(
+        pyarrow.int32(), pyarrow.string()
+    )
+
+
+def test_export_parquet(exported):
+    dataset_dir = exported["parquet_export_dir"]
+    manifest = parquet_export.read_manifest(dataset_dir)
+    assert list(manifest["tables"]) == list(
+        parquet_export.get_table_schemas()
+    )
+    connection = sqlite3.connect(exported["output_path"])
+    for table_name, table in manifest["tables"].items():
+        columns = [x["name"] for x in table["columns"]]
+        expected = connection.execute(
+            f"SELECT {', '.join(columns)} FROM {table_name}"
+        ).fetchall()
+        result = pyarrow.parquet.read_table(
+            os.path.join(dataset_dir, table["path"])
+        )
+        assert table["num_rows"] == len(expected)
+        assert result.column_names == columns
+        assert [tuple(x.values()) for x in result.to_pylist()] == expected
+    connection.close()
+
+
+def test_read_table_columns(exported):
+    result = parquet_export.read_table(
+        exported["parquet_export_dir"], "disturbance_type_tr", ["name"]
+    )
+    assert list(result.columns) == ["name"]
+    assert isinstance(result["name"].dtype, pd.CategoricalDtype)
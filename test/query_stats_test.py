@@ -0,0 +1,34 @@
+from cbm_defaults.query_stats import QueryRecord
+from cbm_defaults.query_stats import QueryStats
+
+
+def test_slow_queries_are_logged(caplog):
+    stats = QueryStats(slow_query_threshold=1.0)
+    stats.add(QueryRecord("a", "en-CA", 0, 10, 0.0, 0.5))
+    stats.add(QueryRecord("b", "fr-CA", 2, 20, 0.5, 0.5))
+    assert [x.name for x in stats.slow_queries] == ["b"]
+    assert len(caplog.records) == 1
+    assert caplog.records[0].name == "cbm_defaults.slow_queries"
+    assert "slow query b (locale fr-CA, 2 params)" in caplog.text
+
+
+def test_get_summary():
+    stats = QueryStats()
+    stats.add(QueryRecord("a", "en-CA", 0, 10, 0.0, 0.5))
+    stats.add(QueryRecord("b", "en-CA", 0, 1, 0.25, 0.5))
+    stats.add(QueryRecord("a", "fr-CA", 0, 10, 0.0, 0.5))
+    assert stats.slow_queries == []
+    summary = stats.get_summary()
+    assert [x["name"] for x in summary] == ["a", "b"]
+    assert summary[0] == {
+        "name": "a",
+        "calls": 2,
+        "total_time": 1.0,
+        "connect_time": 0.0,
+        "query_time": 1.0,
+        "max_time": 0.5,
+        "rows": 20,
+    }
+    assert summary[1]["connect_time"] == 0.25
+    stats.clear()
+    assert stats.records == []
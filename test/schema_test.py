@@ -0,0 +1,34 @@
+import sqlite3
+import pytest
+from cbm_defaults import app
+from test import synthetic_aidb
+from test.lookup_queries import QUERIES
+from test.lookup_queries import get_full_scans
+from test.lookup_queries import get_parameters
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    """yields a connection to a database built from a synthetic archive
+    index, and the parameters of the canonical queries
+    """
+    tmp_path = tmp_path_factory.mktemp("schema")
+    config = synthetic_aidb.create_snapshot(str(tmp_path / "snapshot"))
+    config["output_path"] = str(tmp_path / "cbm_defaults.db")
+    config["fast_build"] = True
+    app.run(config)
+    connection = sqlite3.connect(config["output_path"])
+    yield connection, get_parameters(connection)
+    connection.close()
+
+
+@pytest.mark.parametrize("query_name", list(QUERIES))
+def test_lookup_query_is_indexed(database, query_name):
+    connection, parameters = database
+    sql, full_listing = QUERIES[query_name]
+    query_plan = [
+        row[-1]
+        for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+    ]
+    assert not get_full_scans(query_plan, full_listing), query_plan
+    assert connection.execute(sql, parameters).fetchall()
@@ -0,0 +1,72 @@
+import sqlite3
+import numpy as np
+import pytest
+from cbm_defaults import app
+from cbm_defaults import cbm_defaults_database
+from cbm_defaults import schema
+from cbm_defaults import spatial_unit_export
+from test import synthetic_aidb
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """build a database with spatial_unit_export_path set, and return the
+    config
+    """
+    tmp_path = tmp_path_factory.mktemp("spatial_unit_export")
+    config = synthetic_aidb.create_snapshot(str(tmp_path / "snapshot"))
+    config["output_path"] = str(tmp_path / "cbm_defaults.db")
+    config["fast_build"] = True
+    config["spatial_unit_export_path"] = str(tmp_path / "spu.npy")
+    app.run(config)
+    return config
+
+
+def test_export_spatial_unit_parameters(exported):
+    parameters = spatial_unit_export.load_spatial_unit_parameters(
+        exported["spatial_unit_export_path"]
+    )
+    assert isinstance(parameters, np.memmap)
+    connection = sqlite3.connect(exported["output_path"])
+    spatial_units = connection.execute(
+        "SELECT id, eco_boundary_id, spinup_parameter_id, "
+        "mean_annual_temperature FROM spatial_unit"
+    ).fetchall()
+    assert len(parameters) == max(x[0] for x in spatial_units) + 1
+    assert parameters[0]["spatial_unit_id"] == 0
+    for spu_id, eco_id, spinup_id, mean_annual_temperature in spatial_units:
+        record = parameters[spu_id]
+        assert record["spatial_unit_id"] == spu_id
+        assert record["mean_annual_temperature"] == mean_annual_temperature
+        assert (record["return_interval"], record["max_rotations"]) == (
+            connection.execute(
+                "SELECT return_interval, max_rotations "
+                "FROM spinup_parameter WHERE id = ?",
+                (spinup_id,),
+            ).fetchone()
+        )
+        assert record["sw_foliage"] == connection.execute(
+            "SELECT sw_foliage FROM turnover_parameter "
+            "INNER JOIN eco_boundary "
+            "ON eco_boundary.turnover_parameter_id = turnover_parameter.id "
+            "WHERE eco_boundary.id = ?",
+            (eco_id,),
+        ).fetchone()[0]
+    connection.close()
+    # an array gather resolves the parameters of many stands at once
+    stand_spu_ids = np.array([x[0] for x in spatial_units] * 3)
+    np.testing.assert_array_equal(
+        parameters[stand_spu_ids]["spatial_unit_id"], stand_spu_ids
+    )
+
+
+def test_parameter_columns_are_fixed_width():
+    connection = sqlite3.connect(":memory:")
+    cbm_defaults_database.execute_ddl(connection, schema.get_ddl_path())
+    columns = spatial_unit_export.get_parameter_columns(connection)
+    dtypes = {name: dtype for name, _, dtype in columns}
+    assert dtypes["historic_mean_temperature"] == "float64"
+    assert dtypes["stump_parameter_id"] == "int64"
+    parameters = spatial_unit_export.get_spatial_unit_parameters(connection)
+    assert parameters.dtype.names == tuple(x[0] for x in columns)
+    assert len(parameters) == 0
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import pytest
+from cbm_defaults import sql_dialect
+from cbm_defaults.archive_index import get_query_dir
+from test import aidb_fixture
+
+
+@pytest.mark.parametrize(
+    "access_sql, sqlite_sql",
+    [
+        ("SELECT * FROM tblDM;", "SELECT * FROM tblDM"),
+        ("SELECT [a b] FROM [t]", 'SELECT "a b" FROM "t"'),
+        ('SELECT "it\'s" & x', "SELECT 'it''s' || x"),
+        (
+            "SELECT IIF(a = 1, IIF(b, 2, 3), f(c, d))",
+            "SELECT CASE WHEN a = 1 THEN CASE WHEN b THEN 2 ELSE 3 END "
+            "ELSE f(c, d) END",
+        ),
+        (
+            "SELECT Nz(a, 0), Len(b), UCase(c)",
+            "SELECT ifnull(a, 0), length(b), upper(c)",
+        ),
+        ("SELECT len FROM t", "SELECT len FROM t"),
+        ("WHERE a = True AND b = false", "WHERE a = 1 AND b = 0"),
+        ("WHERE a LIKE 'x*y?'", "WHERE a LIKE 'x%y_'"),
+        ("WHERE a > #12/31/2001#", "WHERE a > '2001-12-31'"),
+        ("WHERE a = 'IIF(x, 1, 2)'", "WHERE a = 'IIF(x, 1, 2)'"),
+        ("WHERE a = ?", "WHERE a = ?"),
+    ],
+)
+def test_to_sqlite(access_sql, sqlite_sql):
+    assert sql_dialect.to_sqlite(access_sql) == sqlite_sql
+
+
+def test_to_sqlite_errors():
+    with pytest.raises(ValueError):
+        sql_dialect.to_sqlite("SELECT IIF(a, 1) FROM t")
+    with pytest.raises(ValueError):
+        sql_dialect.to_sqlite("SELECT IIF(a, 1, 2 FROM t")
+
+
+@pytest.mark.parametrize(
+    "filename",
+    sorted(x for x in os.listdir(get_query_dir()) if x.endswith(".sql")),
+)
+def test_packaged_queries_translate_and_execute(filename):
+    with open(os.path.join(get_query_dir(), filename), "r") as sql_file:
+        # batched queries contain a placeholder for an IN (...) list
+        sql = sql_dialect.to_sqlite(
+            sql_file.read().replace("{params}", "?")
+        )
+    connection = sqlite3.connect(":memory:")
+    try:
+        aidb_fixture.create_tables(connection)
+        params = (1.0,) * sql.count("?")
+        connection.execute(sql, params).fetchall()
+    finally:
+        connection.close()
@@ -0,0 +1,281 @@
+"""
+Scalable synthetic archive index databases for tests and benchmarks. The
+number of spatial units, disturbance types, disturbance matrices per
+disturbance type and locales can each be scaled independently.
+"""
+
+import os
+import json
+import sqlite3
+import contextlib
+import numpy as np
+from cbm_defaults import aidb_snapshot
+from test import aidb_fixture
+
+# CBM-CFS3 pool codes, see cbm_defaults/tables/pool_cross_walk.csv
+BIOMASS_POOLS = list(range(1, 13))
+DOM_POOLS = list(range(13, 24))
+EMISSION_POOLS = list(range(26, 30))
+PRODUCTS_POOL = 30
+
+# the locales for which cbm_defaults packages every localized csv table
+LOCALES = ("en-CA", "fr-CA", "es-MX", "ru-RU")
+
+# land type codes assigned to every third disturbance type, see
+# cbm_defaults/tables/landtype.csv
+TRANSITION_LAND_TYPES = ["CL", "GL", "WL", "OL"]
+
+
+def generate_dm_values(n_dm, seed=0, first_dmid=1):
+    """generate rows of synthetic CBM-CFS3 disturbance matrix values
+
+    Args:
+        n_dm (int): the number of disturbance matrices
+        seed (int, optional): random seed. Defaults to 0.
+        first_dmid (int, optional): the DMID of the first matrix.
+            Defaults to 1.
+
+    Returns:
+        list: list of (DMID, DMRow, DMColumn, Proportion) tuples
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    sinks = DOM_POOLS + EMISSION_POOLS + [PRODUCTS_POOL]
+    for dmid in range(first_dmid, first_dmid + n_dm):
+        for source in BIOMASS_POOLS + DOM_POOLS:
+            if rng.random() < 0.3:
+                # omitted rows are completed with a diagonal value of 1
+                continue
+            n_sinks = int(rng.integers(1, 4))
+            row_sinks = rng.choice(
+                [x for x in sinks if x != source], n_sinks, replace=False
+            )
+            proportions = rng.dirichlet(np.ones(n_sinks)) * (
+                1.0 if rng.random() < 0.5 else rng.random()
+            )
+            for sink, proportion in zip(row_sinks, proportions):
+                rows.append((dmid, source, int(sink), float(proportion)))
+    return rows
+
+
+def create_aidb(
+    path,
+    n_admin=2,
+    n_eco=3,
+    n_disturbance_types=4,
+    dms_per_disturbance_type=2,
+    n_species=4,
+    locale_suffix="",
+    seed=0,
+    distinct_dms=None,
+):
+    """Create a synthetic archive index database in SQLite format, which can
+    be read with :py:class:`cbm_defaults.aidb_snapshot.SnapshotArchiveIndex`
+
+    The number of spatial units is n_admin * n_eco, and disturbance matrix
+    associations are generated for every spatial unit and disturbance type.
+
+    Args:
+        path (str): path of the new database
+        n_admin (int, optional): number of admin boundaries
+        n_eco (int, optional): number of eco boundaries
+        n_disturbance_types (int, optional): number of disturbance types
+        dms_per_disturbance_type (int, optional): number of disturbance
+            matrices per disturbance type
+        n_species (int, optional): number of species
+        locale_suffix (str, optional): appended to all localized names
+        seed (int, optional): random seed
+        distinct_dms (int, optional): if set, the values of only this many
+            distinct matrices are generated, and repeated in order for the
+            other matrices. By default every matrix is distinct.
+    """
+    rng = np.random.default_rng(seed)
+    sfx = locale_suffix
+    admin_ids = list(range(1, n_admin + 1))
+    eco_ids = list(range(1, n_eco + 1))
+    spus = [
+        (spu_id, admin_id, eco_id)
+        for spu_id, (admin_id, eco_id) in enumerate(
+            ((a, e) for a in admin_ids for e in eco_ids), start=1
+        )
+    ]
+    # the last disturbance type is a multi year disturbance
+    dist_type_ids = list(range(1, n_disturbance_types + 2))
+    multi_year_dist_type = dist_type_ids[-1]
+    forest_types = [(1, "Softwood"), (2, "Mixedwood"), (3, "Hardwood")]
+    genera = [(i, f"genus {i}") for i in range(1, 4)]
+    species = [
+        (i, f"species {i}{sfx}", 1 if i % 2 else 3, (i % 3) + 1)
+        for i in range(1, n_species + 1)
+    ]
+
+    def vol_to_bio():
+        return tuple(rng.random(len(aidb_fixture.VOL_TO_BIO_COLUMNS)))
+
+    tables = {
+        "tblAdminBoundaryDefault": [
+            (i, f"admin {i}{sfx}", 0.1, 0.01 * (i % 2), 0.1, 0.02)
+            for i in admin_ids
+        ],
+        "tblEcoBoundaryDefault": [
+            (i, f"eco {i}{sfx}", 100 + i) + (0.05,) * 9 for i in eco_ids
+        ],
+        "tblSPUDefault": spus,
+        "tblClimateDefault": [
+            (spu_id, year, float(rng.normal(2.0, 3.0)))
+            for spu_id, _, _ in spus
+            for year in [1980, 1981]
+        ],
+        "tblDOMParametersDefault": [
+            (i, 0.1, 10.0, 2.0, 0.8) for i in range(0, 12)
+        ],
+        "tblForestTypeDefault": [(i, f"{n}{sfx}") for i, n in forest_types],
+        "tblGenusTypeDefault": [(i, f"{n}{sfx}") for i, n in genera],
+        "tblSpeciesTypeDefault": species,
+        "tblBioTotalStemwoodSpeciesTypeDefault": [
+            (spu_id, s[0]) + vol_to_bio() for spu_id, _, _ in spus
+            for s in species
+        ],
+        "tblBioTotalStemwoodGenusDefault": [
+            (spu_id, g[0]) + vol_to_bio() for spu_id, _, _ in spus
+            for g in genera
+        ],
+        "tblBioTotalStemwoodForestTypeDefault": [
+            (spu_id, f[0]) + vol_to_bio() for spu_id, _, _ in spus
+            for f in forest_types
+        ],
+        "tblDisturbanceTypeDefault": [
+            (i, f"disturbance {i}{sfx}", f"description {i}{sfx}")
+            for i in dist_type_ids
+        ],
+        "tblDisturbanceTypeLandclassTransition": [
+            (dist_type, TRANSITION_LAND_TYPES[i % len(TRANSITION_LAND_TYPES)])
+            for i, dist_type in enumerate(dist_type_ids[:-1])
+            if i % 3 == 0
+        ],
+        "tblAfforestationPreTypeDefault": [
+            (i, f"pre type {i}{sfx}") for i in range(1, 3)
+        ],
+        "tblSVLAttributesDefaultAfforestation": [
+            (admin_id, eco_id, pre_type)
+            + tuple(
+                float(x) if x > 0.3 else 0.0
+                for x in rng.random(
+                    len(aidb_fixture.AFFORESTATION_POOL_COLUMNS)
+                )
+            )
+            for admin_id in admin_ids
+            for eco_id in eco_ids
+            for pre_type in range(1, 3)
+        ],
+    }
+
+    dms = []
+    eco_associations = []
+    spu_associations = []
+    dmid = 1
+    for dist_type in dist_type_ids:
+        dist_type_dmids = list(range(dmid, dmid + dms_per_disturbance_type))
+        dmid += dms_per_disturbance_type
+        dms.extend(dist_type_dmids)
+        if dist_type == multi_year_dist_type:
+            for eco_id in eco_ids:
+                for annual_order, dm in enumerate(dist_type_dmids, start=2):
+                    eco_associations.append(
+                        (dist_type, eco_id, annual_order, dm)
+                    )
+        elif dist_type % 2:
+            for i_eco, eco_id in enumerate(eco_ids):
+                eco_associations.append(
+                    (
+                        dist_type,
+                        eco_id,
+                        1,
+                        dist_type_dmids[i_eco % len(dist_type_dmids)],
+                    )
+                )
+        else:
+            for i_spu, (spu_id, _, _) in enumerate(spus):
+                spu_associations.append(
+                    (
+                        dist_type,
+                        spu_id,
+                        dist_type_dmids[i_spu % len(dist_type_dmids)],
+                    )
+                )
+    tables["tblDM"] = [
+        (i, f"dm {i}{sfx}", f"dm description {i}{sfx}") for i in dms
+    ]
+    if distinct_dms:
+        distinct_values = generate_dm_values(distinct_dms, seed=seed)
+        tables["tblDMValuesLookup"] = [
+            (dmid,) + row[1:]
+            for dmid in dms
+            for row in distinct_values
+            if row[0] == (dmid - 1) % distinct_dms + 1
+        ]
+    else:
+        tables["tblDMValuesLookup"] = generate_dm_values(
+            len(dms), seed=seed
+        )
+    tables["tblDMAssociationDefault"] = eco_associations
+    tables["tblDMAssociationSPUDefault"] = spu_associations
+    tables["tblGrowthMultiplierDefault"] = [
+        (dist_type, species_type, annual_order, 0.5 + 0.1 * annual_order)
+        for dist_type in dist_type_ids[:-1:2]
+        for species_type in [1, 2]
+        for annual_order in range(1, 6)
+    ]
+
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        aidb_fixture.create_tables(connection)
+        for table, rows in tables.items():
+            if not rows:
+                continue
+            connection.executemany(
+                "INSERT INTO {table} VALUES ({params})".format(
+                    table=table, params=",".join(["?"] * len(rows[0]))
+                ),
+                rows,
+            )
+        connection.commit()
+
+
+def create_snapshot(snapshot_dir, locales=LOCALES[:2], **kwargs):
+    """Create a synthetic archive index snapshot, with one database per
+    locale, in the specified directory and return a cbm_defaults.app config
+    which reads it. The returned config has no "output_path".
+
+    Args:
+        snapshot_dir (str): directory for the snapshot, created if it does
+            not exist
+        locales (iterable, optional): locale codes, see LOCALES
+        kwargs: scaling arguments passed to :py:func:`create_aidb`
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    manifest = {
+        "format": "sqlite",
+        "default_locale": locales[0],
+        "archive_index_data": [],
+    }
+    for locale in locales:
+        path = f"{locale}.db"
+        create_aidb(
+            os.path.join(snapshot_dir, path),
+            locale_suffix=f" ({locale})",
+            **kwargs,
+        )
+        manifest["archive_index_data"].append(
+            {"locale": locale, "path": path}
+        )
+    with open(
+        os.path.join(snapshot_dir, aidb_snapshot.MANIFEST_FILENAME), "w"
+    ) as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    return {
+        "default_locale": locales[0],
+        "locales": [
+            {"id": i, "code": locale} for i, locale in enumerate(locales, 1)
+        ],
+        "archive_index_snapshot": snapshot_dir,
+    }